@@ -53,6 +53,9 @@ class Card(cards.SuitCard):
   # You can use common values and suits (cards.VALUES_***, cards.SUITS_***) or create your own:
   # Example: values = {1: 'AS' ... }, suits = {1: 'CLUBS' ... }
   
+  # Cards are flyweights: no attributes per card (__dict__)
+  __slots__ = ()
+  
   values = cards.VALUES_ANGLO_AMERICAN
   suits = cards.SUITS_ANGLO_AMERICAN
   
@@ -137,14 +137,71 @@ class Round(gameofrounds.GameRound):
                playerplaysCommand=game.PlayerPlaysGameCommand()): 
     super(Round, self).__init__(game, players, configurations, commandsManager,
                                reportCollector, startCommand, endCommand, playerplaysCommand)
-    self.deck = self.configurations.deckPrototype.clone()
+    # Containers (deck, stacks of cards) of the last finished round of the game are reused
+    self.recycledRound = None
+    if game is not None and isinstance(getattr(game, 'recycledRound', None), self.__class__):
+      self.recycledRound = game.recycledRound
+      game.recycledRound = None
+    self.deck = self.recycled('deck')
+    if self.deck is None: self.deck = self.configurations.deckPrototype.newStack()
+    self.resetDeck()
+    self.presetDeck = self.presetDeckOfRound(game)
     
     self.playersCards = {}
+    recycledCards = self.recycled('playersCards', {})
     for player in self.players:
-      self.playersCards[player.name] = cards.StackOfCards()
+      # Same kind of stack of the deck (e.g. CardSet)
+      self.playersCards[player.name] = self.reuseStack(recycledCards.get(player.name))
       
     self.currentPlayer = None
     
+  def resetDeck(self):
+    '''
+    The deck has all cards of the deck prototype again (one bulk copy, no clone)
+    '''
+    self.deck.resetFrom(self.configurations.deckPrototype)
+    
+  def presetDeckOfRound(self, game):
+    presetDecks = getattr(self.configurations, 'presetDecks', None)
+    if not presetDecks or game is None: return None
+    index = game.numberOfRounds()
+    if index < len(presetDecks): return presetDecks[index]
+    return None
+    
+  def shuffleDeck(self):
+    '''
+    Shuffle the deck with the random generator of the game. 
+    With configurations.lazyShuffle the cards are shuffled while they are drawn (see cards.StackOfCards.shuffle)
+    
+    If the round has a presetDeck, the deck has its cards in its order instead (only in the first shuffle), 
+    e.g. round.presetDeck = dealer.toDeck(row) replays a deal of montecarlo.BatchDealer.
+    '''
+    if self.presetDeck is not None:
+      self.deck.resetFrom(self.presetDeck)
+      self.presetDeck = None
+      return
+    self.deck.shuffle(self.random, lazy=getattr(self.configurations, 'lazyShuffle', False))
+    
+  def recycled(self, name, default=None):
+    '''
+    Attribute of the recycled round (e.g. a stack of cards), or default if there is no recycled round
+    '''
+    if self.recycledRound is None: return default
+    return getattr(self.recycledRound, name, default)
+  
+  def reuseStack(self, stack, stackFactory=None):
+    '''
+    The stack (cleared) if it is not None, otherwise a new stack (default: same kind of the deck).
+    
+    Example:
+    self.discardedCards = self.reuseStack(self.recycled('discardedCards'))
+    '''
+    if stack is None:
+      if stackFactory is None: return self.deck.newStack()
+      return stackFactory()
+    stack.clear()
+    return stack
+    
   @classmethod
   def name(clazz):
     return clazz.__name__.replace('Round', '')
@@ -218,6 +275,14 @@ class Configurations(gameofrounds.GameOfRoundsConfigurations):
     '''
     super(Configurations, self).__init__(timeForCommand, timeForPlay, timeForGame, numberOfRounds)
     self.deckPrototype = deckPrototype
+    # Draw-on-demand shuffle of the deck, for rounds that use only a few cards of the deck (Round.shuffleDeck)
+    self.lazyShuffle = False
+    # True: the next round reuses the deck and the stacks of cards of the finished round (Game.recycleRound),
+    # so the finished rounds are not kept in game.rounds, only their reports (e.g. batches of games).
+    self.recycleRounds = False
+    # Decks of the first rounds (e.g. replays of montecarlo.BatchDealer.toDeck): round i pops the cards of 
+    # presetDecks[i] in order instead of a shuffled deck (Round.presetDeck). None: all decks are shuffled.
+    self.presetDecks = None
     
 ###############################################################################
     
@@ -250,6 +315,15 @@ class Game(gameofrounds.GameOfRounds):
                roundClass=Round): 
     super(Game, self).__init__(players, configurations, commandsManager,
                                reportCollector, startCommand, endCommand, playerplaysCommand, roundClass)
+    self.recycledRound = None
+  
+  def recycleRound(self, round):
+    if not getattr(self.configurations, 'recycleRounds', False):
+      super(Game, self).recycleRound(round)
+      return
+    # The next round reuses the containers of this finished round: it is not kept in rounds (aliasing)
+    round.recycledRound = None
+    self.recycledRound = round
   
   @classmethod
   def name(clazz):
@@ -270,7 +344,7 @@ class CardUtils(game.Utils):
 ###############################################################################
 # [required] 10) Define a factory
 
-accessibleClasses = [utils.CombinationGenerator, cards.StackOfCards]
+accessibleClasses = [utils.CombinationGenerator, cards.StackOfCards, cards.CardSet]
 
 class GameFactory(factory.GameFactory):
   
@@ -6,26 +6,96 @@ Possible values:
 'Card': Ordered by value / Equality by value and suit
 'ValueCard': Ordered by value / Equality by value
 'SuitCard': Ordered by value and suit / Equality by value and suit
+
+Possible stacks:
+'StackOfCards': list of cards
+'CardSet': list of cards and a bitmask (one deck only), fast membership and counts
+'CardMultiset': list of cards and counts per card, value and suit (many decks and jokers)
 '''
 
 from domain import dataobjects
+import itertools
 import random
 import copy
 from gameengine import utils
 from cardgameengine.constants import *
 
-class Card(dataobjects.OrderedValueObject):
+# Keys of cards: value and suit (integers) packed in one integer, so comparisons are integer comparisons
+KEY_BITS = 32
+KEY_OFFSET = 1 << (KEY_BITS - 1)
+KEY_FIELDS = 2
+
+def isKeyField(value):
+  return isinstance(value, (int, long)) and -KEY_OFFSET <= value < KEY_OFFSET
+
+def keyFunction(names):
+  '''
+  Function that returns the key of a card: the attributes (names) packed in an integer, left aligned, 
+  so the order is the same of the tuple of attributes (1,) < (1, 2) < (2,). 
+  Cards with other kinds of values (e.g. strings) have tuples as keys.
+  '''
+  names = tuple(names)
+  padding = KEY_FIELDS - len(names)
+  def key(card):
+    values = [getattr(card, name) for name in names]
+    if padding < 0 or not all(isKeyField(value) for value in values):
+      return tuple(values)
+    key = 0
+    for value in values:
+      key = (key << KEY_BITS) | (value + KEY_OFFSET)
+    return key << (KEY_BITS * padding)
+  return key
+
+class Card(object):
   '''
   Ordered by value / Equality by value and suit
+  
+  Cards are immutable flyweights: Card(1, 2) is Card(1, 2), for each class and score.
+  Keys of equality and order (integers, see keyFunction), hash and string are computed once, 
+  when the card is created. The key functions are generated once per class, from equalsVariables 
+  and priorityOrder.
+  Subclasses should declare __slots__ = () to avoid a __dict__ per card.
   '''
   
+  __slots__ = ('value', 'suit', 'score', 'equalityKey', 'orderKey', 'hashCode', 'string')
+  
   values = {}
   suits = {}
   
-  def __init__(self, value, suit, score=0):
-    self.value = value
-    self.suit = suit
-    self.score = score
+  # (class, value, suit, score) -> card
+  instances = {}
+  
+  def __new__(cls, value, suit, score=0):
+    key = (cls, value, suit, score)
+    card = Card.instances.get(key)
+    if card is None:
+      card = object.__new__(cls)
+      setAttribute = object.__setattr__
+      setAttribute(card, 'value', value)
+      setAttribute(card, 'suit', suit)
+      setAttribute(card, 'score', score)
+      keyFunctions = cls.__dict__.get('keyFunctions')
+      if keyFunctions is None:
+        keyFunctions = (keyFunction(card.equalsVariables()), keyFunction(card.priorityOrder()))
+        cls.keyFunctions = keyFunctions
+      equalityKey, orderKey = keyFunctions
+      setAttribute(card, 'equalityKey', equalityKey(card))
+      setAttribute(card, 'orderKey', orderKey(card))
+      setAttribute(card, 'hashCode', hash(card.equalityKey))
+      setAttribute(card, 'string', card.toString())
+      card = Card.instances.setdefault(key, card)
+    return card
+  
+  def __setattr__(self, name, value):
+    raise AttributeError('Cards are immutable')
+  
+  def __delattr__(self, name):
+    raise AttributeError('Cards are immutable')
+  
+  # Flyweight: copies are the card itself
+  def __copy__(self): return self
+  def __deepcopy__(self, memo): return self
+  def __reduce__(self): return (self.__class__, (self.value, self.suit, self.score))
     
   def equalsVariables(self):
     return ['value', 'suit']
@@ -33,7 +103,27 @@ class Card(dataobjects.OrderedValueObject):
   def priorityOrder(self):
     return ['value']
   
+  def __eq__(self, that):
+    return self is that or (isinstance(that, Card) and self.equalityKey == that.equalityKey)
+  
+  def __ne__(self, that):
+    return not self.__eq__(that)
+  
+  def __hash__(self):
+    return self.hashCode
+  
+  def __lt__(self, that): return self.orderKey < that.orderKey
+  def __le__(self, that): return self.orderKey <= that.orderKey
+  def __gt__(self, that): return self.orderKey > that.orderKey
+  def __ge__(self, that): return self.orderKey >= that.orderKey
+  
+  def __repr__(self):
+    return self.string
+  
   def __str__(self):
+    return self.string
+  
+  def toString(self):
     if self.value in self.values: v = self.values[self.value]
     else: v = str(self.value)
     if self.suit in self.suits: s = self.suits[self.suit]
@@ -45,6 +135,8 @@ class ValueCard(Card):
   Ordered by value / Equality by value
   '''
   
+  __slots__ = ()
+  
   def equalsVariables(self):
     return ['value']  
 
@@ -52,6 +144,8 @@ class SuitCard(Card):
   '''
   Ordered by value and suit / Equality by value and suit
   '''
+  
+  __slots__ = ()
 
   def priorityOrder(self):
     return ['value', 'suit']
@@ -62,21 +156,48 @@ class StackOfCards(dataobjects.ValueObject):
   This class has useful methods to manipulate the stack and to verifify the deck.
   '''
   
+  # Lazy shuffle: the first unshuffled cards of the list are not shuffled yet (see shuffle)
+  unshuffled = 0
+  
   def __init__(self):
     self.cards = []
     
   def __str__(self):
+    self.finishShuffle()
     return ' '.join([str(card) for card in self.cards])
+  
+  def equalsVariables(self):
+    return ['cards']
     
   # Prototype
   def clone(self):
-    theclone = self.__class__()
-    theclone.pushAll(self)
-    return theclone
+    return self.newStack().resetFrom(self)
+  
+  def resetFrom(self, stack):
+    '''
+    The stack has the same cards of the other stack (e.g. the deck prototype), in one slice copy.
+    The list of cards is reused, so a stack can be reset many times without new allocations.
+    '''
+    stack.finishShuffle()
+    self.cards[:] = stack.cards
+    self.unshuffled = 0
+    return self
+  
+  def clear(self):
+    del self.cards[:]
+    self.unshuffled = 0
+  
+  def newStack(self):
+    '''
+    Empty stack of the same kind, e.g. for the cards of the players
+    '''
+    return self.__class__()
   
   def __cardsFromCardOrStackOrList(self, cardOrStackOrList):
     cards = cardOrStackOrList
     if isinstance(cardOrStackOrList, StackOfCards):
+      # A lazily shuffled stack is copied in its shuffled order
+      cardOrStackOrList.finishShuffle()
       cards = cardOrStackOrList.cards
     elif isinstance(cardOrStackOrList, Card):
       cards = [cardOrStackOrList]
@@ -109,6 +230,7 @@ class StackOfCards(dataobjects.ValueObject):
       self.push(card)
 
   def pop(self):
+    if self.unshuffled: self.drawLastCard()
     return self.cards.pop()
 
   def popIndex(self, index):
@@ -117,6 +239,7 @@ class StackOfCards(dataobjects.ValueObject):
     return c
   
   def popAll(self):
+    self.finishShuffle()
     cards = self.cards
     self.cards = []
     list = StackOfCards()
@@ -124,32 +247,89 @@ class StackOfCards(dataobjects.ValueObject):
     return list
 
   def popCard(self, card):
+    self.finishShuffle()
     c = self.see(self.cards.index(card))
     self.cards.remove(c)
     return c
   
   def popCards(self, cardOrStackOrList):
-    cards = self.__cardsFromCardOrStackOrList(cardOrStackOrList)
-    list = StackOfCards()
-    for card in cards[:]:
-      list.push(self.popCard(card))
-    return list
+    '''
+    Remove the cards in one pass over the stack (a repeated card is removed as many times as it is repeated).
+    Return a StackOfCards with the cards in the requested order.
+    ValueError if a card is not in the stack: in this case no card is removed.
+    '''
+    requested = self.__cardsFromCardOrStackOrList(cardOrStackOrList)
+    self.finishShuffle()
+    cardKey = self.cardKey
+    wanted = {}
+    for card in requested:
+      key = cardKey(card)
+      wanted[key] = wanted.get(key, 0) + 1
+    kept = []
+    found = {}
+    for card in self.cards:
+      key = cardKey(card)
+      if wanted.get(key):
+        wanted[key] -= 1
+        found.setdefault(key, []).append(card)
+      else:
+        kept.append(card)
+    removed = []
+    for card in requested:
+      cardsFound = found.get(cardKey(card))
+      if not cardsFound: raise ValueError('Card not found: ' + str(card))
+      removed.append(cardsFound.pop(0))
+    self.cards[:] = kept
+    self.cardsRemoved(removed)
+    return self.__stackOf(removed)
+  
+  def popCardsIf(self, condition):
+    '''
+    Remove the cards accepted by the condition (function(card) => bool) in one pass over the stack.
+    Return a StackOfCards with the removed cards, in the order of this stack.
+    '''
+    self.finishShuffle()
+    kept = []
+    removed = []
+    for card in self.cards:
+      if condition(card): removed.append(card)
+      else: kept.append(card)
+    if removed:
+      self.cards[:] = kept
+      self.cardsRemoved(removed)
+    return self.__stackOf(removed)
   
   def popCardsWithValue(self, value):
-    list = StackOfCards()
-    for card in self.cards[:]:
-      if card.value == value:
-        list.push(self.popCard(card))
-    return list
+    return self.popCardsIf(lambda card: card.value == value)
+  
+  def popCardsWithValues(self, values):
+    '''
+    Example: jokers = stack.popCardsWithValues([0, 2])
+    '''
+    return self.popCardsIf(lambda card: card.value in values)
   
   def popCardsWithSuit(self, suit):
-    list = StackOfCards()
-    for card in self.cards[:]:
-      if card.suit == suit:
-        list.push(self.popCard(card))
-    return list
+    return self.popCardsIf(lambda card: card.suit == suit)
+  
+  def cardKey(self, card):
+    '''
+    Key of the equality of the cards in the bulk operations (popCards)
+    '''
+    return card
+  
+  def cardsRemoved(self, cards):
+    '''
+    Called after a bulk operation removes cards of the stack (e.g. to update indexes of the cards)
+    '''
+    pass
+  
+  def __stackOf(self, cards):
+    stack = StackOfCards()
+    stack.cards = cards
+    return stack
 
   def see(self, index):
+    if self.unshuffled: self.finishShuffle()
     return self.cards[index]
   
   def seeFirstCard(self):
@@ -225,6 +405,7 @@ class StackOfCards(dataobjects.ValueObject):
     return self.compareByHeight(that)
   
   def sort(self):
+    self.unshuffled = 0
     self.cards = sorted(self.cards)
     
   @staticmethod
@@ -239,22 +420,64 @@ class StackOfCards(dataobjects.ValueObject):
   def keySortByScore(card): return card.score
 
   def sortByValue(self):
+    self.unshuffled = 0
     self.cards.sort(key=self.keySortByValue)
   
   def sortBySuit(self):
+    self.unshuffled = 0
     self.cards.sort(key=self.keySortBySuit)
   
   def sortByValueAndSuit(self):
+    self.unshuffled = 0
     self.cards.sort(key=self.keySortByValueAndSuit)
     
   def sortBySuitAndValue(self):
+    self.unshuffled = 0
     self.cards.sort(key=self.keySortBySuitAndValue)
     
   def sortByScore(self):
+    self.unshuffled = 0
     self.cards.sort(key=self.keySortByScore)
   
-  def shuffle(self):
-    random.shuffle(self.cards)
+  def shuffle(self, rng=None, lazy=False):
+    '''
+    rng (default None = module random): random.Random of the game, e.g. round.deck.shuffle(round.random)
+    lazy (default False): the cards are not permuted now. Each pop() draws a random card of the unshuffled 
+    cards (incremental Fisher-Yates), so a round that deals a few cards of the deck does not shuffle all cards.
+    The drawn cards have the same distribution of a complete shuffle (the same cards for the same rng).
+    Other methods that depend on the order of the cards (see, popIndex, str etc) finish the shuffle.
+    '''
+    if rng is None: rng = random
+    if lazy:
+      self.shuffleRandom = rng
+      self.unshuffled = len(self.cards)
+    else:
+      self.unshuffled = 0
+      rng.shuffle(self.cards)
+    
+  def drawLastCard(self):
+    '''
+    Lazy shuffle: a random card of the unshuffled cards goes to the top of the stack (step of random.shuffle)
+    '''
+    last = self.unshuffled - 1
+    # The last unshuffled card has no choice: no random number, as in random.shuffle and finishShuffle
+    if last <= 0:
+      self.unshuffled = 0
+      return
+    # Cards pushed after the shuffle are on the top of the unshuffled cards
+    if last != len(self.cards) - 1: return
+    cards = self.cards
+    index = int(self.shuffleRandom.random() * (last + 1))
+    cards[index], cards[last] = cards[last], cards[index]
+    self.unshuffled = last
+    
+  def finishShuffle(self):
+    if not self.unshuffled: return
+    cards, random = self.cards, self.shuffleRandom.random
+    for last in reversed(xrange(1, self.unshuffled)):
+      index = int(random() * (last + 1))
+      cards[index], cards[last] = cards[last], cards[index]
+    self.unshuffled = 0
     
   def height(self):
     return len(self.cards)
@@ -299,17 +522,389 @@ class StackOfCards(dataobjects.ValueObject):
   
   def allCombinationsOfCards(self, min=1, max=0):
     combinations = []
+    for cards in self.iterCombinationsOfCards(min, max):
+      combination = StackOfCards()
+      combination.cards.extend(cards)
+      combinations.append(combination)
+    return combinations
+  
+  def iterCombinationsOfCards(self, min=1, max=0, predicate=None):
+    '''
+    Generator of the combinations of min to max cards (max 0 = all cards), in the same order of 
+    allCombinationsOfCards, as tuples of cards: no stack is created and the loop can stop at any time.
+    predicate (default None = all): function(tuple of cards) => bool, only accepted combinations are yielded.
+    
+    Example:
+    for cards in stack.iterCombinationsOfCards(3, 3, lambda cards: cards[0].value == cards[-1].value): ...
+    '''
+    self.finishShuffle()
     if max == 0: max = self.height()
-    if min > max or max > self.height(): return combinations
+    if min > max or max > self.height(): return
     for r in range(min, max+1):
-      generator = utils.CombinationGenerator(self.height(), r)
-      while generator.hasNext():
-        indexes = generator.next()
-        combination = StackOfCards()
-        for i in indexes:
-          combination.push(self.see(i))
-        combinations.append(combination)
-    return combinations
+      for combination in itertools.combinations(self.cards, r):
+        if predicate is None or predicate(combination):
+          yield combination
+  
+###############################################################################
+
+class CardLayout(object):
+  '''
+  Position (bit) of each card (value, suit) in a bitmask: suits 0..numberOfSuits and values 0..maxValue
+  (0 = jokers, 14 = AS of some games). 
+  '''
+  
+  def __init__(self, numberOfSuits=4, maxValue=14):
+    self.numberOfSuits = numberOfSuits
+    self.maxValue = maxValue
+    self.valuesPerSuit = maxValue + 1
+    self.numberOfSlots = (numberOfSuits + 1) * self.valuesPerSuit
+    suitMask = (1 << self.valuesPerSuit) - 1
+    self.suitMasks = [suitMask << (suit * self.valuesPerSuit) for suit in range(numberOfSuits + 1)]
+    self.valueMasks = []
+    for value in range(self.valuesPerSuit):
+      mask = 0
+      for suit in range(numberOfSuits + 1):
+        mask |= 1 << (suit * self.valuesPerSuit + value)
+      self.valueMasks.append(mask)
+    
+  def contains(self, card):
+    return 0 <= card.value <= self.maxValue and 0 <= card.suit <= self.numberOfSuits
+  
+  def slot(self, card):
+    if not self.contains(card): raise ValueError('Card out of the layout: ' + str(card))
+    return card.suit * self.valuesPerSuit + card.value
+  
+  def bit(self, card):
+    return 1 << self.slot(card)
+  
+  def mask(self, cards):
+    mask = 0
+    for card in cards:
+      mask |= self.bit(card)
+    return mask
+  
+  def valueMask(self, value):
+    if 0 <= value <= self.maxValue: return self.valueMasks[value]
+    return 0
+  
+  def suitMask(self, suit):
+    if 0 <= suit <= self.numberOfSuits: return self.suitMasks[suit]
+    return 0
+
+STANDARD_LAYOUT = CardLayout()
+
+def popcount(mask):
+  return bin(mask).count('1')
+
+class CardSet(StackOfCards):
+  '''
+  Stack of cards of one deck (no repeated cards) with a bitmask of its cards: containsCard, numberOfCards*, 
+  containsCardWithValue/Suit are bit operations and union, intersection and difference are available.
+  The order of the cards is kept (list), like StackOfCards.
+  Cards are equal by value and suit (Card and SuitCard).
+  
+  Example:
+  deckPrototype = cards.DeckPrototypeBuilder.createCommonDeck(Card, 4, 13, stackClass=cards.CardSet)
+  '''
+  
+  def __init__(self, layout=STANDARD_LAYOUT):
+    self.cards = []
+    self.layout = layout
+    self.mask = 0
+    
+  def newStack(self):
+    return self.__class__(layout=self.layout)
+  
+  def resetFrom(self, stack):
+    if not isinstance(stack, CardSet) or stack.layout is not self.layout:
+      stack.finishShuffle()
+      self.clear()
+      self.pushAll(stack)
+      return self
+    super(CardSet, self).resetFrom(stack)
+    self.mask = stack.mask
+    return self
+  
+  def clear(self):
+    super(CardSet, self).clear()
+    self.mask = 0
+  
+  def __maskOf(self, cardOrStackOrList):
+    if isinstance(cardOrStackOrList, CardSet) and cardOrStackOrList.layout is self.layout:
+      return cardOrStackOrList.mask
+    if isinstance(cardOrStackOrList, StackOfCards):
+      return self.layout.mask(cardOrStackOrList.cards)
+    if isinstance(cardOrStackOrList, Card):
+      return self.layout.bit(cardOrStackOrList)
+    return self.layout.mask(cardOrStackOrList)
+  
+  def __indexOf(self, card):
+    for index, c in enumerate(self.cards):
+      if c.value == card.value and c.suit == card.suit:
+        return index
+    raise ValueError('Card not found: ' + str(card))
+  
+  def push(self, card):
+    bit = self.layout.bit(card)
+    if self.mask & bit: raise ValueError('Repeated card in a CardSet: ' + str(card))
+    self.mask |= bit
+    self.cards.append(card)
+    
+  def pop(self):
+    if self.unshuffled: self.drawLastCard()
+    card = self.cards.pop()
+    self.mask &= ~self.layout.bit(card)
+    return card
+  
+  def popIndex(self, index):
+    self.finishShuffle()
+    card = self.cards.pop(index)
+    self.mask &= ~self.layout.bit(card)
+    return card
+  
+  def popAll(self):
+    stack = super(CardSet, self).popAll()
+    self.mask = 0
+    return stack
+  
+  def popCard(self, card):
+    if not self.mask & self.layout.bit(card): raise ValueError('Card not found: ' + str(card))
+    self.finishShuffle()
+    return self.popIndex(self.__indexOf(card))
+  
+  def popCardsWithValue(self, value):
+    if not self.mask & self.layout.valueMask(value): return StackOfCards()
+    return super(CardSet, self).popCardsWithValue(value)
+  
+  def cardKey(self, card):
+    return card.value, card.suit
+  
+  def cardsRemoved(self, cards):
+    self.mask &= ~self.layout.mask(cards)
+  
+  def popCardsWithSuit(self, suit):
+    if not self.mask & self.layout.suitMask(suit): return StackOfCards()
+    return super(CardSet, self).popCardsWithSuit(suit)
+  
+  def numberOfCards(self, aCard):
+    return 1 if self.containsCard(aCard) else 0
+  
+  def numberOfCardsWithValue(self, value):
+    return popcount(self.mask & self.layout.valueMask(value))
+  
+  def numberOfCardsWithSuit(self, suit):
+    return popcount(self.mask & self.layout.suitMask(suit))
+  
+  def containsCard(self, card):
+    try:
+      return bool(self.mask & self.layout.bit(card))
+    except ValueError:
+      return False
+  
+  def containsAllCards(self, cardOrStackOrList):
+    try:
+      mask = self.__maskOf(cardOrStackOrList)
+    except ValueError:
+      return False
+    return mask & self.mask == mask
+  
+  def containsCardWithValue(self, value):
+    return bool(self.mask & self.layout.valueMask(value))
+  
+  def containsCardWithSuit(self, suit):
+    return bool(self.mask & self.layout.suitMask(suit))
+  
+  def union(self, cardOrStackOrList):
+    '''
+    New CardSet: cards of this set and then the cards of the other stack that are not in this set
+    '''
+    cards = cardOrStackOrList
+    if isinstance(cardOrStackOrList, StackOfCards):
+      cardOrStackOrList.finishShuffle()
+      cards = cardOrStackOrList.cards
+    elif isinstance(cardOrStackOrList, Card): cards = [cardOrStackOrList]
+    result = self.clone()
+    for card in cards:
+      if not result.containsCard(card): result.push(card)
+    return result
+  
+  def intersection(self, cardOrStackOrList):
+    mask = self.__maskOf(cardOrStackOrList)
+    return self.__select(lambda bit: bit & mask)
+  
+  def difference(self, cardOrStackOrList):
+    mask = self.__maskOf(cardOrStackOrList)
+    return self.__select(lambda bit: not bit & mask)
+  
+  def __select(self, condition):
+    self.finishShuffle()
+    result = self.newStack()
+    for card in self.cards:
+      bit = self.layout.bit(card)
+      if condition(bit):
+        result.cards.append(card)
+        result.mask |= bit
+    return result
+  
+  __or__ = union
+  __and__ = intersection
+  __sub__ = difference
+  
+class CardMultiset(StackOfCards):
+  '''
+  Stack of cards with the number of copies of each card, value and suit (bytearrays): numberOfCards*, 
+  containsCard* and containsAllCards (with repeated cards) do not scan the cards.
+  The order of the cards is kept (list), like StackOfCards.
+  Cards are equal by value and suit (Card and SuitCard).
+  The layout grows if a card with a greater value or suit is pushed.
+  
+  Example:
+  deckPrototype = cards.DeckPrototypeBuilder.createCommonDeck(Card, 4, 13, 2, 2, stackClass=cards.CardMultiset)
+  '''
+  
+  def __init__(self, layout=STANDARD_LAYOUT):
+    self.cards = []
+    self.layout = layout
+    self.resetCounts()
+    
+  def resetCounts(self):
+    self.counts = bytearray(self.layout.numberOfSlots)
+    self.valueCounts = bytearray(self.layout.valuesPerSuit)
+    self.suitCounts = bytearray(self.layout.numberOfSuits + 1)
+    
+  def newStack(self):
+    return self.__class__(layout=self.layout)
+  
+  def resetFrom(self, stack):
+    if not isinstance(stack, CardMultiset):
+      stack.finishShuffle()
+      self.clear()
+      self.pushAll(stack)
+      return self
+    self.layout = stack.layout
+    super(CardMultiset, self).resetFrom(stack)
+    self.counts[:] = stack.counts
+    self.valueCounts[:] = stack.valueCounts
+    self.suitCounts[:] = stack.suitCounts
+    return self
+  
+  def clear(self):
+    super(CardMultiset, self).clear()
+    self.resetCounts()
+  
+  def __countsOf(self, cardOrStackOrList):
+    if isinstance(cardOrStackOrList, CardMultiset) and cardOrStackOrList.layout is self.layout:
+      return cardOrStackOrList.counts
+    cards = cardOrStackOrList
+    if isinstance(cardOrStackOrList, StackOfCards): cards = cardOrStackOrList.cards
+    elif isinstance(cardOrStackOrList, Card): cards = [cardOrStackOrList]
+    counts = bytearray(self.layout.numberOfSlots)
+    for card in cards:
+      counts[self.layout.slot(card)] += 1
+    return counts
+  
+  def __remove(self, card):
+    self.counts[self.layout.slot(card)] -= 1
+    self.valueCounts[card.value] -= 1
+    self.suitCounts[card.suit] -= 1
+    
+  def __grow(self, card):
+    if card.value < 0 or card.suit < 0: raise ValueError('Card out of the layout: ' + str(card))
+    self.layout = CardLayout(max(self.layout.numberOfSuits, card.suit), max(self.layout.maxValue, card.value))
+    cards = self.cards
+    self.cards = []
+    self.resetCounts()
+    for c in cards: self.push(c)
+    
+  def push(self, card):
+    if not self.layout.contains(card): self.__grow(card)
+    self.counts[self.layout.slot(card)] += 1
+    self.valueCounts[card.value] += 1
+    self.suitCounts[card.suit] += 1
+    self.cards.append(card)
+    
+  def pop(self):
+    if self.unshuffled: self.drawLastCard()
+    card = self.cards.pop()
+    self.__remove(card)
+    return card
+  
+  def popIndex(self, index):
+    self.finishShuffle()
+    card = self.cards.pop(index)
+    self.__remove(card)
+    return card
+  
+  def popAll(self):
+    stack = super(CardMultiset, self).popAll()
+    self.resetCounts()
+    return stack
+  
+  def popCard(self, card):
+    if self.numberOfCards(card) == 0: raise ValueError('Card not found: ' + str(card))
+    self.finishShuffle()
+    for index, c in enumerate(self.cards):
+      if c.value == card.value and c.suit == card.suit:
+        return self.popIndex(index)
+  
+  def popCardsWithValue(self, value):
+    if self.numberOfCardsWithValue(value) == 0: return StackOfCards()
+    return super(CardMultiset, self).popCardsWithValue(value)
+  
+  def cardKey(self, card):
+    return card.value, card.suit
+  
+  def cardsRemoved(self, cards):
+    for card in cards:
+      self.__remove(card)
+  
+  def popCardsWithSuit(self, suit):
+    if self.numberOfCardsWithSuit(suit) == 0: return StackOfCards()
+    return super(CardMultiset, self).popCardsWithSuit(suit)
+  
+  def numberOfCards(self, aCard):
+    if not self.layout.contains(aCard): return 0
+    return self.counts[self.layout.slot(aCard)]
+      
+  def numberOfCardsWithValue(self, value):
+    if 0 <= value < len(self.valueCounts): return self.valueCounts[value]
+    return 0
+      
+  def numberOfCardsWithSuit(self, suit):
+    if 0 <= suit < len(self.suitCounts): return self.suitCounts[suit]
+    return 0
+  
+  def containsCard(self, card):
+    return self.numberOfCards(card) > 0
+  
+  def containsAllCards(self, cardOrStackOrList):
+    '''
+    Repeated cards must be repeated in this stack too
+    '''
+    try:
+      counts = self.__countsOf(cardOrStackOrList)
+    except ValueError:
+      return False
+    for count, myCount in zip(counts, self.counts):
+      if count > myCount: return False
+    return True
+  
+  def containsCardWithValue(self, value):
+    return self.numberOfCardsWithValue(value) > 0
+  
+  def containsCardWithSuit(self, suit):
+    return self.numberOfCardsWithSuit(suit) > 0
+  
+  def sameCardsAs(self, cardOrStackOrList):
+    '''
+    True if both stacks have the same cards, in any order
+    '''
+    try:
+      return self.__countsOf(cardOrStackOrList) == self.counts
+    except ValueError:
+      return False
+  
+###############################################################################
   
 # Builder
 class DeckPrototypeBuilder(object):
@@ -320,7 +915,7 @@ class DeckPrototypeBuilder(object):
   @staticmethod
   def createCommonDeck(
       cardClass, numberOfSuits, numberOfCardsPerSuit, 
-      numberOfDecks=1, numberOfJokersPerDeck=0, scoreFunction=lambda value,suit: 0):
+      numberOfDecks=1, numberOfJokersPerDeck=0, scoreFunction=lambda value,suit: 0, stackClass=StackOfCards):
     '''
     # Parameters:
     # cardClass: Class object of the card, to use to create instances, like prototype pattern.
@@ -329,6 +924,7 @@ class DeckPrototypeBuilder(object):
     # numberOfDecks (default 1): Number of decks, i.e., equal cards (value and suit) in the deck
     # numberOfJokersPerDeck (default 0): Number of jokers (Card(0, 0)) per deck
     # scoreFunction (default: lambda value,suit: 0): give a function with rules of score
+    # stackClass (default StackOfCards): CardSet for faster decks and hands (only one deck and one joker)
     # Example:
     def scoreFunction(value, score):
       if value == 0: return 20
@@ -348,7 +944,7 @@ class DeckPrototypeBuilder(object):
     # deckPrototype.pushCard(-50, -123)
     '''
     
-    deck = StackOfCards()
+    deck = stackClass()
     for x in range(1, numberOfDecks+1):
       for suit in range(1, numberOfSuits+1):
         for value in range(1, numberOfCardsPerSuit+1):
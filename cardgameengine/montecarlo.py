@@ -0,0 +1,130 @@
+'''
+@author: Paulo Cheque (paulocheque@gmail.com)
+
+Batch dealing for Monte Carlo simulations: many independent shuffled deals of a deck, generated at once
+as a matrix of integers (deal x position). Each integer is the index of a card in the deck prototype.
+With NumPy (optional dependency: pip install numpy) the matrix is a numpy array and the deals are generated
+by vectorized operations; without NumPy it is a list of lists (same API, much slower).
+
+Example of usage:
+
+from cardgameengine import cards, montecarlo
+
+deck = cards.DeckPrototypeBuilder.createCommonDeck(cards.Card, 4, 13)
+dealer = montecarlo.BatchDealer(deck, seed=42)
+deals = dealer.deal(100000, 9) # 2 cards for 2 players and 5 community cards
+values = dealer.valuesOf(deals) # matrix of the values of the cards
+player1, player2, community = dealer.toStacks(deals[0], [2, 2, 5])
+
+# Replay deals in the engine: the rounds pop the cards of the deals in order, instead of shuffled decks
+configurations.presetDecks = [dealer.toDeck(row) for row in deals[:10]]
+# or, in one round (before its shuffleDeck): round.presetDeck = dealer.toDeck(deals[0])
+'''
+
+import random
+from gameengine import utils
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+# Rows generated at once by iterDeals (memory: chunkSize x size of the deck random numbers)
+CHUNK_SIZE = 10000
+
+class BatchDealer(object):
+  '''
+  deck: StackOfCards (e.g. deckPrototype of the configurations of a game). Its cards are not changed.
+  seed (default None = random seed): the same seed generates the same deals.
+  '''
+
+  def __init__(self, deck, seed=None):
+    self.deck = deck.clone()
+    self.cards = list(self.deck.cards)
+    if seed is None: seed = utils.newSeed()
+    self.seed = seed
+    if numpy is not None:
+      # Seeds of 64 bits: two words of 32 bits
+      self.random = numpy.random.RandomState([seed & 0xffffffff, (seed >> 32) & 0xffffffff])
+      self.values = numpy.array([card.value for card in self.cards], dtype=numpy.int16)
+      self.suits = numpy.array([card.suit for card in self.cards], dtype=numpy.int16)
+    else:
+      self.random = random.Random(seed)
+      self.values = [card.value for card in self.cards]
+      self.suits = [card.suit for card in self.cards]
+
+  def height(self):
+    return len(self.cards)
+
+  def deal(self, numberOfDeals, numberOfCards=None):
+    '''
+    Matrix numberOfDeals x numberOfCards (default: all cards of the deck): each row is the beginning of an
+    independent uniform shuffle of the deck (indexes of the cards, without repetition in a row).
+    '''
+    if numberOfCards is None: numberOfCards = self.height()
+    if numberOfCards < 0 or numberOfCards > self.height():
+      raise ValueError('Invalid number of cards: %s (deck with %s cards)' % (numberOfCards, self.height()))
+    if numpy is not None:
+      # The order of random keys is a uniform random permutation (argsort of each row)
+      keys = self.random.random_sample((numberOfDeals, self.height()))
+      return numpy.argsort(keys, axis=1)[:, :numberOfCards].astype(numpy.int16)
+    indexes = range(self.height())
+    return [self.random.sample(indexes, numberOfCards) for x in xrange(numberOfDeals)]
+
+  def iterDeals(self, numberOfDeals, numberOfCards=None, chunkSize=CHUNK_SIZE):
+    '''
+    Generator of matrices of at most chunkSize deals, for simulations with millions of deals.
+    '''
+    while numberOfDeals > 0:
+      size = min(chunkSize, numberOfDeals)
+      yield self.deal(size, numberOfCards)
+      numberOfDeals -= size
+
+  def valuesOf(self, deals):
+    '''
+    Matrix (or row) of the values of the cards of the deals
+    '''
+    return self.__lookup(self.values, deals)
+
+  def suitsOf(self, deals):
+    '''
+    Matrix (or row) of the suits of the cards of the deals
+    '''
+    return self.__lookup(self.suits, deals)
+
+  def __lookup(self, table, deals):
+    if numpy is not None: return table[numpy.asarray(deals)]
+    if len(deals) > 0 and isinstance(deals[0], list):
+      return [[table[index] for index in row] for row in deals]
+    return [table[index] for index in deals]
+
+  def toStack(self, row):
+    '''
+    Stack of cards (same kind of the deck) with the cards of a row of a deal, in the same order
+    '''
+    stack = self.deck.newStack()
+    for index in row:
+      stack.push(self.cards[int(index)])
+    return stack
+
+  def toStacks(self, row, sizes):
+    '''
+    Consecutive parts of a row with the given sizes, e.g. toStacks(row, [2, 2, 5])
+    '''
+    stacks = []
+    start = 0
+    for size in sizes:
+      stacks.append(self.toStack(row[start:start + size]))
+      start += size
+    return stacks
+
+  def toDeck(self, row):
+    '''
+    Deck (same kind of the deck) where pop() returns the cards of the row in order and then
+    the other cards of the deck. All kinds of stacks (StackOfCards, CardSet, CardMultiset) keep the order
+    of push, and resetFrom copies it (see Round.presetDeck and Configurations.presetDecks of cardgame).
+    '''
+    dealt = set(int(index) for index in row)
+    indexes = [index for index in range(self.height()) if index not in dealt]
+    indexes.extend(int(index) for index in reversed(list(row)))
+    return self.toStack(indexes)
@@ -82,6 +82,38 @@ class RoundTest(testhelper.CardGameEngineTests):
     self.round.distributeCardsToAllPlayers(2)
     self.assertEquals(2, self.round.seeCards(self.twoplayers[0]).height())
     self.assertEquals(2, self.round.seeCards(self.twoplayers[1]).height())
+    
+  def testFinishedRoundsAreKeptByDefault(self):
+    round = testhelper.MyRound(self.game, self.twoplayers[:], self.configurations)
+    self.game.recycleRound(round)
+    self.assertEquals([round], self.game.rounds)
+    self.assertEquals(None, self.game.recycledRound)
+    
+  def testNextRoundReusesTheContainersOfTheFinishedRound(self):
+    self.configurations.recycleRounds = True
+    round = testhelper.MyRound(self.game, self.twoplayers[:], self.configurations)
+    round.distributeCardsToAllPlayers(2)
+    deck, playercards = round.deck, round.seeCards(self.twoplayers[0])
+    self.game.recycleRound(round)
+    nextRound = testhelper.MyRound(self.game, self.twoplayers[:], self.configurations)
+    self.assertTrue(nextRound.deck is deck)
+    self.assertTrue(nextRound.seeCards(self.twoplayers[0]) is playercards)
+    self.assertEquals(testhelper.deck, nextRound.deck)
+    self.assertEquals(0, playercards.height())
+    self.assertEquals(None, self.game.recycledRound)
+    self.assertEquals([], self.game.rounds)
+    
+  def testKeptRoundIsNotChangedByTheNextRound(self):
+    round = testhelper.MyRound(self.game, self.twoplayers[:], self.configurations)
+    round.distributeCardsToAllPlayers(2)
+    playercards, height = str(round.seeCards(self.twoplayers[0])), round.deck.height()
+    self.game.recycleRound(round)
+    nextRound = testhelper.MyRound(self.game, self.twoplayers[:], self.configurations)
+    nextRound.distributeCardsToAllPlayers(3)
+    self.assertEquals([round], self.game.rounds)
+    self.assertTrue(nextRound.deck is not round.deck)
+    self.assertEquals(height, round.deck.height())
+    self.assertEquals(playercards, str(round.seeCards(self.twoplayers[0])))
   
 ###############################################################################
 
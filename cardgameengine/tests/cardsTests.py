@@ -3,6 +3,9 @@
 @author: Paulo Cheque (paulocheque@gmail.com)
 '''
 
+import copy
+import pickle
+import random
 import unittest
 
 from cardgameengine import cards
@@ -40,6 +43,24 @@ class CardTest(unittest.TestCase):
     self.assertEquals('3-COPAS', str(MyCard(3, 2)))
     self.assertEquals('3-4', str(MyCard(3, 4)))
 
+  def testEqualCardsAreTheSameObject(self):
+    self.assertTrue(cards.Card(1, 2) is cards.Card(1, 2))
+    self.assertTrue(cards.Card(1, 2, 5) is not cards.Card(1, 2))
+    self.assertEquals(cards.Card(1, 2, 5), cards.Card(1, 2))
+    self.assertTrue(cards.SuitCard(1, 2) is not cards.Card(1, 2))
+    
+  def testCardsAreImmutableFlyweights(self):
+    card = cards.Card(1, 2)
+    self.assertRaises(AttributeError, setattr, card, 'value', 3)
+    self.assertTrue(copy.copy(card) is card)
+    self.assertTrue(copy.deepcopy([card])[0] is card)
+    self.assertTrue(pickle.loads(pickle.dumps(card)) is card)
+    self.assertFalse(hasattr(cards.SuitCard(1, 2), '__dict__'))
+    
+  def testHash(self):
+    self.assertEquals(hash(cards.Card(1, 2)), hash(cards.Card(1, 2, 10)))
+    self.assertEquals(1, len(set([cards.Card(1, 2), cards.Card(1, 2, 10)])))
+
 class ValueCardTest(unittest.TestCase):
   
   def testEqualsCompareOnlyValueIgnoringSuite(self):
@@ -208,6 +229,22 @@ class StackOfCards(unittest.TestCase):
     self.assertEquals(cards.strToStackOfCards('2-1'), deck.popCards([cards.Card(2, 1)]))
     self.assertEquals(cards.strToStackOfCards('3-1'), deck.popCards(deck))
     
+  def testPopCardsWithRepeatedCardsInTheRequestedOrder(self):
+    deck = cards.strToStackOfCards('1-1 2-2 1-1 3-3 1-1')
+    self.assertEquals(cards.strToStackOfCards('3-3 1-1 1-1'), deck.popCards(cards.strToStackOfCards('3-3 1-1 1-1')))
+    self.assertEquals(cards.strToStackOfCards('2-2 1-1'), deck)
+    
+  def testPopCardsMustNotRemoveAnyCardIfACardIsNotFound(self):
+    deck = cards.strToStackOfCards('1-1 2-2 3-3')
+    self.assertRaises(ValueError, deck.popCards, cards.strToStackOfCards('1-1 4-4'))
+    self.assertRaises(ValueError, deck.popCards, cards.strToStackOfCards('1-1 1-1'))
+    self.assertEquals(3, deck.height())
+    
+  def testPopCardsWithValues(self):
+    deck = cards.strToStackOfCards('1-2 0-0 4-1 2-2')
+    self.assertEquals(cards.strToStackOfCards('0-0 2-2'), deck.popCardsWithValues([0, 2]))
+    self.assertEquals(cards.strToStackOfCards('1-2 4-1'), deck)
+    
   
   def testPopCardsWithValue(self):
     deck = cards.StackOfCards()
@@ -551,6 +588,89 @@ class StackOfCards(unittest.TestCase):
                    cards.Card(2, 1) != deck.pop() or
                    cards.Card(4, 1) != deck.pop())
     
+  def testShuffleWithTheSameSeedMustBeReproducible(self):
+    deck1 = cards.DeckPrototypeBuilder.createCommonDeck(cards.Card, 4, 13)
+    deck2 = deck1.clone()
+    deck1.shuffle(random.Random(42))
+    deck2.shuffle(random.Random(42))
+    self.assertEquals(str(deck1), str(deck2))
+    
+  def testLazyShuffleMustDrawTheCardsOfACompleteShuffle(self):
+    for stackClass in [cards.StackOfCards, cards.CardSet, cards.CardMultiset]:
+      deck1 = cards.DeckPrototypeBuilder.createCommonDeck(cards.Card, 4, 13, stackClass=stackClass)
+      deck2 = deck1.clone()
+      deck1.shuffle(random.Random(42))
+      deck2.shuffle(random.Random(42), lazy=True)
+      self.assertEquals([deck1.pop() for x in range(10)], [deck2.pop() for x in range(10)])
+      self.assertEquals(42, deck2.height())
+      self.assertEquals(str(deck1), str(deck2))
+      self.assertEquals(0, deck2.unshuffled)
+    
+  def testLazyShuffleMustUseTheRandomNumbersOfACompleteShuffle(self):
+    for numberOfPops in [0, 10, 51, 52]:
+      deck1 = cards.DeckPrototypeBuilder.createCommonDeck(cards.Card, 4, 13)
+      deck2 = deck1.clone()
+      rng1, rng2 = random.Random(42), random.Random(42)
+      deck1.shuffle(rng1)
+      deck2.shuffle(rng2, lazy=True)
+      popped1 = [deck1.pop() for x in range(numberOfPops)]
+      popped2 = [deck2.pop() for x in range(numberOfPops)]
+      deck2.finishShuffle()
+      self.assertEquals(popped1 + deck1.cards, popped2 + deck2.cards)
+      self.assertEquals(rng1.getstate(), rng2.getstate())
+    
+  def testLazyShuffleWithCardsPushedAfterTheShuffle(self):
+    deck = cards.DeckPrototypeBuilder.createCommonDeck(cards.Card, 4, 13, stackClass=cards.CardSet)
+    deck.shuffle(random.Random(1), lazy=True)
+    card = deck.pop()
+    deck.push(card)
+    self.assertEquals(card, deck.pop())
+    deck.push(card)
+    hands = [cards.CardSet(), cards.CardSet()]
+    cards.distributeCards(deck, hands, 2)
+    self.assertEquals(48, deck.height())
+    self.assertEquals(52, deck.union(hands[0]).union(hands[1]).height())
+    deck.sort()
+    self.assertEquals(0, deck.unshuffled)
+    
+  def testCopiesOfALazilyShuffledDeckMustHaveTheShuffledOrder(self):
+    for stackClass in [cards.StackOfCards, cards.CardSet, cards.CardMultiset]:
+      prototype = cards.DeckPrototypeBuilder.createCommonDeck(cards.Card, 4, 13, stackClass=stackClass)
+      shuffled = prototype.clone()
+      shuffled.shuffle(random.Random(7))
+      deck = prototype.clone()
+      deck.shuffle(random.Random(7), lazy=True)
+      deck.pop()
+      copy = stackClass()
+      copy.pushAll(deck)
+      self.assertEquals(shuffled.cards[:-1], copy.cards)
+      self.assertTrue(deck.containsAllCards(shuffled.cards[:-1]))
+      self.assertEquals(shuffled.cards[:-1], cards.CardSet().union(deck).cards)
+    
+  def testLazyShuffleFollowedByResetAndClear(self):
+    for stackClass in [cards.CardSet, cards.CardMultiset]:
+      prototype = cards.DeckPrototypeBuilder.createCommonDeck(cards.Card, 4, 13, stackClass=stackClass)
+      deck = prototype.clone()
+      deck.shuffle(random.Random(1), lazy=True)
+      deck.pop()
+      deck.clear()
+      deck.push(cards.Card(1, 1))
+      deck.push(cards.Card(2, 1))
+      self.assertEquals(cards.Card(1, 1), deck.popIndex(0))
+      deck.resetFrom(prototype)
+      deck.shuffle(random.Random(1), lazy=True)
+      deck.pop()
+      deck.resetFrom(prototype)
+      self.assertEquals(0, deck.unshuffled)
+      self.assertEquals(prototype.cards, deck.cards)
+      # The source stack finishes its pending shuffle
+      other = prototype.clone()
+      other.shuffle(random.Random(2), lazy=True)
+      deck.resetFrom(other)
+      self.assertEquals(0, other.unshuffled)
+      self.assertEquals(other.cards, deck.cards)
+      self.assertEquals(52, deck.height())
+    
   def testAllCardsWithSameValue(self):
     deck = cards.StackOfCards()
     self.assertTrue(deck.allCardsWithSameValue())
@@ -746,6 +866,21 @@ class StackOfCards(unittest.TestCase):
     combinations = stack.allCombinationsOfCards()
     self.assertEquals(32767, len(combinations))
     
+  def testIterCombinationsInTheOrderOfAllCombinations(self):
+    stack = cards.strToStackOfCards('3-1 4-1 5-1 6-2')
+    self.assertEquals([combination.cards for combination in stack.allCombinationsOfCards(2, 3)],
+                      [list(combination) for combination in stack.iterCombinationsOfCards(2, 3)])
+    self.assertEquals([], list(stack.iterCombinationsOfCards(4, 5)))
+    
+  def testIterCombinationsWithPredicateAndEarlyTermination(self):
+    stack = cards.strToStackOfCards('3-1 4-1 5-1 6-2')
+    sameSuit = lambda combination: len(set(card.suit for card in combination)) == 1
+    self.assertEquals(['3-1 4-1', '3-1 5-1', '4-1 5-1', '3-1 4-1 5-1'],
+                      [' '.join(map(str, c)) for c in stack.iterCombinationsOfCards(2, 3, sameSuit)])
+    cardsString = ' '.join([(str(i) + '-1') for i in range(1, 30+1)])
+    combinations = cards.strToStackOfCards(cardsString).iterCombinationsOfCards(10, 20)
+    self.assertEquals(10, len(next(combinations)))
+    
 class DeckPrototypeTest(unittest.TestCase):
   
   def testCloneForEmptyDeck(self):
@@ -926,6 +1061,146 @@ class StringToStackTests(unittest.TestCase):
     
     
   
+class CardSetTests(unittest.TestCase):
+  
+  def setUp(self):
+    self.deck = cards.DeckPrototypeBuilder.createCommonDeck(cards.Card, 4, 13, stackClass=cards.CardSet)
+    self.hand = cards.CardSet()
+    self.hand.pushAll([cards.Card(1, 1), cards.Card(1, 2), cards.Card(5, 2)])
+    
+  def testDeckPrototypeBuilderWithCardSet(self):
+    self.assertTrue(isinstance(self.deck, cards.CardSet))
+    self.assertEquals(52, self.deck.height())
+    self.assertEquals(13, self.deck.numberOfCardsWithSuit(2))
+    self.assertEquals(4, self.deck.numberOfCardsWithValue(7))
+    self.assertTrue(isinstance(self.deck.clone(), cards.CardSet))
+    self.assertTrue(isinstance(self.deck.newStack(), cards.CardSet))
+    
+  def testSameBehaviourOfStackOfCards(self):
+    self.assertTrue(self.hand.containsCard(cards.Card(5, 2)))
+    self.assertFalse(self.hand.containsCard(cards.Card(5, 1)))
+    self.assertTrue(self.hand.containsAllCards([cards.Card(1, 2), cards.Card(1, 1)]))
+    self.assertFalse(self.hand.containsAllCards([cards.Card(1, 2), cards.Card(20, 1)]))
+    self.assertTrue(self.hand.containsCardWithValue(1))
+    self.assertFalse(self.hand.containsCardWithSuit(3))
+    self.assertEquals(1, self.hand.numberOfCards(cards.Card(1, 1)))
+    self.assertEquals(2, self.hand.numberOfCardsWithValue(1))
+    self.assertEquals(cards.Card(1, 2), self.hand.popCard(cards.Card(1, 2)))
+    self.assertFalse(self.hand.containsCard(cards.Card(1, 2)))
+    self.assertEquals(cards.Card(5, 2), self.hand.pop())
+    self.assertEquals('1-1', str(self.hand.popCardsWithValue(1)))
+    self.assertEquals(0, self.hand.mask)
+    self.assertTrue(self.hand.isEmpty())
+    
+  def testMaskMustFollowTheCards(self):
+    self.deck.shuffle()
+    self.deck.popIndex(3)
+    self.deck.popCardsWithSuit(1)
+    self.assertEquals(self.deck.layout.mask(self.deck.cards), self.deck.mask)
+    self.deck.popAll()
+    self.assertEquals(0, self.deck.mask)
+    
+  def testRepeatedAndInvalidCards(self):
+    self.assertRaises(ValueError, self.hand.push, cards.Card(1, 1))
+    self.assertRaises(ValueError, self.hand.push, cards.Card(15, 1))
+    self.assertRaises(ValueError, self.hand.popCard, cards.Card(2, 1))
+    self.assertRaises(ValueError, cards.DeckPrototypeBuilder.createCommonDeck, 
+                      cards.Card, 4, 13, 2, stackClass=cards.CardSet)
+    
+  def testUnionIntersectionAndDifference(self):
+    other = cards.CardSet()
+    other.pushAll([cards.Card(5, 2), cards.Card(7, 3)])
+    self.assertEquals('1-1 1-2 5-2 7-3', str(self.hand.union(other)))
+    self.assertEquals('5-2', str(self.hand.intersection(other)))
+    self.assertEquals('1-1 1-2', str(self.hand.difference(other)))
+    self.assertEquals('1-1 1-2 5-2 7-3', str(self.hand | other))
+    self.assertEquals('5-2', str(self.hand & [cards.Card(5, 2)]))
+    self.assertEquals('1-2 5-2', str(self.hand - cards.Card(1, 1)))
+    self.assertEquals(3, self.hand.height())
+    
+  def testBulkRemovalMustUpdateTheMask(self):
+    self.assertEquals('1-2 1-1', str(self.hand.popCards([cards.Card(1, 2), cards.Card(1, 1)])))
+    self.assertFalse(self.hand.containsCardWithValue(1))
+    self.assertTrue(self.hand.containsCard(cards.Card(5, 2)))
+    self.assertEquals('5-2', str(self.hand.popCardsWithSuit(2)))
+    self.assertEquals(0, self.hand.mask)
+    
+  def testResetFromThePrototype(self):
+    deck = cards.DeckPrototypeBuilder.createCommonDeck(cards.Card, 4, 13, stackClass=cards.CardSet)
+    self.hand.resetFrom(deck)
+    self.assertEquals(deck, self.hand)
+    self.assertEquals(4, self.hand.numberOfCardsWithValue(7))
+    self.hand.clear()
+    self.assertEquals(0, self.hand.height())
+    self.assertFalse(self.hand.containsCardWithValue(1))
+    
+class CardMultisetTests(unittest.TestCase):
+  
+  def setUp(self):
+    self.deck = cards.DeckPrototypeBuilder.createCommonDeck(cards.Card, 4, 13, 2, 2, stackClass=cards.CardMultiset)
+    self.hand = cards.CardMultiset()
+    self.hand.pushAll(cards.strToStackOfCards('1-1 1-1 5-2 0-0'))
+    
+  def testDeckWithTwoDecksAndJokers(self):
+    self.assertTrue(isinstance(self.deck, cards.CardMultiset))
+    self.assertEquals(108, self.deck.height())
+    self.assertEquals(2, self.deck.numberOfCards(cards.Card(7, 3)))
+    self.assertEquals(8, self.deck.numberOfCardsWithValue(7))
+    self.assertEquals(4, self.deck.numberOfCardsWithValue(0))
+    self.assertEquals(26, self.deck.numberOfCardsWithSuit(1))
+    self.assertTrue(isinstance(self.deck.clone(), cards.CardMultiset))
+    
+  def testRepeatedCards(self):
+    self.assertEquals(2, self.hand.numberOfCards(cards.Card(1, 1)))
+    self.assertTrue(self.hand.containsAllCards(cards.strToStackOfCards('1-1 1-1')))
+    self.assertFalse(self.hand.containsAllCards(cards.strToStackOfCards('5-2 5-2')))
+    self.assertFalse(self.hand.containsAllCards([cards.Card(1, 1), cards.Card(-1, 1)]))
+    self.assertEquals(cards.Card(1, 1), self.hand.popCard(cards.Card(1, 1)))
+    self.assertEquals(1, self.hand.numberOfCards(cards.Card(1, 1)))
+    self.assertFalse(self.hand.containsAllCards(cards.strToStackOfCards('1-1 1-1')))
+    self.assertRaises(ValueError, self.hand.popCard, cards.Card(3, 3))
+    
+  def testCountsMustFollowTheCards(self):
+    self.assertEquals('0-0', str(self.hand.popCardsWithValue(0)))
+    self.assertEquals(0, self.hand.numberOfCardsWithSuit(0))
+    self.assertEquals(cards.Card(5, 2), self.hand.pop())
+    self.assertEquals(2, self.hand.numberOfCardsWithSuit(1))
+    self.hand.popAll()
+    self.assertEquals(0, self.hand.numberOfCardsWithValue(1))
+    self.assertFalse(self.hand.containsCardWithSuit(1))
+    
+  def testSameCardsInAnyOrder(self):
+    self.assertTrue(self.hand.sameCardsAs(cards.strToStackOfCards('0-0 5-2 1-1 1-1')))
+    self.assertFalse(self.hand.sameCardsAs(cards.strToStackOfCards('0-0 5-2 1-1')))
+    self.assertFalse(self.hand.sameCardsAs(cards.strToStackOfCards('0-0 5-2 1-1 1-2')))
+    
+  def testLayoutGrowsWithGreaterCards(self):
+    self.hand.push(cards.Card(20, 6))
+    self.assertEquals(1, self.hand.numberOfCards(cards.Card(20, 6)))
+    self.assertEquals(2, self.hand.numberOfCards(cards.Card(1, 1)))
+    self.assertRaises(ValueError, self.hand.push, cards.Card(-1, 1))
+    self.assertEquals(5, self.hand.height())
+    
+  def testBulkRemovalMustUpdateTheCounts(self):
+    self.hand.popCards(cards.strToStackOfCards('1-1 0-0'))
+    self.assertEquals(1, self.hand.numberOfCards(cards.Card(1, 1)))
+    self.assertFalse(self.hand.containsCardWithValue(0))
+    self.assertEquals('1-1 5-2', str(self.hand))
+    self.assertEquals('1-1', str(self.hand.popCardsWithValues([1, 2])))
+    self.assertEquals(0, self.hand.numberOfCardsWithSuit(1))
+    
+  def testResetFromThePrototype(self):
+    cardsOfTheHand = self.hand.cards
+    self.hand.resetFrom(self.deck)
+    self.assertTrue(self.hand.cards is cardsOfTheHand)
+    self.assertEquals(108, self.hand.height())
+    self.assertEquals(2, self.hand.numberOfCards(cards.Card(7, 3)))
+    self.hand.pop()
+    self.assertEquals(108, self.deck.height())
+    self.hand.resetFrom(cards.strToStackOfCards('1-1 1-1'))
+    self.assertEquals(2, self.hand.numberOfCards(cards.Card(1, 1)))
+    self.assertEquals(0, self.hand.numberOfCardsWithValue(7))
+    
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
     unittest.main()
\ No newline at end of file
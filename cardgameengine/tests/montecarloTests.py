@@ -0,0 +1,105 @@
+'''
+
+@author: Paulo Cheque (paulocheque@gmail.com)
+'''
+
+import random
+import unittest
+
+from cardgameengine import cards, montecarlo
+from gameengine import players
+from cardgames import simplepokertexasholdem
+
+class BatchDealerTests(unittest.TestCase):
+
+  def setUp(self):
+    self.deck = cards.DeckPrototypeBuilder.createCommonDeck(cards.Card, 4, 13, stackClass=cards.CardSet)
+    self.dealer = montecarlo.BatchDealer(self.deck, seed=42)
+
+  def testDealsWithoutRepeatedCards(self):
+    deals = self.dealer.deal(100, 9)
+    self.assertEquals(100, len(deals))
+    for row in deals:
+      self.assertEquals(9, len(row))
+      self.assertEquals(9, len(set(int(index) for index in row)))
+    self.assertEquals(52, len(self.dealer.deal(1)[0]))
+    self.assertRaises(ValueError, self.dealer.deal, 1, 53)
+
+  def testTheSameSeedMustGenerateTheSameDeals(self):
+    other = montecarlo.BatchDealer(self.deck, seed=42)
+    self.assertEquals([list(row) for row in self.dealer.deal(5, 9)], [list(row) for row in other.deal(5, 9)])
+
+  def testAllCardsMustBeDealtUniformly(self):
+    counts = [0] * 52
+    for deals in self.dealer.iterDeals(5200, 1, chunkSize=1000):
+      for row in deals:
+        counts[int(row[0])] += 1
+    # 100 expected for each card
+    self.assertTrue(min(counts) > 50 and max(counts) < 150, counts)
+
+  def testValuesAndSuits(self):
+    row = self.dealer.deal(1, 5)[0]
+    stack = self.dealer.toStack(row)
+    self.assertEquals([card.value for card in stack.cards], [int(value) for value in self.dealer.valuesOf(row)])
+    self.assertEquals([card.suit for card in stack.cards], [int(suit) for suit in self.dealer.suitsOf(row)])
+
+  def testStacksOfADeal(self):
+    row = self.dealer.deal(1, 9)[0]
+    player1, player2, community = self.dealer.toStacks(row, [2, 2, 5])
+    self.assertTrue(isinstance(player1, cards.CardSet))
+    self.assertEquals([2, 2, 5], [player1.height(), player2.height(), community.height()])
+    self.assertEquals(self.dealer.toStack(row[2:4]), player2)
+
+  def testDeckToReplayADeal(self):
+    row = self.dealer.deal(1, 9)[0]
+    deck = self.dealer.toDeck(row)
+    self.assertEquals(52, deck.height())
+    self.assertEquals(self.dealer.toStack(row).cards, [deck.pop() for x in range(9)])
+    self.assertEquals(52, self.deck.height())
+
+class BatchDealerReplayTests(unittest.TestCase):
+  
+  def replay(self, deck):
+    dealer = montecarlo.BatchDealer(deck, seed=7)
+    row = dealer.deal(1, 9)[0]
+    # A recycled deck of a round that was lazily shuffled, reset from the deal (see the module example)
+    roundDeck = deck.clone()
+    roundDeck.shuffle(random.Random(1), lazy=True)
+    roundDeck.pop()
+    roundDeck.resetFrom(dealer.toDeck(row))
+    self.assertEquals(deck.__class__, roundDeck.__class__)
+    self.assertEquals(52, roundDeck.height())
+    self.assertEquals(dealer.toStack(row).cards, [roundDeck.pop() for x in range(9)])
+    
+  def testReplayWithTheCardSetDeckOfTheSimpleTexasHoldem(self):
+    deck = simplepokertexasholdem.Configurations().deckPrototype
+    self.assertTrue(isinstance(deck, cards.CardSet))
+    self.replay(deck)
+    
+  def testReplayWithAStackOfCardsDeck(self):
+    self.replay(cards.DeckPrototypeBuilder.createCommonDeck(cards.Card, 4, 13))
+    
+  def testRoundsOfAGameMustDealTheCardsOfTheReplayedDeals(self):
+    # Chips for 2 rounds (at least)
+    configurations = simplepokertexasholdem.Configurations(amountOfChipsPerPlayer=20, roundsPrice=10)
+    configurations.preflopTable = None
+    dealer = montecarlo.BatchDealer(configurations.deckPrototype, seed=7)
+    deals = dealer.deal(2, 9)
+    configurations.presetDecks = [dealer.toDeck(row) for row in deals]
+    gamePlayers = [players.Player('Player%s' % i, strategy=simplepokertexasholdem.Strategy(),
+                                  contextClass=simplepokertexasholdem.Context) for i in range(2)]
+    game = simplepokertexasholdem.SimpleCommunityPoker(gamePlayers, configurations)
+    game.start()
+    self.assertTrue(len(game.rounds) >= 2)
+    for round, row in zip(game.rounds, deals):
+      holeCards, communityCards = dealer.toStacks(row, [4, 5])
+      dealtCards = []
+      for player in game.initialPlayers:
+        self.assertEquals(2, round.seeCards(player).height())
+        dealtCards += round.seeCards(player).cards
+      self.assertEquals(sorted(holeCards.cards), sorted(dealtCards))
+      self.assertEquals(communityCards.cards, round.communityCards.cards)
+    
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -14,6 +14,7 @@ from cardgameengine.constants import *
 # [optional] 1): Define the kind of Cards that your game has
 
 class BlackJackCard(cards.ValueCard):
+  __slots__ = ()
   
   values = cards.VALUES_ANGLO_AMERICAN
   suits = cards.SUITS_ANGLO_AMERICAN
@@ -168,7 +169,7 @@ class BlackJackRound(cardgame.Round):
     context.playersPoints = self.game.playersPoints
 
   def organize(self):
-    self.deck.shuffle()
+    self.shuffleDeck()
     self.distributeCardsToAllPlayers(1)
   
   def end(self): pass
@@ -12,9 +12,13 @@ from cardgameengine import cardgame, cards
 # [optional] 1): Define the kind of Cards that your game has
 
 class Card(cards.SuitCard):
+  __slots__ = ()
   values = cards.VALUES_ANGLO_AMERICAN
   suits = cards.SUITS_ANGLO_AMERICAN
   
+# Values of the jokers: the joker (0) and the 2
+JOKERS = (0, 2)
+  
 ###############################################################################
 # [optional] 2) Define configurations of the game
 
@@ -29,7 +33,9 @@ class Configurations(cardgame.Configurations):
       if value >= 8 and value <= 13: return 10
       return 0
       
-    deckPrototype = cards.DeckPrototypeBuilder.createCommonDeck(Card, 4, 13, 2, 2, scoreFunction)
+    # Two decks and jokers: the deck and the hands are multisets (StackOfCards of the Hole)
+    deckPrototype = cards.DeckPrototypeBuilder.createCommonDeck(Card, 4, 13, 2, 2, scoreFunction, 
+                                                                stackClass=StackOfCards)
     super(Configurations, self).__init__(deckPrototype, timeForCommand, timeForPlay, timeForGame)
     
     self.maximumScore = maximumScore
@@ -71,29 +77,47 @@ class Context(cardgame.Context):
   def notifyGameOfRoundsCommand(self, event): pass
     
   def notifyRoundCommand(self, event):
+    '''
+    Only the attributes changed by the command are refreshed (see GameCommand.changes).
+    Strategies must not change the model: cards are deep copied, the others are copies of strings and numbers.
+    '''
     round = event.game
     if round != None:
-      self.teamsScores = copy.deepcopy(round.game.teamsScores)
-      self.deckHeight = round.deck.height()
-      for player in round.players:
-        self.numberOfCardsOfAnothersPlayers[player.name] = round.seeCards(player).height()
-        if player.team.name not in self.numberOfCardsOfAnothersTeams:
-          self.numberOfCardsOfAnothersTeams[player.team.name] = 0
-        self.numberOfCardsOfAnothersTeams[player.team.name] += round.seeCards(player).height()
-      self.discardedCards = StackOfCards(copy.deepcopy(round.discardedCards))
-      self.teamsCombinations = copy.deepcopy(round.teamsCombinations)
-      self.numberOfDeads = len(round.deads)
-      self.teamsHaveAlreadyHit = copy.deepcopy(round.teamsHaveAlreadyHit)
-      self.playersHaveAlreadyHit = copy.deepcopy(round.playersHaveAlreadyHit)
-      self.currentPlayerHasAlreadyGetCards = round.currentPlayerHasAlreadyGetCards
-      self.currentPlayerHasAlreadyDiscarded = round.currentPlayerHasAlreadyDiscarded
+      if self.hasChanged(event, 'teamsScores'):
+        self.teamsScores = dict(round.game.teamsScores)
+      if self.hasChanged(event, 'deckHeight'):
+        self.deckHeight = round.deck.height()
+      if self.hasChanged(event, 'numberOfCardsOfAnothersPlayers'):
+        self.numberOfCardsOfAnothersPlayers = {}
+        self.numberOfCardsOfAnothersTeams = {}
+        for player in round.players:
+          numberOfCards = round.seeCards(player).height()
+          self.numberOfCardsOfAnothersPlayers[player.name] = numberOfCards
+          self.numberOfCardsOfAnothersTeams[player.team.name] = \
+            self.numberOfCardsOfAnothersTeams.get(player.team.name, 0) + numberOfCards
+      if self.hasChanged(event, 'discardedCards'):
+        self.discardedCards = StackOfCards(copy.deepcopy(round.discardedCards))
+      if self.hasChanged(event, 'teamsCombinations'):
+        self.teamsCombinations = copy.deepcopy(round.teamsCombinations)
+      if self.hasChanged(event, 'numberOfDeads'):
+        self.numberOfDeads = len(round.deads)
+      if self.hasChanged(event, 'teamsHaveAlreadyHit'):
+        self.teamsHaveAlreadyHit = list(round.teamsHaveAlreadyHit)
+      if self.hasChanged(event, 'playersHaveAlreadyHit'):
+        self.playersHaveAlreadyHit = list(round.playersHaveAlreadyHit)
+      if self.hasChanged(event, 'currentPlayerHasAlreadyGetCards'):
+        self.currentPlayerHasAlreadyGetCards = round.currentPlayerHasAlreadyGetCards
+      if self.hasChanged(event, 'currentPlayerHasAlreadyDiscarded'):
+        self.currentPlayerHasAlreadyDiscarded = round.currentPlayerHasAlreadyDiscarded
+      # cardgame.Context refreshes playercards in every command
       self.playercards = StackOfCards(self.playercards)
     
-  def notifyPlayerCommand(self, event):
-    self.notifyRoundCommand(event)
+  # Player commands are game commands too: notifyRoundCommand has already been called
+  def notifyPlayerCommand(self, event): pass
   
 #    print('NAOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOOO')
       
+# Changes of each command (GameCommand.changes):
 #  start round: deckHeight, numberOfCardsOfAnothersPlayers, discardedCards, 
 #  teamsCombinations, numberOfDeads, teamsHaveAlreadyHit, playersHaveAlreadyHit, currentPlayerHasAlreadyGetCards
 #  currentPlayerHasAlreadyDiscarded, playercards
@@ -127,7 +151,7 @@ class GameReport(cardgame.GameReport):
 class Game(cardgame.Game):
 
   def __init__(self, players, configurations):
-    commandsManager = commands.SynchronousCommandsManager()
+    commandsManager = commands.SynchronousCommandsManager(inlineTrustedCommands=True)
     commandsManager.registerCommand(GetOneCardOfTheDeckCommand)
     commandsManager.registerCommand(GetDiscardedCardsCommand)
     commandsManager.registerCommand(DiscardCommand)
@@ -183,7 +207,7 @@ class Round(cardgame.Round):
     super(Round, self).__init__(game, players, configurations, commandsManager,
                                RoundReport(), StartGameRoundCommand(), 
                                EndGameRoundCommand(), PlayerPlaysGameRoundCommand())
-    self.discardedCards = cards.StackOfCards()
+    self.discardedCards = self.reuseStack(self.recycled('discardedCards'))
     self.teamsCombinations = {} # { team => [stack]}
     self.deads = []
     self.teamsHaveAlreadyHit = []
@@ -191,8 +215,11 @@ class Round(cardgame.Round):
     self.currentPlayerHasAlreadyGetCards = False
     self.currentPlayerHasAlreadyDiscarded = False
     
+    recycledDeads = self.recycled('deads', [])
     for x in range(self.configurations.numberOfDeads):
-      self.deads.append(cards.StackOfCards())
+      dead = None
+      if x < len(recycledDeads): dead = recycledDeads[x]
+      self.deads.append(self.reuseStack(dead))
       
     for player in players:
       if not player.team.name in self.teamsCombinations:
@@ -222,16 +249,22 @@ class Round(cardgame.Round):
 ###############################################################################
 # [required] 6): Define game's commands
 
+# Context attributes changed by commands (see Context.notifyRoundCommand)
+CARDS_CHANGES = ('numberOfCardsOfAnothersPlayers',)
+HIT_CHANGES = ('numberOfDeads', 'teamsHaveAlreadyHit', 'playersHaveAlreadyHit')
+
 class StartGameRoundCommand(gameofrounds.StartGameRoundCommand):
   
   def execute(self, round):
-    round.deck.shuffle()
+    round.shuffleDeck()
     round.distributeCardsToAllPlayers(11)
     cards.distributeCards(round.deck, round.deads, 11)
     # como diferenciar primeiro round dos demais? organize? # FIXME context first round
     
 class EndGameRoundCommand(gameofrounds.EndGameRoundCommand):
   
+  changes = ('teamsScores',)
+  
   def execute(self, round):
     for player,cards in round.playersCards:
       round.game.sumScore(player.team, - cards.score())
@@ -244,6 +277,8 @@ class EndGameRoundCommand(gameofrounds.EndGameRoundCommand):
     
 class PlayerPlaysGameRoundCommand(game.PlayerPlaysGameCommand):
   
+  changes = ('currentPlayerHasAlreadyGetCards', 'currentPlayerHasAlreadyDiscarded')
+  
   def execute(self, round):
     round.currentPlayerHasAlreadyGetCards = False
     round.currentPlayerHasAlreadyDiscarded = False
@@ -281,6 +316,8 @@ class CheatError(errors.CheatCommandError):
 
 class GetOneCardOfTheDeckCommand(cardgame.PlayerCommand):
   
+  changes = CARDS_CHANGES + ('deckHeight', 'currentPlayerHasAlreadyGetCards')
+  
   def validate(self, context):
     if context.currentPlayerHasAlreadyGetCards: raise GetCardsError(self)
     if context.deckHeight == 0: raise EmptyDeckError(self)
@@ -291,6 +328,8 @@ class GetOneCardOfTheDeckCommand(cardgame.PlayerCommand):
     
 class GetDiscardedCardsCommand(cardgame.PlayerCommand):
   
+  changes = CARDS_CHANGES + ('discardedCards', 'currentPlayerHasAlreadyGetCards')
+  
   def validate(self, context):
     if context.currentPlayerHasAlreadyGetCards: raise GetCardsError(self)
     if context.discardedCards.height() == 0: raise DiscardedCardsEmptyError(self)
@@ -302,6 +341,8 @@ class GetDiscardedCardsCommand(cardgame.PlayerCommand):
 
 class DiscardCommand(cardgame.PlayerCommand):
   
+  changes = CARDS_CHANGES + HIT_CHANGES + ('discardedCards', 'currentPlayerHasAlreadyDiscarded')
+  
   def validate(self, context):
     if not context.currentPlayerHasAlreadyGetCards: raise NotGetCardsError(self)
     if context.currentPlayerHasAlreadyDiscarded: raise DiscardCardsError(self)
@@ -317,6 +358,8 @@ class DiscardCommand(cardgame.PlayerCommand):
     
 class MakeNewCombinationCommand(cardgame.PlayerCommand):
   
+  changes = CARDS_CHANGES + HIT_CHANGES + ('teamsCombinations',)
+  
   def validate(self, context):
     selectedCards = self.params
     aux = StackOfCards()
@@ -331,14 +374,16 @@ class MakeNewCombinationCommand(cardgame.PlayerCommand):
   
   def call(self, game, round, playercards):
     selectedCards = self.params
-    newCombination = cards.StackOfCards()
-    newCombination.pushAll(playercards.popCards(selectedCards))
+    # One pass over the cards of the player
+    newCombination = playercards.popCards(selectedCards)
     newCombination.sortByValueAndSuit()
     round.addNewCombination(self.player, newCombination)
     if playercards.height() == 0: round.hit(player)
     
 class PutCardsInCombinationCommand(cardgame.PlayerCommand):
   
+  changes = CARDS_CHANGES + HIT_CHANGES + ('teamsCombinations',)
+  
   def validate(self, context):
     combinationIndex = self.params[0]
     selectedCards = cards.StackOfCards()
@@ -521,19 +566,20 @@ class Strategy(players.Strategy):
 ###############################################################################
 # [optional] 9) Another classes (custom) to encapsulate things and algorithms. 
 
-class StackOfCards(cards.StackOfCards):
+class StackOfCards(cards.CardMultiset):
+  '''
+  Multiset of cards (two decks and jokers) with the rules of the combinations.
+  StackOfCards(stack) is a copy of the stack.
+  '''
 
-  def __init__(self, stack=None):
+  def __init__(self, stack=None, layout=cards.STANDARD_LAYOUT):
+    super(StackOfCards, self).__init__(layout)
     if stack != None:
-      self.cards = stack.cards
-    else:
-      self.cards = []
+      self.pushAll(stack)
 
   def isSequenceWithSameSuit(self):
     if self.allCardsInSequenceWithSameSuit(): return True
-    c = cards.StackOfCards()
-    c.pushAll(self.cards)
-  #  c = stack.clone()
+    c = self.clone()
     c.sortByValue()
     # Q K AS
     if c.containsCardWithValue(1): # AS
@@ -544,14 +590,11 @@ class StackOfCards(cards.StackOfCards):
   
   def isSequenceWithSameSuitWithOneJoker(self):
     if self.isSequenceWithSameSuit(): return False
-    c = cards.StackOfCards()
-    c.pushAll(self.cards)
-  #  c = self.clone()
+    c = self.clone()
     c.sortByValue()
     numberOfJokers = c.numberOfCardsWithValue(0) + c.numberOfCardsWithValue(2)
     if numberOfJokers == 1:
-      c.popCardsWithValue(2)
-      c.popCardsWithValue(0)
+      c.popCardsWithValues(JOKERS)
       if c.allCardsInSequenceWithSameSuitWithJokers(1): return True
       # Q K AS
       if c.containsCardWithValue(1): # AS
@@ -580,12 +623,9 @@ class StackOfCards(cards.StackOfCards):
     return self.allCardsWithSameValue()
   
   def isCombinationWithSameValueWithOneJoker(self):
-    c = cards.StackOfCards()
-    c.pushAll(self.cards)
-  #  c = self.clone()
+    c = self.clone()
     numberOfJokers = c.numberOfCardsWithValue(0) + c.numberOfCardsWithValue(2)
-    c.popCardsWithValue(2)
-    c.popCardsWithValue(0)
+    c.popCardsWithValues(JOKERS)
     return c.allCardsWithSameValue() and numberOfJokers == 1
   
   def isValidCombination(self):
@@ -631,15 +671,20 @@ class StackOfCards(cards.StackOfCards):
   # Utils
   
   def allValidCombinationOfCards(self):
-    combinations = self.allCombinationsOfCards(3, 7)
-    validCombinations = []
-    for combination in combinations:
-      combination = StackOfCards(combination)
-      if combination.isValidCombination():
-        validCombinations.append(combination)
+    validCombinations = list(self.iterValidCombinationOfCards())
     self.orderCombinationsByNumberOfCardsAndScore(validCombinations)
     return validCombinations
   
+  def iterValidCombinationOfCards(self, min=3, max=7):
+    '''
+    Generator of the valid combinations (StackOfCards). Only the combinations that pass the cheap test 
+    of mayBeValidCombination become stacks to be validated.
+    '''
+    for cardsOfCombination in self.iterCombinationsOfCards(min, max, mayBeValidCombination):
+      combination = StackOfCards(cardsOfCombination)
+      if combination.isValidCombination():
+        yield combination
+  
   @staticmethod
   def orderCombinationsByScore(listOfStacks):
     def keyfunction(stack): return stack.score()
@@ -661,6 +706,27 @@ class StackOfCards(cards.StackOfCards):
     listOfStacks.sort(key=keyfunction)
 
 
+def mayBeValidCombination(combination):
+  '''
+  Necessary condition of a valid combination (tuple of cards): ignoring the jokers (0 and 2), all cards 
+  have the same value or all cards have the same suit and different values (except the AS: AS 2 3 ... K AS)
+  '''
+  first = None
+  sameValue = sameSuit = True
+  values = 0
+  for card in combination:
+    if card.value == 0 or card.value == 2: continue
+    if first is None: 
+      first = card
+    else:
+      if card.value != first.value: sameValue = False
+      if card.suit != first.suit: sameSuit = False
+      if not sameValue and not sameSuit: return False
+    bit = 1 << card.value
+    if values & bit and card.value != 1: sameSuit = False
+    values |= bit
+  return sameValue or sameSuit
+
 ###############################################################################
 # [required] 10) Define a factory
 
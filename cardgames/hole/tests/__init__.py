@@ -3,9 +3,11 @@
 @author: Paulo Cheque (paulocheque@gmail.com)
 '''
 
+import random
+import timeit
 import unittest
 
-from gameengine import commands, players, errors
+from gameengine import game, commands, players, errors
 from cardgameengine.constants import *
 from cardgameengine import cardgame, cards
 
@@ -106,6 +108,46 @@ class HolePlayerContextTests(GameTestsHelper):
   def testSummary(self):
     self.context.summary()
     
+  def notify(self, command):
+    self.context.notify(game.CommandEvent(self.round, command))
+    
+  def testCommandWithoutChangesMustRefreshAllAttributes(self):
+    self.round.discardedCards.push(hole.Card(3, 1))
+    self.round.currentPlayerHasAlreadyGetCards = True
+    self.notify(hole.StartGameRoundCommand())
+    self.assertEquals(self.round.deck.height(), self.context.deckHeight)
+    self.assertEquals(1, self.context.discardedCards.height())
+    self.assertEquals(True, self.context.currentPlayerHasAlreadyGetCards)
+    self.assertEquals(2, self.context.numberOfDeads)
+    
+  def testOnlyTheChangesOfTheCommandMustBeRefreshed(self):
+    self.notify(hole.StartGameRoundCommand())
+    deckHeight = self.context.deckHeight
+    self.round.deck.pop()
+    self.round.currentPlayerHasAlreadyGetCards = True
+    self.notify(hole.PlayerPlaysGameRoundCommand())
+    self.assertEquals(deckHeight, self.context.deckHeight)
+    self.assertEquals(True, self.context.currentPlayerHasAlreadyGetCards)
+    self.notify(self.getCardCommand)
+    self.assertEquals(deckHeight - 1, self.context.deckHeight)
+    
+  def testNumberOfCardsOfAnothersTeamsMustNotBeAccumulated(self):
+    self.round.distributeCardsToAllPlayers(11)
+    self.notify(self.getCardCommand)
+    self.notify(self.getCardCommand)
+    self.assertEquals({'Player1': 11, 'Player2': 11}, self.context.numberOfCardsOfAnothersPlayers)
+    self.assertEquals({'Player1': 11, 'Player2': 11}, self.context.numberOfCardsOfAnothersTeams)
+    
+  def testStrategiesMustNotChangeTheModelThroughTheContext(self):
+    self.round.discardedCards.push(hole.Card(3, 1))
+    self.notify(hole.StartGameRoundCommand())
+    self.context.discardedCards.pop()
+    self.context.teamsHaveAlreadyHit.append('Player1')
+    self.context.teamsScores['Player1'] = 5000
+    self.assertEquals(1, self.round.discardedCards.height())
+    self.assertEquals([], self.round.teamsHaveAlreadyHit)
+    self.assertEquals(0, self.game.teamsScores['Player1'])
+    
     
 ###############################################################################
 # [required] 4) Card game logic
@@ -456,6 +498,31 @@ class HoleUtilsTest(GameTestsHelper):
     self.samevaluewithjoker_canastra = hole.StackOfCards(cards.strToStackOfCards('3-1 3-2 3-3 3-4 3-1 3-2 0-0'))
     self.jokers_canastra = hole.StackOfCards(cards.strToStackOfCards('2-1 0-0 2-2 0-0 0-0 0-0 2-3'))
     
+  def testStackOfCardsIsAMultisetCopy(self):
+    stack = cards.strToStackOfCards('3-1 3-1 0-0')
+    combination = hole.StackOfCards(stack)
+    stack.pop()
+    self.assertEquals(3, combination.height())
+    self.assertTrue(combination.containsAllCards(cards.strToStackOfCards('3-1 3-1')))
+    self.assertFalse(combination.containsAllCards(cards.strToStackOfCards('0-0 0-0')))
+    self.assertTrue(isinstance(hole.Configurations().deckPrototype, hole.StackOfCards))
+    
+  def testValidCombinationsMayBeValid(self):
+    for name, combination in vars(self).items():
+      if isinstance(combination, hole.StackOfCards) and combination.isValidCombination():
+        self.assertTrue(hole.mayBeValidCombination(tuple(combination.cards)), name)
+    self.assertFalse(hole.mayBeValidCombination(tuple(cards.strToStackOfCards('3-1 4-2 5-1').cards)))
+    self.assertFalse(hole.mayBeValidCombination(tuple(cards.strToStackOfCards('3-1 3-1 5-1').cards)))
+    
+  def testAllValidCombinationOfCards(self):
+    hand = hole.StackOfCards(cards.strToStackOfCards('3-1 4-1 5-1 9-2 9-3 0-0 13-4'))
+    combinations = [str(combination) for combination in hand.allValidCombinationOfCards()]
+    self.assertTrue('3-1 4-1 5-1' in combinations)
+    self.assertTrue('9-2 9-3 0-0' in combinations)
+    self.assertTrue('3-1 4-1 5-1 0-0' in combinations)
+    self.assertFalse('3-1 9-2 0-0' in combinations)
+    self.assertEquals(combinations, [str(combination) for combination in hand.allValidCombinationOfCards()])
+    
   def testIsSequenceWithSameSuit(self):
     self.assertTrue(self.sequence_combination.isSequenceWithSameSuit())
     self.assertTrue(self.sequenceQKAS_combination.isSequenceWithSameSuit())
@@ -695,6 +762,26 @@ class HoleUtilsTest(GameTestsHelper):
 #    orderCombinationsByNumberOfCardsAndScore
 #    orderCombinationsByScoreAndNumberOfCards
 
+class HoleDeckBenchmarkTests(unittest.TestCase):
+  
+  def setUp(self):
+    self.deck = hole.Configurations().deckPrototype.clone()
+    self.deck.shuffle(random.Random(1))
+    
+  def seconds(self, function, number=200):
+    return min(timeit.Timer(function).repeat(3, number)) / number
+    
+  def testSortAndMembershipOfTheHoleDeck(self):
+    deck = self.deck.cards
+    card = hole.Card(13, 4)
+    self.assertEquals(sorted(deck, key=cards.StackOfCards.keySortByValueAndSuit), sorted(deck))
+    self.assertTrue(card in deck)
+    # Integer keys: one key per card instead of one comparison method call per comparison
+    self.assertTrue(self.seconds(lambda: sorted(deck, key=cards.StackOfCards.keySortByValueAndSuit)) < 
+                    self.seconds(lambda: sorted(deck)))
+    # Counts of the multiset: the list is not scanned
+    self.assertTrue(self.seconds(lambda: self.deck.containsCard(card)) < self.seconds(lambda: card in deck))
+    
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
     unittest.main()
\ No newline at end of file
@@ -18,6 +18,7 @@ from cardgameengine import utils
 # [optional] 1): Define the kind of Cards that your game has
 
 class PokerTexasHoldEmCard(cards.ValueCard):
+  __slots__ = ()
   values = cards.VALUES_ANGLO_AMERICAN
   suits = cards.SUITS_ANGLO_AMERICAN
 
@@ -169,7 +170,7 @@ class PokerTexasHoldEmRound(cardgame.Round):
     pass
 
   def organize(self):
-    self.deck.shuffle()
+    self.shuffleDeck()
     self.distributeCardsToAllPlayers(2)
     self.distributeCardsTo(self.communityCards, 3)
     #blind, small blind, etc
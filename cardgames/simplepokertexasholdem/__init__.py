@@ -2,15 +2,17 @@
 @author: Paulo Cheque (paulocheque@gmail.com)
 '''
 
-import string
+import string, itertools
 from gameengine import game, utils, commands, players, errors, utils
 from cardgameengine import cardgame, cards
 from cardgameengine.constants import *
+from cardgames.simplepokertexasholdem import evaluator, equity, preflop
 
 ###############################################################################
 # [optional] 1): Define the kind of Cards that your game has
 
 class Card(cards.SuitCard):
+  __slots__ = ()
   values = cards.VALUES_ANGLO_AMERICAN
   suits = cards.SUITS_ANGLO_AMERICAN
   
@@ -21,11 +23,15 @@ class Configurations(cardgame.Configurations):
   
   def __init__(self, amountOfChipsPerPlayer=1000, roundsPrice=10, maxBet=100,
                timeForCommand=-1, timeForPlay=-1, timeForGame=-1):
-    deckPrototype = cards.DeckPrototypeBuilder.createCommonDeck(Card, 4, 13, 1, 0)
+    deckPrototype = cards.DeckPrototypeBuilder.createCommonDeck(Card, 4, 13, 1, 0, stackClass=cards.CardSet)
     super(Configurations, self).__init__(deckPrototype, timeForCommand, timeForPlay, timeForGame)
     self.amountOfChipsPerPlayer = amountOfChipsPerPlayer
     self.roundsPrice = roundsPrice
     self.maxBet = maxBet
+    # Only 2 cards per player and 5 community cards are drawn in a round
+    self.lazyShuffle = True
+    # Pre-flop equities, memory-mapped when the game starts (None = not loaded, see preflop)
+    self.preflopTable = preflop.DEFAULT_PATH
     
 ###############################################################################
 # [required] 3): Define the context of a player
@@ -86,13 +92,13 @@ class GameReport(cardgame.GameReport):
 class SimpleCommunityPoker(cardgame.Game):
 
   def __init__(self, players, configurations):
-    commandsManager = commands.SynchronousCommandsManager()
+    commandsManager = commands.SynchronousCommandsManager(inlineTrustedCommands=True)
     commandsManager.registerCommand(FoldCommand)
     commandsManager.registerCommand(FoldShowingTheCardsCommand)
     commandsManager.registerCommand(BetCommand)
     commandsManager.registerCommand(PayCommand)
     commandsManager.registerCommand(AllInCommand)
-    commandsManager.registerCommand(StepCommand)
+    commandsManager.registerTrustedCommand(StepCommand)
     super(SimpleCommunityPoker, self).__init__(players, configurations, commandsManager, GameReport(), 
                                startCommand=StartGameCommand(), 
                                endCommand=EndGameCommand(), 
@@ -101,6 +107,25 @@ class SimpleCommunityPoker(cardgame.Game):
     self.playersChips = {}
     for player in players:
       self.playersChips[player.name] = 0
+    self.initialPlayers = players[:]
+    self.preflopTable = None
+    
+  def start(self):
+    self.openPreflopTable()
+    super(SimpleCommunityPoker, self).start()
+    
+  def openPreflopTable(self):
+    '''
+    The table is loaded before the first round, not in the first lookup of a strategy
+    '''
+    path = getattr(self.configurations, 'preflopTable', None)
+    if path is not None: self.preflopTable = preflop.loadTable(path)
+    
+  def releaseWorkers(self):
+    super(SimpleCommunityPoker, self).releaseWorkers()
+    # Pools of processes of the equity calculators of the strategies
+    for player in self.initialPlayers:
+      if isinstance(player.strategy, Strategy): player.strategy.closeEquityCalculator()
 
   def amountOfChips(self, player):
     return self.playersChips[player.name]
@@ -131,42 +156,61 @@ class Round(cardgame.Round):
                                playerplaysCommand=PlayerPlaysGameCommand())
     self.stepCommand = StepCommand()
     self.step = 0
-    self.communityCards = StackOfCards()
+    self.communityCards = self.reuseStack(self.recycled('communityCards'), StackOfCards)
     self.pot = 0
     self.currentPlayerDecided = False
     self.bigBet = 0
     self.winnerCombination = None
+    # player name => strength of the best combination (evaluator)
+    self.strengths = {}
     
   def conditionToWin(self, player):
     return (self.numberOfPlayers() == 1 and player in self.players) or \
           (self.winnerCombination is not None and \
-           self.bestCombination(player) >= self.winnerCombination)
+           self.strengthOf(player) >= self.winnerCombination.strength)
 
   def showdown(self):
-    self.winnerCombination = self.bestCombination(self.players[0])
+    winner = self.players[0]
     for player in self.players:
-      combination = self.bestCombination(player)
-      if combination > self.winnerCombination:
-        self.winnerCombination = combination
+      if self.strengthOf(player) > self.strengthOf(winner):
+        winner = player
+    # Combination object only for the report
+    self.winnerCombination = self.bestCombination(winner)
+    self.report().typeWinnerCombination = self.winnerCombination.__class__.__name__
+    
+  def strengthOf(self, player):
+    strength = self.strengths.get(player.name)
+    if strength is None:
+      strength = self.strengths[player.name] = self.bestStrength(player)
+    return strength
+  
+  def availableCards(self, player):
+    '''
+    Cards of the player and community cards
+    '''
+    return self.seeCards(player).cards + self.communityCards.cards
+  
+  def bestStrength(self, player):
+    # One pass over the 7 cards, without creating the combinations
+    return evaluator.evaluate(self.availableCards(player))
 
   def bestCombination(self, player):
-    combinations = self.possibleCombinations(player)
-    bestCombination = CombinationFactory.create(combinations[0])
-    for combination in combinations:
-      c = CombinationFactory.create(combination)
-      if c > bestCombination:
-        bestCombination = c
-    return bestCombination
+    # The 5 cards are chosen by the strength, the subsets of 5 cards are not created
+    strength = self.strengthOf(player)
+    combination = StackOfCards()
+    combination.pushAll(evaluator.bestCards(self.availableCards(player), strength))
+    return CombinationFactory.createWithStrength(combination, strength)
         
   def possibleCombinations(self, player):
+    '''
+    All stacks of 5 cards of the cards of the player and community cards: C(7, 5) = 21
+    (not used by the showdown, see bestCombination)
+    '''
     combinations = []
-    generator = utils.CombinationGenerator(5, 3)
-    while generator.hasNext():
+    for cards5 in itertools.combinations(self.availableCards(player), 5):
       combination = StackOfCards()
-      combination.pushAll(self.seeCards(player))
-      for i in generator.next():
-        combination.push(self.communityCards.see(i))
-        combinations.append(combination)
+      combination.pushAll(cards5)
+      combinations.append(combination)
     return combinations
 
   def play(self):
@@ -222,7 +266,7 @@ class StepCommand(game.PlayerPlaysGameCommand):
 
   def execute(self, round):
     if round.step == 0:
-      round.deck.shuffle()
+      round.shuffleDeck()
       round.distributeCardsToAllPlayers(2)
       round.communityCards.push(round.deck.pop())
       round.communityCards.push(round.deck.pop())
@@ -303,6 +347,11 @@ class AllInCommand(BetCommand):
 # [required] 8): Define strategies to a player
 
 class Strategy(players.Strategy):
+  
+  # Created by the first estimateEquity and reused by the next ones with the same number of processes,
+  # closed in the end of the game (closeEquityCalculator)
+  equityCalculator = None
+  equityProcesses = None
 
   def play(self, commandsManager):
     self.compulsoryBets(commandsManager)
@@ -317,6 +366,33 @@ class Strategy(players.Strategy):
   def flop(self, commandsManager): pass
   def turn(self, commandsManager): pass
   def river(self, commandsManager): pass
+  
+  def estimateEquity(self, opponents=1, samples=equity.DEFAULT_SAMPLES, fractionOfTime=0.5, processes=1):
+    '''
+    Equity (equity.Equity) of the cards of the player with the current community cards.
+    It uses at most fractionOfTime of the remaining time to play (timeForPlay).
+    '''
+    if self.equityCalculator is None or self.equityProcesses != processes:
+      self.closeEquityCalculator()
+      self.equityCalculator = equity.EquityCalculator(processes)
+      self.equityProcesses = processes
+    timeLimit = remainingTime = self.remainingTime()
+    if remainingTime >= 0: timeLimit = remainingTime * fractionOfTime
+    return self.equityCalculator.calculate(self.context.playercards, self.context.communityCards, opponents,
+                                           samples, timeLimit)
+  
+  def closeEquityCalculator(self):
+    if self.equityCalculator is not None:
+      self.equityCalculator.close()
+      self.equityCalculator = None
+      self.equityProcesses = None
+  
+  def preflopEquity(self, opponents=1, path=preflop.DEFAULT_PATH):
+    '''
+    Equity of the cards of the player before the flop: O(1) lookup in the precomputed table (see preflop).
+    The default table is shipped with the package (9 opponents, equity.DEFAULT_SAMPLES samples per entry).
+    '''
+    return preflop.loadTable(path).equity(self.context.playercards, opponents)
     
 ###############################################################################
 # [optional] 9) Another classes (custom) to encapsulate things and algorithms. 
@@ -396,65 +472,47 @@ class StackOfCards(cards.StackOfCards):
             not self.isThreeOfAKind() and not self.isTwoPair() and not self.isPair()
             
 class Combination(object):
+  '''
+  strength: integer key of the evaluator (category and tiebreak ranks), computed once. 
+  Comparisons are comparisons of the keys: no cards are cloned or sorted to untie combinations.
+  '''
   
-  def __init__(self, stack):
+  def __init__(self, stack, strength=None):
     self.stack = stack
     self.stack.sortByValue()
+    if strength is None: strength = evaluator.evaluate(stack.cards)
+    self.strength = strength
     
-  def __lt__(self, that): return self.compare(that) < 0
-  def __le__(self, that): return self.compare(that) <= 0
-  def __gt__(self, that): return not self.__le__(that)
-  def __ge__(self, that): return not self.__lt__(that)
-    
-  def compare(self, that):
-    order = CombinationFactory.order
-    if order.index(self.__class__) == order.index(that.__class__): return self.untie(that)
-    return order.index(self.__class__) - order.index(that.__class__)
-    
-  def untie(self, that): pass
+  def __lt__(self, that): return self.strength < that.strength
+  def __le__(self, that): return self.strength <= that.strength
+  def __gt__(self, that): return self.strength > that.strength
+  def __ge__(self, that): return self.strength >= that.strength
   
-class RoyalStraigthFlush(Combination):
-  def untie(self, that):
-    return 0
+  def __eq__(self, that):
+    return isinstance(that, Combination) and self.strength == that.strength
   
-class StraigthFlush(Combination):
-  def untie(self, that):
-    return self.stack.compareByHighValue(that.stack)
+  def __ne__(self, that):
+    return not self.__eq__(that)
   
-class FourOfAKind(Combination):
-  def untie(self, that):
-    if self.stack.see(2).value - that.stack.see(2).value == 0: return 0
-    aux = self.stack.clone()
-    aux.popCardsWithValue(self.stack.see(2).value)
-    thataux = that.stack.clone()
-    thataux.popCardsWithValue(that.stack.see(2).value)
-    return aux.compareByHighValue(thataux)
-  
-class FullHouse(Combination):
-  def untie(self, that):
-    if self.stack.see(2).value - that.stack.see(2).value == 0: return 0
-    aux = self.stack.clone()
-    aux.popCardsWithValue(self.stack.see(2).value)
-    thataux = that.stack.clone()
-    thataux.popCardsWithValue(that.stack.see(2).value)
-    return aux.compareByHighValue(thataux)
-  
-class Flush(Combination):
-  def untie(self, that):
-    return self.stack.compareByHighValue(that.stack)
-  
-class Straigth(Combination):
-  def untie(self, that):
-    return self.stack.compareByHighValue(that.stack)
-  
-class ThreeOfAKind(Combination):
+  def __hash__(self):
+    return hash(self.strength)
+    
+  def compare(self, that):
+    return cmp(self.strength, that.strength)
+    
   def untie(self, that):
-    if self.stack.see(2).value - that.stack.see(2).value == 0: return 0
-    aux = self.stack.clone()
-    aux.popCardsWithValue(self.stack.see(2).value)
-    thataux = that.stack.clone()
-    thataux.popCardsWithValue(that.stack.see(2).value)
-    return aux.compareByHighValue(thataux)
+    '''
+    Comparison of combinations of the same category (tiebreak ranks of the strength)
+    '''
+    return cmp(self.strength & evaluator.RANKS_MASK, that.strength & evaluator.RANKS_MASK)
+  
+class RoyalStraigthFlush(Combination): pass
+class StraigthFlush(Combination): pass
+class FourOfAKind(Combination): pass
+class FullHouse(Combination): pass
+class Flush(Combination): pass
+class Straigth(Combination): pass
+class ThreeOfAKind(Combination): pass
   
 class TwoPair(Combination): 
   def getValueOfPairs(self, stack):
@@ -469,48 +527,30 @@ class TwoPair(Combination):
       lowestPairValue = stack.see(0).value
     return (lowestPairValue, highestPairValue)
   
-  def untie(self, that):
-    selfPairValues = self.getValueOfPairs(self.stack)
-    thatPairValues = self.getValueOfPairs(that.stack)
-    highPairDifference = selfPairValues[1] - thatPairValues[1]
-    if highPairDifference != 0: return highPairDifference
-    lowerPairDifference = selfPairValues[0] - thatPairValues[0]
-    if lowerPairDifference != 0: return lowerPairDifference
-    return self.stack.compareByHighValue(that.stack)
-  
 class Pair(Combination): # AABCD ABBCD ABCCD ABCDD
   def getValueOfPair(self, stack):
     for card1, card2 in zip(stack.cards, stack.cards[1:]):
       if card1.value == card2.value: 
         return card1.value
-      
-  def untie(self, that):
-    pairDifference = self.getValueOfPair(self.stack) - self.getValueOfPair(that.stack)
-    if pairDifference != 0: return pairDifference
-    return self.stack.compareByHighValue(that.stack)
   
-class HighCard(Combination):
-  def untie(self, that):
-    return self.stack.compareByHighValue(that.stack)
+class HighCard(Combination): pass
 
 class CombinationFactory(object):
 
   order = [RoyalStraigthFlush, StraigthFlush, FourOfAKind, FullHouse, 
                 Flush, Straigth, ThreeOfAKind, TwoPair, Pair, HighCard]
   
+  # evaluator.category(strength) => class of the combination
+  classes = list(reversed(order))
+  
   @staticmethod
   def create(stack):
-    if stack.isRoyalStraigthFlush(): return RoyalStraigthFlush(stack)
-    if stack.isStraigthFlush(): return StraigthFlush(stack)
-    if stack.isFourOfAKind(): return FourOfAKind(stack)
-    if stack.isFullHouse(): return FullHouse(stack)
-    if stack.isFlush(): return Flush(stack)
-    if stack.isStraigth(): return Straigth(stack)
-    if stack.isThreeOfAKind(): return ThreeOfAKind(stack)
-    if stack.isTwoPair(): return TwoPair(stack)
-    if stack.isPair(): return Pair(stack)
-    if stack.isHighCard(): return HighCard(stack)
-    raise Exception('Invalid combination')
+    if stack.height() != 5: raise Exception('Invalid combination')
+    return CombinationFactory.createWithStrength(stack, evaluator.evaluate(stack.cards))
+  
+  @staticmethod
+  def createWithStrength(stack, strength):
+    return CombinationFactory.classes[evaluator.category(strength)](stack, strength)
 
 ###############################################################################
 # [required] 10) Define a factory
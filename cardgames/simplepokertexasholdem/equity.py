@@ -0,0 +1,308 @@
+'''
+@author: Paulo Cheque (paulocheque@gmail.com)
+
+Equity of the cards of a player of the simple Texas Hold'em: probabilities of win, tie and loss against
+a number of opponents with unknown cards, given the known community cards (0, 3, 4 or 5).
+
+The missing community cards and the cards of the opponents are enumerated (exhaustive, when the number of
+cases fits in the budget of samples) or dealt at random (seeded Monte Carlo). The work is split in tasks
+executed by a pool of processes, and each task stops at the deadline of the time budget, so it can be used
+by a strategy inside its timeForPlay.
+
+Example of usage:
+
+from cardgames.simplepokertexasholdem import equity
+
+calculator = equity.EquityCalculator(processes=4, seed=42)
+result = calculator.calculate(context.playercards, context.communityCards, opponents=2,
+                              samples=100000, timeLimit=0.5)
+if result.winProbability() > 0.5: ...
+calculator.close()
+
+# Or, in a Strategy of the game:
+result = self.estimateEquity(opponents=2)
+'''
+
+import itertools
+import math
+import multiprocessing
+import random
+import time
+from string import Template
+from gameengine import utils
+from cardgameengine import cards
+from cardgames.simplepokertexasholdem import evaluator
+
+DEFAULT_SAMPLES = 10000
+# Samples of each task: the tasks (and their seeds) do not depend on the number of processes,
+# so the same seed gives the same result with any number of processes (without time limit)
+TASK_SIZE = 2500
+# Samples between two checks of the deadline
+CHECK_INTERVAL = 64
+
+###############################################################################
+# Tasks (executed in the worker processes)
+
+def cardKey(card):
+  '''
+  (value, suit) of a card, with the AS as 1: picklable to be sent to the workers
+  '''
+  if card.value == 14: return (1, card.suit)
+  return (card.value, card.suit)
+
+def toCards(keys):
+  return [cards.Card(value, suit) for value, suit in keys]
+
+def compare(strength, opponentsStrengths):
+  '''
+  (win, tie, loss, share of the pot) of one case
+  '''
+  best = max(opponentsStrengths)
+  if strength > best: return 1, 0, 0, 1.0
+  if strength < best: return 0, 0, 1, 0.0
+  return 0, 1, 0, 1.0 / (1 + opponentsStrengths.count(best))
+
+def simulate(task):
+  '''
+  Monte Carlo task: (setup, seed, numberOfSamples, deadline) => (wins, ties, losses, shares, samples)
+  '''
+  (playerCards, communityCards, opponents, unknownCards), seed, numberOfSamples, deadline = task
+  playerCards, communityCards, unknownCards = toCards(playerCards), toCards(communityCards), toCards(unknownCards)
+  missing = 5 - len(communityCards)
+  size = missing + 2 * opponents
+  rng = random.Random(seed)
+  evaluate = evaluator.evaluateBest
+  wins = ties = losses = samples = 0
+  shares = 0.0
+  while samples < numberOfSamples:
+    if samples % CHECK_INTERVAL == 0 and deadline is not None and time.time() > deadline: break
+    drawn = rng.sample(unknownCards, size)
+    community = communityCards + drawn[:missing]
+    strength = evaluate(playerCards + community)
+    opponentsStrengths = [evaluate(drawn[i:i + 2] + community) for i in xrange(missing, size, 2)]
+    win, tie, loss, share = compare(strength, opponentsStrengths)
+    wins += win
+    ties += tie
+    losses += loss
+    shares += share
+    samples += 1
+  return wins, ties, losses, shares, samples
+
+def opponentsHands(pairs, opponents):
+  '''
+  Generator of the tuples of disjoint pairs of cards of the opponents (in order)
+  '''
+  if opponents == 1:
+    for pair in pairs:
+      yield (pair,)
+    return
+  for pair in pairs:
+    others = [other for other in pairs if pair[0] not in other and pair[1] not in other]
+    for hands in opponentsHands(others, opponents - 1):
+      yield (pair,) + hands
+
+def enumerateCases(task):
+  '''
+  Exhaustive task: (setup, (start, end), deadline) => (wins, ties, losses, shares, samples)
+  The range is of the ranks of the combinations of the missing community cards (utils.CombinationGenerator).
+  '''
+  (playerCards, communityCards, opponents, unknownCards), (start, end), deadline = task
+  playerCards, communityCards, unknownCards = toCards(playerCards), toCards(communityCards), toCards(unknownCards)
+  evaluate = evaluator.evaluateBest
+  wins = ties = losses = samples = 0
+  shares = 0.0
+  generator = utils.CombinationGenerator(len(unknownCards), 5 - len(communityCards))
+  for indexes in generator.iterRange(start, end):
+    if deadline is not None and time.time() > deadline: break
+    community = communityCards + [unknownCards[i] for i in indexes]
+    strength = evaluate(playerCards + community)
+    others = [card for i, card in enumerate(unknownCards) if i not in indexes]
+    # Each pair of cards is evaluated once for all the tuples of hands of the opponents
+    strengths = {}
+    for pair in itertools.combinations(others, 2):
+      strengths[pair] = evaluate(list(pair) + community)
+    for hands in opponentsHands(sorted(strengths), opponents):
+      win, tie, loss, share = compare(strength, [strengths[pair] for pair in hands])
+      wins += win
+      ties += tie
+      losses += loss
+      shares += share
+      samples += 1
+  return wins, ties, losses, shares, samples
+
+def runTask(task):
+  kind, arguments = task
+  if kind == 'exhaustive': return enumerateCases(arguments)
+  return simulate(arguments)
+
+def numberOfCases(unknownCards, missingCards, opponents):
+  '''
+  Number of cases of the exhaustive enumeration
+  '''
+  cases = utils.binomial(unknownCards, missingCards)
+  remaining = unknownCards - missingCards
+  for i in range(opponents):
+    cases *= utils.binomial(remaining - 2 * i, 2)
+  return cases
+
+###############################################################################
+
+class Equity(object):
+  '''
+  Result of a calculation: number of cases of win, tie and loss.
+  shares: sum of the share of the pot of each case (1 for a win, 1/k for a tie of k players)
+  exhaustive: True if the cases were enumerated, False if they were sampled (Monte Carlo)
+  complete: False if the calculation was stopped by the time limit
+  '''
+
+  def __init__(self, exhaustive=False):
+    self.wins = 0
+    self.ties = 0
+    self.losses = 0
+    self.shares = 0.0
+    self.numberOfSamples = 0
+    self.exhaustive = exhaustive
+    self.complete = True
+    self.durationTime = 0
+
+  def __str__(self):
+    return self.summary()
+
+  def addTaskResult(self, result):
+    wins, ties, losses, shares, samples = result
+    self.wins += wins
+    self.ties += ties
+    self.losses += losses
+    self.shares += shares
+    self.numberOfSamples += samples
+
+  def probability(self, number):
+    if self.numberOfSamples == 0: return 0.0
+    return float(number) / self.numberOfSamples
+
+  def winProbability(self):
+    return self.probability(self.wins)
+
+  def tieProbability(self):
+    return self.probability(self.ties)
+
+  def lossProbability(self):
+    return self.probability(self.losses)
+
+  def equity(self):
+    '''
+    Expected share of the pot
+    '''
+    return self.probability(self.shares)
+
+  def standardError(self):
+    '''
+    Standard error of the win probability (Monte Carlo), 0 if exhaustive
+    '''
+    if self.exhaustive or self.numberOfSamples == 0: return 0.0
+    p = self.winProbability()
+    return math.sqrt(p * (1 - p) / self.numberOfSamples)
+
+  def summary(self):
+    t = Template('Equity ${equity}: win ${win}, tie ${tie}, loss ${loss} (${samples} ${kind} samples in ${durationTime}s)')
+    kind = 'exhaustive' if self.exhaustive else 'Monte Carlo'
+    if not self.complete: kind += ' (incomplete)'
+    return t.substitute(equity='%.4f' % self.equity(), win='%.4f' % self.winProbability(),
+                        tie='%.4f' % self.tieProbability(), loss='%.4f' % self.lossProbability(),
+                        samples=self.numberOfSamples, kind=kind, durationTime='%.3f' % self.durationTime)
+
+###############################################################################
+
+class EquityCalculator(object):
+  '''
+  # processes (default None): number of processes, None = number of CPUs, 1 = run in the current process
+  # seed (default None = random seed): calculation i uses the seed utils.deriveSeed(seed, i)
+
+  The pool of processes is created by the first calculation that needs it and reused until close().
+  Inside a daemonic process (e.g. a worker of gameengine.batch) the calculations run in the current process.
+  '''
+
+  def __init__(self, processes=None, seed=None):
+    if processes is None: processes = multiprocessing.cpu_count()
+    if multiprocessing.current_process().daemon: processes = 1
+    self.processes = processes
+    if seed is None: seed = utils.newSeed()
+    self.seed = seed
+    self.numberOfCalculations = 0
+    self.pool = None
+
+  def close(self):
+    if self.pool is not None:
+      self.pool.terminate()
+      self.pool.join()
+      self.pool = None
+
+  def setup(self, playerCards, communityCards, opponents):
+    playerCards = [cardKey(card) for card in self.__cardsOf(playerCards)]
+    communityCards = [cardKey(card) for card in self.__cardsOf(communityCards)]
+    known = playerCards + communityCards
+    if len(playerCards) != 2: raise ValueError('The player must have 2 cards: %s' % len(playerCards))
+    if len(communityCards) > 5: raise ValueError('Invalid number of community cards: %s' % len(communityCards))
+    if len(set(known)) != len(known): raise ValueError('Repeated cards: %s' % known)
+    unknownCards = [(value, suit) for suit in range(1, 5) for value in range(1, 14) if (value, suit) not in known]
+    if opponents < 1 or 5 - len(communityCards) + 2 * opponents > len(unknownCards):
+      raise ValueError('Invalid number of opponents: %s' % opponents)
+    return playerCards, communityCards, opponents, unknownCards
+
+  def __cardsOf(self, cardsOrStack):
+    if cardsOrStack is None: return []
+    # The order of the cards does not matter
+    if isinstance(cardsOrStack, cards.StackOfCards): return list(cardsOrStack.cards)
+    return list(cardsOrStack)
+
+  def calculate(self, playerCards, communityCards=None, opponents=1, samples=DEFAULT_SAMPLES, timeLimit=-1,
+                exhaustive=None):
+    '''
+    playerCards and communityCards: StackOfCards or lists of cards
+    samples: number of Monte Carlo samples (budget of cases)
+    timeLimit (default -1 = infinite): seconds, the result has the samples computed until then
+    exhaustive (default None): None = enumerate all cases if their number is at most samples, True = always
+    enumerate, False = always Monte Carlo
+    '''
+    startTime = time.time()
+    setup = self.setup(playerCards, communityCards, opponents)
+    unknownCards, missingCards = len(setup[3]), 5 - len(setup[1])
+    cases = numberOfCases(unknownCards, missingCards, opponents)
+    if exhaustive is None: exhaustive = cases <= samples
+    deadline = None
+    if timeLimit >= 0: deadline = startTime + timeLimit
+    seed = utils.deriveSeed(self.seed, self.numberOfCalculations)
+    self.numberOfCalculations += 1
+    if exhaustive:
+      generator = utils.CombinationGenerator(unknownCards, missingCards)
+      numberOfTasks = max(1, cases / TASK_SIZE)
+      tasks = [('exhaustive', (setup, chunk, deadline)) for chunk in generator.chunks(numberOfTasks)]
+    else:
+      tasks = []
+      for index, start in enumerate(xrange(0, samples, TASK_SIZE)):
+        size = min(TASK_SIZE, samples - start)
+        tasks.append(('montecarlo', (setup, utils.deriveSeed(seed, index), size, deadline)))
+    result = Equity(exhaustive)
+    for taskResult in self.run(tasks):
+      result.addTaskResult(taskResult)
+    result.complete = result.numberOfSamples == (cases if exhaustive else samples)
+    result.durationTime = time.time() - startTime
+    return result
+
+  def run(self, tasks):
+    if self.processes == 1 or len(tasks) == 1:
+      return itertools.imap(runTask, tasks)
+    if self.pool is None: self.pool = multiprocessing.Pool(self.processes)
+    chunksize = max(1, len(tasks) / (self.processes * 4))
+    return self.pool.imap_unordered(runTask, tasks, chunksize)
+
+def calculate(playerCards, communityCards=None, opponents=1, samples=DEFAULT_SAMPLES, timeLimit=-1,
+              exhaustive=None, processes=1, seed=None):
+  '''
+  One calculation without reusing the pool of processes (see EquityCalculator.calculate)
+  '''
+  calculator = EquityCalculator(processes, seed)
+  try:
+    return calculator.calculate(playerCards, communityCards, opponents, samples, timeLimit, exhaustive)
+  finally:
+    calculator.close()
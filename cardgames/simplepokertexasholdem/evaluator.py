@@ -0,0 +1,246 @@
+'''
+@author: Paulo Cheque (paulocheque@gmail.com)
+
+Poker hands evaluator with precomputed lookup tables (Cactus Kev style): a hand of 5 to 7 cards is mapped
+to one integer, the strength of the hand. A greater strength is a better hand and equal strengths are a tie.
+
+strength = category << CATEGORY_SHIFT | ranks of the tiebreak (4 bits each, the most important first)
+Ranks: 0 = 2, 1 = 3, ..., 12 = AS (value 1 or 14 of the cards)
+
+Tables:
+- FLUSHES: 13 bits mask of the ranks => strength of 5 cards with the same suit
+- UNIQUE_RANKS: 13 bits mask of the ranks => strength of 5 cards with different ranks (no flush)
+- REPEATED_RANKS: product of the primes of the ranks => strength of 5 cards with repeated ranks
+- STRAIGHTS: 13 bits mask of the ranks => highest rank of the best straight (used for 6 or 7 cards)
+
+Example of usage:
+
+from cardgames.simplepokertexasholdem import evaluator
+strength = evaluator.evaluate(stack.cards)
+if evaluator.category(strength) == evaluator.FULL_HOUSE: ...
+hand = evaluator.bestCards(stack.cards, strength) # the 5 cards of the hand
+'''
+
+import itertools
+
+HIGH_CARD, PAIR, TWO_PAIR, THREE_OF_A_KIND, STRAIGHT, FLUSH, FULL_HOUSE, FOUR_OF_A_KIND, STRAIGHT_FLUSH, \
+ROYAL_STRAIGHT_FLUSH = range(10)
+
+CATEGORY_NAMES = ['HighCard', 'Pair', 'TwoPair', 'ThreeOfAKind', 'Straigth', 'Flush', 'FullHouse',
+                  'FourOfAKind', 'StraigthFlush', 'RoyalStraigthFlush']
+
+CATEGORY_SHIFT = 20
+RANK_BITS = 4
+RANKS_MASK = (1 << CATEGORY_SHIFT) - 1
+PRIMES = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41]
+AS = 12
+# AS 2 3 4 5
+WHEEL = (1 << AS) | 0xf
+
+def rankOf(value):
+  if value == 1 or value == 14: return AS
+  return value - 2
+
+def category(strength):
+  return strength >> CATEGORY_SHIFT
+
+def categoryName(strength):
+  return CATEGORY_NAMES[category(strength)]
+
+def pack(category, ranks):
+  strength = category << CATEGORY_SHIFT
+  shift = CATEGORY_SHIFT - RANK_BITS
+  for rank in ranks:
+    strength |= rank << shift
+    shift -= RANK_BITS
+  return strength
+
+###############################################################################
+# Tables
+
+def straightHighRank(mask):
+  if mask == WHEEL: return 3
+  for high in range(AS, 3, -1):
+    if mask == 0x1f << (high - 4): return high
+  return None
+
+def rateUniqueRanks(mask, flush):
+  high = straightHighRank(mask)
+  if high is not None:
+    if not flush: return pack(STRAIGHT, [high])
+    if high == AS: return pack(ROYAL_STRAIGHT_FLUSH, [high])
+    return pack(STRAIGHT_FLUSH, [high])
+  ranks = [rank for rank in reversed(range(13)) if mask >> rank & 1]
+  if flush: return pack(FLUSH, ranks)
+  return pack(HIGH_CARD, ranks)
+
+# Number of cards of each rank (most repeated first) => category
+PATTERNS = {(4, 1): FOUR_OF_A_KIND, (3, 2): FULL_HOUSE, (3, 1, 1): THREE_OF_A_KIND,
+            (2, 2, 1): TWO_PAIR, (2, 1, 1, 1): PAIR}
+
+def rateRepeatedRanks(ranks):
+  counts = {}
+  for rank in ranks:
+    counts[rank] = counts.get(rank, 0) + 1
+  groups = sorted(counts.items(), key=lambda (rank, count): (count, rank), reverse=True)
+  pattern = tuple(count for rank, count in groups)
+  return pack(PATTERNS[pattern], [rank for rank, count in groups])
+
+def product(ranks):
+  result = 1
+  for rank in ranks:
+    result *= PRIMES[rank]
+  return result
+
+def buildTables():
+  flushes = [0] * (1 << 13)
+  uniqueRanks = [0] * (1 << 13)
+  repeatedRanks = {}
+  for ranks in itertools.combinations(range(13), 5):
+    mask = sum(1 << rank for rank in ranks)
+    flushes[mask] = rateUniqueRanks(mask, True)
+    uniqueRanks[mask] = rateUniqueRanks(mask, False)
+  for ranks in itertools.combinations_with_replacement(range(13), 5):
+    if len(set(ranks)) == 5 or ranks.count(ranks[2]) == 5: continue
+    repeatedRanks[product(ranks)] = rateRepeatedRanks(ranks)
+  return flushes, uniqueRanks, repeatedRanks
+
+FLUSHES, UNIQUE_RANKS, REPEATED_RANKS = buildTables()
+
+def buildStraights():
+  '''
+  13 bits mask of the ranks (any number of cards) => rank of the highest card of the best straight or -1
+  '''
+  straights = [-1] * (1 << 13)
+  for mask in range(1 << 13):
+    for high in range(AS, 3, -1):
+      straight = 0x1f << (high - 4)
+      if mask & straight == straight:
+        straights[mask] = high
+        break
+    else:
+      if mask & WHEEL == WHEEL: straights[mask] = 3
+  return straights
+
+STRAIGHTS = buildStraights()
+
+def highestRanks(mask, amount):
+  ranks = []
+  rank = AS
+  while len(ranks) < amount and rank >= 0:
+    if mask >> rank & 1: ranks.append(rank)
+    rank -= 1
+  return ranks
+
+###############################################################################
+# Evaluation
+
+# card => (bit of the rank, prime of the rank, suit)
+encodings = {}
+
+def encode(card):
+  encoding = encodings.get(card)
+  if encoding is None:
+    rank = rankOf(card.value)
+    encoding = encodings[card] = (1 << rank, PRIMES[rank], card.suit)
+  return encoding
+
+def evaluate5(cards):
+  (bit1, prime1, suit1), (bit2, prime2, suit2), (bit3, prime3, suit3), (bit4, prime4, suit4), \
+  (bit5, prime5, suit5) = [encode(card) for card in cards]
+  mask = bit1 | bit2 | bit3 | bit4 | bit5
+  if suit1 == suit2 == suit3 == suit4 == suit5: return FLUSHES[mask]
+  strength = UNIQUE_RANKS[mask]
+  if strength: return strength
+  return REPEATED_RANKS[prime1 * prime2 * prime3 * prime4 * prime5]
+
+def evaluateBest(cards):
+  '''
+  Strength of the best hand of 5 cards of 5 or more cards (e.g. 2 cards of the player and 5 community cards)
+  in one pass over the cards, without evaluating each subset of 5 cards.
+  '''
+  counts = [0] * 13
+  suitsMasks = {}
+  for card in cards:
+    bit, prime, suit = encode(card)
+    counts[rankOf(card.value)] += 1
+    suitsMasks[suit] = suitsMasks.get(suit, 0) | bit
+  # With 7 cards, a flush excludes four of a kind and full house
+  for suitMask in suitsMasks.itervalues():
+    if bin(suitMask).count('1') >= 5:
+      high = STRAIGHTS[suitMask]
+      if high == AS: return pack(ROYAL_STRAIGHT_FLUSH, [high])
+      if high >= 0: return pack(STRAIGHT_FLUSH, [high])
+      return pack(FLUSH, highestRanks(suitMask, 5))
+  mask = 0
+  quads, trips, pairs = [], [], []
+  for rank in range(AS, -1, -1):
+    count = counts[rank]
+    if count == 0: continue
+    mask |= 1 << rank
+    if count == 4: quads.append(rank)
+    elif count == 3: trips.append(rank)
+    elif count == 2: pairs.append(rank)
+  if quads:
+    return pack(FOUR_OF_A_KIND, [quads[0]] + highestRanks(mask & ~(1 << quads[0]), 1))
+  if trips and (len(trips) > 1 or pairs):
+    return pack(FULL_HOUSE, [trips[0], max(trips[1:] + pairs)])
+  high = STRAIGHTS[mask]
+  if high >= 0: return pack(STRAIGHT, [high])
+  if trips:
+    return pack(THREE_OF_A_KIND, [trips[0]] + highestRanks(mask & ~(1 << trips[0]), 2))
+  if len(pairs) >= 2:
+    kickers = mask & ~(1 << pairs[0]) & ~(1 << pairs[1])
+    return pack(TWO_PAIR, pairs[:2] + highestRanks(kickers, 1))
+  if pairs:
+    return pack(PAIR, [pairs[0]] + highestRanks(mask & ~(1 << pairs[0]), 3))
+  return pack(HIGH_CARD, highestRanks(mask, 5))
+
+def evaluate(cards):
+  '''
+  Strength of the best hand of 5 cards of a list of 5, 6 or 7 cards
+  '''
+  if len(cards) == 5: return evaluate5(cards)
+  if len(cards) < 5 or len(cards) > 7: raise ValueError('Invalid number of cards: %s' % len(cards))
+  return evaluateBest(cards)
+
+# Category => number of cards of each rank of the tiebreak (straights have 5 ranks in sequence)
+GROUPS = {HIGH_CARD: (1, 1, 1, 1, 1), PAIR: (2, 1, 1, 1), TWO_PAIR: (2, 2, 1), THREE_OF_A_KIND: (3, 1, 1),
+          FLUSH: (1, 1, 1, 1, 1), FULL_HOUSE: (3, 2), FOUR_OF_A_KIND: (4, 1)}
+
+def ranksOf(strength, amount):
+  '''
+  First amount ranks of the tiebreak of a strength
+  '''
+  return [(strength >> (CATEGORY_SHIFT - RANK_BITS * (i + 1))) & 0xf for i in range(amount)]
+
+def bestCards(cards, strength=None):
+  '''
+  The 5 cards of the best hand of a list of 5, 6 or 7 cards, chosen by the ranks of the strength
+  (without evaluating each subset of 5 cards)
+  '''
+  if strength is None: strength = evaluate(cards)
+  handCategory = category(strength)
+  if handCategory in (FLUSH, STRAIGHT_FLUSH, ROYAL_STRAIGHT_FLUSH):
+    suits = [card.suit for card in cards]
+    flushSuit = max(suits, key=suits.count)
+    cards = [card for card in cards if card.suit == flushSuit]
+  if handCategory in (STRAIGHT, STRAIGHT_FLUSH, ROYAL_STRAIGHT_FLUSH):
+    # The AS is the lowest card of the wheel: 3 2 1 0 AS
+    high = ranksOf(strength, 1)[0]
+    groups = [((high - i) % 13, 1) for i in range(5)]
+  else:
+    counts = GROUPS[handCategory]
+    groups = zip(ranksOf(strength, len(counts)), counts)
+  hand = []
+  for rank, count in groups:
+    chosen = [card for card in cards if rankOf(card.value) == rank][:count]
+    if len(chosen) < count: raise ValueError('The cards do not have the hand of the strength: %s' % strength)
+    hand.extend(chosen)
+  return hand
+
+def evaluateBySubsets(cards):
+  '''
+  Same result of evaluate, evaluating each subset of 5 cards (reference implementation)
+  '''
+  return max(evaluate5(hand) for hand in itertools.combinations(cards, 5))
@@ -0,0 +1,163 @@
+'''
+@author: Paulo Cheque (paulocheque@gmail.com)
+
+Precomputed pre-flop equities of the simple Texas Hold'em: before the flop only the ranks of the 2 cards
+of the player and if they have the same suit matter, so there are 169 distinct starting hands.
+The table (equity of each starting hand against 1..MAX_OPPONENTS opponents) is generated once with the
+equity calculator and saved in a compact binary file, which is memory-mapped by the loader: the lookups are
+O(1) and the processes of the same machine share the pages of the file (no warm-up per process).
+
+File (little-endian):
+- header: MAGIC, VERSION, number of opponents, number of hands, samples per entry
+- entries: equity * 65535 (unsigned 16 bits), for opponents 1..N, for hands 0..168
+
+Starting hands (13 x 13 grid of ranks, 0 = 2 ... 12 = AS): pairs in the diagonal, suited hands in
+high * 13 + low and offsuit hands in low * 13 + high.
+
+The default table (DEFAULT_PATH, 9 opponents, DEFAULT_SAMPLES samples per entry) is shipped with the package.
+It was generated with:
+
+python -m cardgames.simplepokertexasholdem.preflop cardgames/simplepokertexasholdem/preflop.bin --seed 20130101
+
+Example of usage:
+
+python -m cardgames.simplepokertexasholdem.preflop preflop.bin --samples 20000 --processes 4
+
+from cardgames.simplepokertexasholdem import preflop
+table = preflop.loadTable('preflop.bin')
+if table.equity(context.playercards, opponents=3) > 0.3: ...
+'''
+
+import mmap
+import optparse
+import os
+import struct
+from cardgameengine import cards
+from cardgames.simplepokertexasholdem import evaluator, equity
+
+MAGIC = 'PFEQ'
+VERSION = 1
+HEADER = struct.Struct('<4sHHHI')
+ENTRY = struct.Struct('<H')
+MAX_EQUITY = 0xffff
+MAX_OPPONENTS = 9
+NUMBER_OF_HANDS = 169
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'preflop.bin')
+
+def handIndex(card1, card2):
+  '''
+  Index (0..168) of the starting hand of 2 cards
+  '''
+  rank1, rank2 = evaluator.rankOf(card1.value), evaluator.rankOf(card2.value)
+  high, low = max(rank1, rank2), min(rank1, rank2)
+  if card1.suit == card2.suit: return high * 13 + low
+  return low * 13 + high
+
+def representativeCards(index):
+  '''
+  2 cards of the starting hand of an index
+  '''
+  row, column = divmod(index, 13)
+  # Value of the cards of a rank: AS = 1
+  values = [rank + 2 for rank in (row, column)]
+  values = [1 if value == 14 else value for value in values]
+  if row > column: return [cards.Card(values[0], 1), cards.Card(values[1], 1)]
+  return [cards.Card(values[0], 1), cards.Card(values[1], 2)]
+
+def handName(index):
+  '''
+  e.g. AA, AKs, 72o
+  '''
+  names = '23456789TJQKA'
+  row, column = divmod(index, 13)
+  if row == column: return names[row] * 2
+  if row > column: return names[row] + names[column] + 's'
+  return names[column] + names[row] + 'o'
+
+###############################################################################
+
+def generate(path, maxOpponents=MAX_OPPONENTS, samples=equity.DEFAULT_SAMPLES, processes=None, seed=None):
+  '''
+  Calculate the table (maxOpponents x 169 Monte Carlo calculations) and save it in the file of the path
+  '''
+  calculator = equity.EquityCalculator(processes, seed)
+  try:
+    entries = []
+    for opponents in range(1, maxOpponents + 1):
+      for index in range(NUMBER_OF_HANDS):
+        result = calculator.calculate(representativeCards(index), None, opponents, samples, exhaustive=False)
+        entries.append(int(round(result.equity() * MAX_EQUITY)))
+  finally:
+    calculator.close()
+  # The table is replaced only when it is complete
+  temporaryPath = path + '.tmp'
+  output = open(temporaryPath, 'wb')
+  try:
+    output.write(HEADER.pack(MAGIC, VERSION, maxOpponents, NUMBER_OF_HANDS, samples))
+    output.write(struct.pack('<%dH' % len(entries), *entries))
+  finally:
+    output.close()
+  os.rename(temporaryPath, path)
+
+class PreflopTable(object):
+  '''
+  Read-only view of a file of the table, memory-mapped
+  '''
+
+  def __init__(self, path):
+    self.path = path
+    if not os.path.isfile(path):
+      raise IOError('Pre-flop table not found: %s '
+                    '(generate it with: python -m cardgames.simplepokertexasholdem.preflop %s)' % (path, path))
+    inputFile = open(path, 'rb')
+    try:
+      self.data = mmap.mmap(inputFile.fileno(), 0, access=mmap.ACCESS_READ)
+    finally:
+      inputFile.close()
+    if len(self.data) < HEADER.size: raise ValueError('Invalid pre-flop table: %s' % path)
+    magic, version, self.maxOpponents, numberOfHands, self.samples = HEADER.unpack_from(self.data, 0)
+    if magic != MAGIC or version != VERSION or numberOfHands != NUMBER_OF_HANDS or \
+       len(self.data) != HEADER.size + self.maxOpponents * NUMBER_OF_HANDS * ENTRY.size:
+      raise ValueError('Invalid pre-flop table: %s' % path)
+
+  def close(self):
+    self.data.close()
+
+  def equityOfHand(self, index, opponents=1):
+    if opponents < 1 or opponents > self.maxOpponents:
+      raise ValueError('Invalid number of opponents: %s (table of %s)' % (opponents, self.maxOpponents))
+    offset = HEADER.size + ((opponents - 1) * NUMBER_OF_HANDS + index) * ENTRY.size
+    return ENTRY.unpack_from(self.data, offset)[0] / float(MAX_EQUITY)
+
+  def equity(self, playerCards, opponents=1):
+    '''
+    playerCards: StackOfCards or list of 2 cards
+    '''
+    if isinstance(playerCards, cards.StackOfCards): playerCards = playerCards.cards
+    card1, card2 = playerCards
+    return self.equityOfHand(handIndex(card1, card2), opponents)
+
+# path: PreflopTable, one table (and one memory map) per file
+tables = {}
+
+def loadTable(path=DEFAULT_PATH):
+  table = tables.get(path)
+  if table is None:
+    table = tables[path] = PreflopTable(path)
+  return table
+
+###############################################################################
+# Command line
+
+def main(args=None):
+  parser = optparse.OptionParser(usage='%prog [options] output-file\n\nExample: %prog preflop.bin --samples 20000')
+  parser.add_option('--opponents', type='int', default=MAX_OPPONENTS, help='maximum number of opponents')
+  parser.add_option('--samples', type='int', default=equity.DEFAULT_SAMPLES, help='samples of each entry')
+  parser.add_option('--processes', type='int', default=None, help='default: number of CPUs')
+  parser.add_option('--seed', type='int', default=None)
+  options, arguments = parser.parse_args(args)
+  if len(arguments) != 1: parser.error('output file is required')
+  generate(arguments[0], options.opponents, options.samples, options.processes, options.seed)
+
+if __name__ == '__main__':
+  main()
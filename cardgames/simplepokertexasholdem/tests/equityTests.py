@@ -0,0 +1,116 @@
+'''
+@author: Paulo Cheque (paulocheque@gmail.com)
+'''
+
+import time
+import unittest
+
+from gameengine import players
+from cardgameengine import cards
+from cardgames import simplepokertexasholdem
+from cardgames.simplepokertexasholdem import equity
+
+def stack(string):
+  return cards.strToStackOfCards(string)
+
+class EquityCalculatorTests(unittest.TestCase):
+  
+  def testExhaustiveEnumerationOfTheRiver(self):
+    result = equity.calculate(stack('1-1 13-1'), stack('10-1 11-1 12-1 2-2 3-3'), opponents=1)
+    self.assertTrue(result.exhaustive and result.complete)
+    self.assertEquals(990, result.numberOfSamples) # C(45, 2)
+    self.assertEquals(1.0, result.winProbability())
+    result = equity.calculate(stack('2-1 3-2'), stack('10-1 10-2 10-3 10-4 13-1'), opponents=2)
+    # C(45, 2) * C(43, 2) cases is more than the budget of samples
+    self.assertFalse(result.exhaustive)
+    self.assertEquals(equity.DEFAULT_SAMPLES, result.numberOfSamples)
+    self.assertEquals(0, result.wins)
+    self.assertTrue(result.ties > 0)
+    
+  def testExhaustiveAndMonteCarloMustAgree(self):
+    exhaustive = equity.calculate(stack('7-1 8-1'), stack('9-1 10-2 2-3 2-1'), opponents=1, samples=50000)
+    montecarlo = equity.calculate(stack('7-1 8-1'), stack('9-1 10-2 2-3 2-1'), opponents=1, samples=10000,
+                                  exhaustive=False, seed=1)
+    self.assertEquals(46 * 990, exhaustive.numberOfSamples)
+    self.assertTrue(exhaustive.exhaustive and not montecarlo.exhaustive)
+    self.assertTrue(abs(exhaustive.equity() - montecarlo.equity()) < 5 * montecarlo.standardError() + 0.01)
+    
+  def testPairOfAsesBeforeTheFlop(self):
+    result = equity.calculate(stack('1-1 1-2'), opponents=1, samples=5000, seed=1)
+    self.assertEquals(5000, result.numberOfSamples)
+    self.assertTrue(0.81 < result.equity() < 0.89, result)
+    self.assertAlmostEquals(1.0, result.winProbability() + result.tieProbability() + result.lossProbability())
+    
+  def testTheSameSeedMustGenerateTheSameResultWithAnyNumberOfProcesses(self):
+    results = [equity.calculate(stack('1-1 13-2'), stack('9-1 10-2 2-3'), opponents=2, samples=6000, seed=42,
+                                processes=processes) for processes in [1, 1, 2]]
+    self.assertEquals(set([(result.wins, result.ties, result.losses) for result in results]),
+                      set([(results[0].wins, results[0].ties, results[0].losses)]))
+    
+  def testTheCalculatorReusesItsPoolOfProcesses(self):
+    calculator = equity.EquityCalculator(processes=2, seed=42)
+    try:
+      first = calculator.calculate(stack('1-1 13-2'), samples=5000)
+      pool = calculator.pool
+      second = calculator.calculate(stack('1-1 13-2'), samples=5000)
+      self.assertTrue(pool is not None and pool is calculator.pool)
+      # Each calculation has its own seed
+      self.assertNotEquals(first.wins, second.wins)
+    finally:
+      calculator.close()
+    
+  def testTimeLimit(self):
+    startTime = time.time()
+    result = equity.calculate(stack('1-1 1-2'), samples=10 ** 7, timeLimit=0.2)
+    self.assertTrue(time.time() - startTime < 1)
+    self.assertFalse(result.complete)
+    self.assertTrue(0 < result.numberOfSamples < 10 ** 7)
+    
+  def testInvalidSituations(self):
+    self.assertRaises(ValueError, equity.calculate, stack('1-1'))
+    self.assertRaises(ValueError, equity.calculate, stack('1-1 1-1'))
+    self.assertRaises(ValueError, equity.calculate, stack('1-1 2-1'), stack('1-1 3-3 4-4'))
+    self.assertRaises(ValueError, equity.calculate, stack('1-1 2-1'), None, 0)
+    self.assertRaises(ValueError, equity.calculate, stack('1-1 2-1'), None, 23)
+
+class StrategyTests(unittest.TestCase):
+  
+  def testEstimateEquityWithTheCardsOfTheContext(self):
+    strategy = simplepokertexasholdem.Strategy()
+    strategy.context = simplepokertexasholdem.Context()
+    strategy.context.playercards = stack('1-1 13-1')
+    strategy.context.communityCards = stack('10-1 11-1 12-1')
+    result = strategy.estimateEquity(opponents=3, samples=1000)
+    self.assertEquals(1.0, result.winProbability())
+    self.assertTrue(strategy.equityCalculator is not None)
+    strategy.closeEquityCalculator()
+    self.assertEquals(None, strategy.equityCalculator)
+    
+  def testEquityCalculatorIsRebuiltWhenTheNumberOfProcessesChanges(self):
+    strategy = simplepokertexasholdem.Strategy()
+    strategy.context = simplepokertexasholdem.Context()
+    strategy.context.playercards = stack('1-1 13-1')
+    strategy.estimateEquity(samples=5000, processes=2)
+    calculator = strategy.equityCalculator
+    self.assertTrue(calculator.pool is not None)
+    strategy.estimateEquity(samples=5000, processes=2)
+    self.assertTrue(strategy.equityCalculator is calculator)
+    strategy.estimateEquity(samples=5000, processes=1)
+    self.assertTrue(strategy.equityCalculator is not calculator)
+    self.assertEquals(None, calculator.pool)
+    strategy.closeEquityCalculator()
+    
+  def testTheEndOfTheGameClosesTheEquityCalculators(self):
+    strategy = simplepokertexasholdem.Strategy()
+    player = players.Player('Player1', strategy=strategy, contextClass=simplepokertexasholdem.Context)
+    game = simplepokertexasholdem.SimpleCommunityPoker([player], simplepokertexasholdem.Configurations())
+    strategy.context.playercards = stack('1-1 13-1')
+    strategy.estimateEquity(samples=5000, processes=2)
+    calculator = strategy.equityCalculator
+    game.releaseWorkers()
+    self.assertEquals(None, strategy.equityCalculator)
+    self.assertEquals(None, calculator.pool)
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
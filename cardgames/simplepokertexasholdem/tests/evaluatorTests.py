@@ -0,0 +1,147 @@
+'''
+@author: Paulo Cheque (paulocheque@gmail.com)
+'''
+
+import unittest, random, timeit
+
+from gameengine import players
+from cardgameengine import cards
+from cardgames import simplepokertexasholdem
+from cardgames.simplepokertexasholdem import evaluator
+
+def strength(string):
+  return evaluator.evaluate(cards.strToStackOfCards(string).cards)
+
+class EvaluatorTests(unittest.TestCase):
+  
+  def testCategories(self):
+    self.assertEquals(evaluator.ROYAL_STRAIGHT_FLUSH, evaluator.category(strength('10-1 11-1 12-1 13-1 1-1')))
+    self.assertEquals(evaluator.STRAIGHT_FLUSH, evaluator.category(strength('1-2 2-2 3-2 4-2 5-2')))
+    self.assertEquals(evaluator.FOUR_OF_A_KIND, evaluator.category(strength('7-1 7-2 7-3 7-4 5-2')))
+    self.assertEquals(evaluator.FULL_HOUSE, evaluator.category(strength('7-1 7-2 7-3 5-4 5-2')))
+    self.assertEquals(evaluator.FLUSH, evaluator.category(strength('1-3 9-3 7-3 5-3 2-3')))
+    self.assertEquals(evaluator.STRAIGHT, evaluator.category(strength('10-1 11-2 12-1 13-1 1-1')))
+    self.assertEquals(evaluator.THREE_OF_A_KIND, evaluator.category(strength('7-1 7-2 7-3 5-4 4-2')))
+    self.assertEquals(evaluator.TWO_PAIR, evaluator.category(strength('7-1 7-2 5-3 5-4 4-2')))
+    self.assertEquals(evaluator.PAIR, evaluator.category(strength('7-1 7-2 5-3 6-4 4-2')))
+    self.assertEquals(evaluator.HIGH_CARD, evaluator.category(strength('7-1 9-2 5-3 6-4 4-2')))
+    self.assertEquals('FullHouse', evaluator.categoryName(strength('7-1 7-2 7-3 5-4 5-2')))
+    
+  def testTiebreaks(self):
+    self.assertTrue(strength('1-1 1-2 5-3 6-4 4-2') > strength('13-1 13-2 5-3 6-4 4-2'))
+    self.assertTrue(strength('7-1 7-2 5-3 6-4 4-2') > strength('7-3 7-4 5-1 6-2 3-2'))
+    self.assertTrue(strength('2-1 3-2 4-3 5-4 6-2') > strength('1-1 2-2 3-3 4-4 5-2'))
+    self.assertTrue(strength('5-1 5-2 5-3 2-4 2-2') > strength('4-1 4-2 4-3 1-4 1-2'))
+    self.assertEquals(strength('7-1 7-2 5-3 6-4 4-2'), strength('7-3 7-4 5-1 6-2 4-1'))
+    
+  def testNumberOfDistinctHands(self):
+    strengths = set(evaluator.FLUSHES) | set(evaluator.UNIQUE_RANKS) | set(evaluator.REPEATED_RANKS.values())
+    strengths.discard(0)
+    self.assertEquals(7462, len(strengths))
+    counts = [0] * 10
+    for s in strengths:
+      counts[evaluator.category(s)] += 1
+    self.assertEquals([1277, 2860, 858, 858, 10, 1277, 156, 156, 9, 1], counts)
+    
+  def testBestHandOfSevenCards(self):
+    self.assertEquals(strength('7-1 7-2 7-3 5-4 5-2'), strength('7-1 7-2 7-3 5-4 5-2 2-1 3-1'))
+    self.assertEquals(evaluator.FLUSH, evaluator.category(strength('1-3 9-3 7-3 5-3 2-3 9-1 9-2')))
+    self.assertRaises(ValueError, evaluator.evaluate, cards.strToStackOfCards('1-1 2-2 3-3 4-4').cards)
+    
+  def testBestHandInOnePassIsTheBestOfTheSubsets(self):
+    self.assertEquals(strength('2-1 3-2 4-3 5-4 6-2'), strength('1-1 2-1 3-2 4-3 5-4 6-2 6-1'))
+    self.assertEquals(strength('9-1 9-2 9-3 5-4 5-2'), strength('9-1 9-2 9-3 5-4 5-2 4-1 4-3'))
+    self.assertEquals(strength('9-1 9-2 9-3 5-4 5-2'), strength('9-1 9-2 9-3 5-4 5-2 5-1 13-3'))
+    self.assertEquals(evaluator.STRAIGHT_FLUSH, evaluator.category(strength('1-1 2-1 3-1 4-1 5-1 6-2 13-1')))
+    deck = cards.DeckPrototypeBuilder.createCommonDeck(cards.Card, 4, 13).cards
+    rng = random.Random(7)
+    for x in range(2000):
+      hand = rng.sample(deck, rng.choice([6, 7]))
+      self.assertEquals(evaluator.evaluateBySubsets(hand), evaluator.evaluateBest(hand), hand)
+
+  def testBestCardsAreTheCardsOfTheBestHand(self):
+    wheel = cards.strToStackOfCards('1-1 2-1 3-2 4-3 5-4 9-2 9-1').cards
+    self.assertEquals(cards.strToStackOfCards('5-4 4-3 3-2 2-1 1-1').cards, evaluator.bestCards(wheel))
+    fullHouse = cards.strToStackOfCards('9-1 5-4 9-2 5-2 9-3 5-1 13-3').cards
+    self.assertEquals(cards.strToStackOfCards('9-1 9-2 9-3 5-4 5-2').cards, evaluator.bestCards(fullHouse))
+    deck = cards.DeckPrototypeBuilder.createCommonDeck(cards.Card, 4, 13).cards
+    rng = random.Random(3)
+    for x in range(2000):
+      hand = rng.sample(deck, rng.choice([5, 6, 7]))
+      best = evaluator.bestCards(hand)
+      self.assertEquals(5, len(set(best)))
+      self.assertTrue(set(best) <= set(hand))
+      self.assertEquals(evaluator.evaluate(hand), evaluator.evaluate5(best), hand)
+    self.assertRaises(ValueError, evaluator.bestCards, wheel, strength('10-1 11-2 12-1 13-1 1-1'))
+
+class EvaluatorBenchmarkTests(unittest.TestCase):
+  
+  def setUp(self):
+    deck = cards.DeckPrototypeBuilder.createCommonDeck(cards.Card, 4, 13).cards
+    rng = random.Random(1)
+    self.hands = [rng.sample(deck, 7) for x in range(2000)]
+    
+  def handsPerSecond(self, function):
+    seconds = min(timeit.Timer(lambda: [function(hand) for hand in self.hands]).repeat(3, 1))
+    return len(self.hands) / seconds
+    
+  def testOnePassMustBeFasterThanTheSubsets(self):
+    # About 5 times faster: 21 evaluations of 5 cards per hand of 7 cards
+    self.assertTrue(self.handsPerSecond(evaluator.evaluate) > 2 * self.handsPerSecond(evaluator.evaluateBySubsets))
+
+class CombinationTests(unittest.TestCase):
+  
+  def combination(self, string):
+    stack = simplepokertexasholdem.StackOfCards()
+    stack.pushAll(cards.strToStackOfCards(string))
+    return simplepokertexasholdem.CombinationFactory.create(stack)
+  
+  def testKeyIsComputedOnce(self):
+    combination = self.combination('7-1 7-2 5-3 5-4 4-2')
+    self.assertTrue(isinstance(combination, simplepokertexasholdem.TwoPair))
+    self.assertEquals(strength('7-1 7-2 5-3 5-4 4-2'), combination.strength)
+    
+  def testComparisonsOfKeys(self):
+    pair = self.combination('7-1 7-2 5-3 6-4 4-2')
+    samePair = self.combination('7-3 7-4 5-1 6-2 4-1')
+    betterPair = self.combination('7-3 7-4 5-1 6-2 8-1')
+    flush = self.combination('1-3 9-3 7-3 5-3 2-3')
+    self.assertEquals([pair, betterPair, flush], sorted([flush, betterPair, pair]))
+    self.assertEquals(pair, samePair)
+    self.assertTrue(pair <= samePair and pair >= samePair)
+    self.assertTrue(pair < betterPair and betterPair > pair)
+    self.assertEquals(0, pair.untie(samePair))
+    self.assertTrue(pair.untie(betterPair) < 0)
+    self.assertNotEquals(None, pair)
+
+class RoundTests(unittest.TestCase):
+  
+  def setUp(self):
+    self.player1 = players.Player('Player1', strategy=simplepokertexasholdem.Strategy(),
+                                  contextClass=simplepokertexasholdem.Context)
+    self.player2 = players.Player('Player2', strategy=simplepokertexasholdem.Strategy(),
+                                  contextClass=simplepokertexasholdem.Context)
+    configurations = simplepokertexasholdem.Configurations()
+    game = simplepokertexasholdem.SimpleCommunityPoker([self.player1, self.player2], configurations)
+    self.round = simplepokertexasholdem.Round(game, [self.player1, self.player2], configurations, game.commandsManager)
+    self.round.seeCards(self.player1).pushAll(cards.strToStackOfCards('7-3 8-3'))
+    self.round.seeCards(self.player2).pushAll(cards.strToStackOfCards('1-1 1-2'))
+    self.round.communityCards.pushAll(cards.strToStackOfCards('7-1 9-2 5-3 6-4 4-2'))
+  
+  def testPossibleCombinationsAreAllSubsetsOfFiveCards(self):
+    combinations = self.round.possibleCombinations(self.player1)
+    self.assertEquals(21, len(combinations))
+    self.assertEquals(21, len(set(str(sorted(combination.cards)) for combination in combinations)))
+    self.assertEquals(strength('5-3 6-4 7-1 8-3 9-2'), self.round.bestStrength(self.player1))
+    combination = self.round.bestCombination(self.player1)
+    self.assertTrue(isinstance(combination, simplepokertexasholdem.Straigth))
+    self.assertEquals([5, 6, 7, 8, 9], [card.value for card in combination.stack.cards])
+    
+  def testShowdown(self):
+    self.round.showdown()
+    self.assertEquals(['Player1'], [player.name for player in self.round.winners()])
+    self.assertEquals('Straigth', self.round.report().typeWinnerCombination)
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,117 @@
+'''
+@author: Paulo Cheque (paulocheque@gmail.com)
+'''
+
+import itertools
+import os
+import shutil
+import tempfile
+import unittest
+
+from gameengine import players
+from cardgameengine import cards
+from cardgames import simplepokertexasholdem
+from cardgames.simplepokertexasholdem import equity, preflop
+
+class StartingHandsTests(unittest.TestCase):
+  
+  def testThereAre169StartingHands(self):
+    deck = cards.DeckPrototypeBuilder.createCommonDeck(cards.Card, 4, 13).cards
+    counts = {}
+    for card1, card2 in itertools.combinations(deck, 2):
+      index = preflop.handIndex(card1, card2)
+      self.assertEquals(index, preflop.handIndex(card2, card1))
+      counts[index] = counts.get(index, 0) + 1
+    self.assertEquals(range(169), sorted(counts))
+    # 6 combinations of each pair, 4 of each suited hand and 12 of each offsuit hand
+    self.assertEquals(sorted([6] * 13 + [4] * 78 + [12] * 78), sorted(counts.values()))
+    
+  def testRepresentativeCardsAndNames(self):
+    for index in range(169):
+      self.assertEquals(index, preflop.handIndex(*preflop.representativeCards(index)))
+    self.assertEquals('AA', preflop.handName(preflop.handIndex(cards.Card(1, 1), cards.Card(1, 2))))
+    self.assertEquals('AKs', preflop.handName(preflop.handIndex(cards.Card(13, 3), cards.Card(1, 3))))
+    self.assertEquals('72o', preflop.handName(preflop.handIndex(cards.Card(2, 3), cards.Card(7, 1))))
+
+class PreflopTableTests(unittest.TestCase):
+  
+  @classmethod
+  def setUpClass(cls):
+    cls.directory = tempfile.mkdtemp()
+    cls.path = os.path.join(cls.directory, 'preflop.bin')
+    preflop.generate(cls.path, maxOpponents=2, samples=300, processes=1, seed=42)
+    
+  @classmethod
+  def tearDownClass(cls):
+    preflop.tables.pop(cls.path).close()
+    shutil.rmtree(cls.directory)
+    
+  def setUp(self):
+    self.table = preflop.loadTable(self.path)
+    
+  def testCompactFile(self):
+    self.assertEquals(preflop.HEADER.size + 2 * 169 * 2, os.path.getsize(self.path))
+    self.assertEquals(2, self.table.maxOpponents)
+    self.assertEquals(300, self.table.samples)
+    self.assertTrue(self.table is preflop.loadTable(self.path))
+    
+  def testLookups(self):
+    aces = cards.strToStackOfCards('1-1 1-2')
+    sevenTwo = cards.strToStackOfCards('7-3 2-4')
+    self.assertTrue(0.75 < self.table.equity(aces) < 0.95)
+    self.assertTrue(self.table.equity(aces, 2) < self.table.equity(aces, 1))
+    self.assertTrue(self.table.equity(sevenTwo) < 0.5)
+    self.assertEquals(self.table.equity(aces), self.table.equity(cards.strToStackOfCards('1-3 1-4')))
+    self.assertRaises(ValueError, self.table.equity, aces, 3)
+    
+  def testInvalidFile(self):
+    path = os.path.join(self.directory, 'invalid.bin')
+    open(path, 'wb').write(open(self.path, 'rb').read()[:-2])
+    self.assertRaises(ValueError, preflop.PreflopTable, path)
+    
+  def testStrategyLookup(self):
+    strategy = simplepokertexasholdem.Strategy()
+    strategy.context = simplepokertexasholdem.Context()
+    strategy.context.playercards = cards.strToStackOfCards('13-1 1-1')
+    self.assertEquals(self.table.equityOfHand(preflop.handIndex(cards.Card(1, 1), cards.Card(13, 1)), 2),
+                      strategy.preflopEquity(2, self.path))
+
+class DefaultTableTests(unittest.TestCase):
+  
+  def setUp(self):
+    self.players = [players.Player('Player%s' % i, strategy=simplepokertexasholdem.Strategy(),
+                                   contextClass=simplepokertexasholdem.Context) for i in range(2)]
+    self.configurations = simplepokertexasholdem.Configurations()
+  
+  def testDefaultTableIsShippedWithThePackage(self):
+    table = preflop.loadTable()
+    self.assertTrue(table is preflop.loadTable(preflop.DEFAULT_PATH))
+    self.assertEquals(preflop.MAX_OPPONENTS, table.maxOpponents)
+    self.assertEquals(equity.DEFAULT_SAMPLES, table.samples)
+    self.assertTrue(0.8 < table.equity(cards.strToStackOfCards('1-1 1-2')) < 0.9)
+    strategy = simplepokertexasholdem.Strategy()
+    strategy.context = simplepokertexasholdem.Context()
+    strategy.context.playercards = cards.strToStackOfCards('13-1 1-1')
+    self.assertEquals(table.equity(strategy.context.playercards), strategy.preflopEquity())
+    
+  def testMissingTableMustRaiseAnErrorThatExplainsHowToGenerateIt(self):
+    path = os.path.join(tempfile.gettempdir(), 'missing', 'preflop.bin')
+    try:
+      preflop.loadTable(path)
+    except IOError, e:
+      self.assertTrue('python -m cardgames.simplepokertexasholdem.preflop' in str(e))
+    else: self.fail()
+    self.assertFalse(path in preflop.tables)
+    
+  def testTheGameLoadsTheTableWhenItStarts(self):
+    game = simplepokertexasholdem.SimpleCommunityPoker(self.players, self.configurations)
+    self.assertEquals(None, game.preflopTable)
+    game.openPreflopTable()
+    self.assertTrue(game.preflopTable is preflop.loadTable())
+    self.configurations.preflopTable = os.path.join(tempfile.gettempdir(), 'missing', 'preflop.bin')
+    game = simplepokertexasholdem.SimpleCommunityPoker(self.players, self.configurations)
+    self.assertRaises(IOError, game.start)
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
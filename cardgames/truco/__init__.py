@@ -18,6 +18,7 @@ from cardgameengine.constants import *
 # [optional] 1): Define the kind of Cards that your game has
 
 class TrucoCard(cards.SuitCard):
+  __slots__ = ()
   values = cards.VALUES_ANGLO_AMERICAN
   suits = cards.SUITS_ANGLO_AMERICAN
   
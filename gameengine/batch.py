@@ -0,0 +1,306 @@
+'''
+@author: Paulo Cheque (paulocheque@gmail.com)
+
+Run many games of one factory in a pool of processes and aggregate their reports.
+
+Example of usage:
+
+from gameengine import batch
+from cardgames import hole
+
+runner = batch.BatchRunner(hole.GameFactory(), {'Player1': strategy1, 'Player2': strategy2})
+report = runner.run(10000)
+print(report.summary())
+
+Command line:
+
+python -m gameengine.batch cardgames.hole 10000 -p Player1=strategy1.py -p Player2=mymodule:MyStrategy
+'''
+
+import ast
+import itertools
+import logging
+import multiprocessing
+import optparse
+import random
+import time
+from string import Template
+from gameengine import utils
+from gameengine.logger import logger
+
+###############################################################################
+# Games (executed in the worker processes)
+
+# Set by initializeWorker: (factory, mapPlayersToStrategy, mapPlayersTeams, mapOfConfigurations, seed)
+workerSetup = None
+
+def initializeWorker(setup):
+  global workerSetup
+  workerSetup = setup
+  # Thousands of games: only warnings and errors
+  logger.setLevel(logging.WARN)
+
+def playGameInWorker(index):
+  return playGame(workerSetup, index)
+
+def playGame(setup, index):
+  return playGameWithSeed(setup, utils.deriveSeed(setup[4], index))
+
+def playGameWithSeed(setup, gameSeed):
+  factory, mapPlayersToStrategy, mapPlayersTeams, mapOfConfigurations, seed = setup
+  # The game uses its own generator (configuration seed). The module random is seeded for the strategies 
+  # that use it, and its state is restored after the game: the random numbers of the caller do not change.
+  state = random.getstate()
+  random.seed(gameSeed)
+  try:
+    configurations = dict(mapOfConfigurations or {})
+    configurations['seed'] = gameSeed
+    # Only the reports are used: card games reuse the containers of the finished rounds
+    configurations.setdefault('recycleRounds', True)
+    try:
+      game = factory.createGame(mapPlayersToStrategy, mapPlayersTeams, configurations)
+    except Exception, e:
+      return {'players': sorted(mapPlayersToStrategy.keys()), 'winners': [], 'losers': [],
+              'durationTime': 0, 'playersDurationTime': {}, 'numberOfRounds': None,
+              'error': e.__class__.__name__, 'seed': gameSeed}
+    try:
+      game.start()
+    except Exception:
+      pass # The report has the exception
+    return gameResult(game.report())
+  finally:
+    random.setstate(state)
+
+def gameResult(report):
+  '''
+  Small and picklable summary of a GameReport, sent by the workers to the BatchReport.
+  '''
+  playersDurationTime = {}
+  for player, times in report.playersDurationTime.items():
+    playersDurationTime[player] = (sum(times), len(times))
+  numberOfRounds = None
+  if hasattr(report, 'roundsReports'): numberOfRounds = len(report.roundsReports)
+  error = None
+  if report.exception is not None: error = report.exception.__class__.__name__
+  return {'players': report.players[:],
+          'winners': [winner.name for winner in report.winners],
+          'losers': [loser.name for loser in report.losers],
+          'durationTime': report.durationTime,
+          'playersDurationTime': playersDurationTime,
+          'numberOfRounds': numberOfRounds,
+          'error': error,
+          'seed': report.seed}
+
+###############################################################################
+
+class BatchReport(object):
+  '''
+  Aggregated data of many games: win rates, durations and errors.
+  seeds: seed of each game (in the order of the results), errorsSeeds: exception class name => seeds of the games.
+  A game is replayed by its seed (BatchRunner.replay).
+  '''
+
+  def __init__(self, game=None):
+    self.game = game
+    self.players = []
+    self.numberOfGames = 0
+    self.durationTime = 0 # wall time of the batch
+    self.wins = {}
+    self.losses = {}
+    self.errors = {} # exception class name: number of games
+    self.errorsSeeds = {}
+    self.seeds = []
+    self.gamesDurationTime = 0
+    self.maxGameDurationTime = 0
+    self.playersDurationTime = {} # player: [total time, number of plays]
+    self.numberOfRounds = 0
+
+  def __str__(self):
+    return self.summary()
+
+  def addGameResult(self, result):
+    self.numberOfGames += 1
+    for player in result['players']:
+      if player not in self.players:
+        self.players.append(player)
+        self.wins[player] = 0
+        self.losses[player] = 0
+        self.playersDurationTime[player] = [0, 0]
+    for winner in result['winners']: self.wins[winner] += 1
+    for loser in result['losers']: self.losses[loser] += 1
+    seed = result.get('seed')
+    self.seeds.append(seed)
+    if result['error'] is not None:
+      self.errors[result['error']] = self.errors.get(result['error'], 0) + 1
+      self.errorsSeeds.setdefault(result['error'], []).append(seed)
+    self.gamesDurationTime += result['durationTime']
+    self.maxGameDurationTime = max(self.maxGameDurationTime, result['durationTime'])
+    for player, (durationTime, numberOfPlays) in result['playersDurationTime'].items():
+      self.playersDurationTime[player][0] += durationTime
+      self.playersDurationTime[player][1] += numberOfPlays
+    if result['numberOfRounds'] is not None:
+      self.numberOfRounds += result['numberOfRounds']
+
+  def winRate(self, player):
+    if self.numberOfGames == 0: return 0.0
+    return float(self.wins.get(player, 0)) / self.numberOfGames
+
+  def numberOfErrors(self):
+    return sum(self.errors.values())
+
+  def averageGameDurationTime(self):
+    if self.numberOfGames == 0: return 0.0
+    return float(self.gamesDurationTime) / self.numberOfGames
+
+  def gamesPerSecond(self):
+    if self.durationTime <= 0: return 0.0
+    return self.numberOfGames / float(self.durationTime)
+
+  def seedsSummary(self, seeds, maxSeeds=5):
+    summary = ', '.join(str(seed) for seed in seeds[:maxSeeds])
+    if len(seeds) > maxSeeds: summary += ', ...'
+    return summary
+
+  def summary(self):
+    t = Template(
+'''
+${game} Batch Report:
+- ${numberOfGames} game(s) in ${durationTime}s: ${gamesPerSecond} games/s
+- durationTime per game: average ${averageGameDurationTime}s, max ${maxGameDurationTime}s
+- rounds: ${numberOfRounds}
+- players (wins/losses/win rate/average time per play):
+  ${players}
+- errors: ${numberOfErrors}
+  ${errors}
+''')
+    players = []
+    for player in self.players:
+      totalTime, numberOfPlays = self.playersDurationTime[player]
+      averageTime = 0.0
+      if numberOfPlays > 0: averageTime = totalTime / numberOfPlays
+      players.append('%s: %d/%d/%.3f/%.4fs' % (player, self.wins[player], self.losses[player],
+                                               self.winRate(player), averageTime))
+    errors = '\n  '.join('%s: %d (seeds: %s)' % (error, number, self.seedsSummary(self.errorsSeeds.get(error, [])))
+                          for error, number in sorted(self.errors.items()))
+    return t.substitute(
+                 game=self.game,
+                 numberOfGames=self.numberOfGames,
+                 durationTime='%.3f' % self.durationTime,
+                 gamesPerSecond='%.2f' % self.gamesPerSecond(),
+                 averageGameDurationTime='%.4f' % self.averageGameDurationTime(),
+                 maxGameDurationTime='%.4f' % self.maxGameDurationTime,
+                 numberOfRounds=self.numberOfRounds,
+                 players='\n  '.join(players),
+                 numberOfErrors=self.numberOfErrors(),
+                 errors=errors)
+
+###############################################################################
+
+class BatchRunner(object):
+  '''
+  # factory: the GameFactory of the game
+  # processes (default None): number of processes, None = number of CPUs, 1 = run in the current process
+  # seed (default None = current time): game i uses the seed utils.deriveSeed(seed, i), so a batch 
+  #                                    and each of its games (result 'seed') can be reproduced
+
+  The strategies and configurations are shared with the workers by fork, they do not need to be picklable.
+  Card games recycle their rounds (recycleRounds), unless mapOfConfigurations has recycleRounds=False.
+  '''
+
+  def __init__(self, factory, mapPlayersToStrategy, mapPlayersTeams={}, mapOfConfigurations=None,
+               processes=None, seed=None):
+    self.factory = factory
+    self.mapPlayersToStrategy = mapPlayersToStrategy
+    self.mapPlayersTeams = mapPlayersTeams
+    self.mapOfConfigurations = mapOfConfigurations
+    self.processes = processes
+    if processes is None: self.processes = multiprocessing.cpu_count()
+    self.seed = seed
+    if seed is None: self.seed = int(time.time())
+
+  def setup(self):
+    return (self.factory, self.mapPlayersToStrategy, self.mapPlayersTeams, self.mapOfConfigurations, self.seed)
+
+  def run(self, numberOfGames):
+    report = BatchReport(self.factory.gameClass.name())
+    startTime = time.time()
+    if self.processes == 1:
+      setup = self.setup()
+      for result in itertools.imap(lambda index: playGame(setup, index), xrange(numberOfGames)):
+        report.addGameResult(result)
+    else:
+      pool = multiprocessing.Pool(self.processes, initializeWorker, [self.setup()])
+      try:
+        chunksize = max(1, numberOfGames / (self.processes * 4))
+        for result in pool.imap_unordered(playGameInWorker, xrange(numberOfGames), chunksize):
+          report.addGameResult(result)
+        pool.close()
+      finally:
+        pool.terminate()
+        pool.join()
+    report.durationTime = time.time() - startTime
+    return report
+
+  def replay(self, gameSeed):
+    '''
+    Play again one game of a batch (seed of the BatchReport) in the current process: result of the game
+    '''
+    return playGameWithSeed(self.setup(), gameSeed)
+
+###############################################################################
+# Command line
+
+def importObject(path):
+  '''
+  mypackage.mymodule:MyClass
+  '''
+  moduleName, attribute = path.split(':')
+  module = __import__(moduleName, fromlist=[attribute])
+  return getattr(module, attribute)
+
+def parseStrategy(value):
+  '''
+  A file with the source code of the strategy (RuntimeStrategy) or a class (mymodule:MyStrategy)
+  '''
+  if ':' in value:
+    strategy = importObject(value)
+    if isinstance(strategy, type): strategy = strategy()
+    return strategy
+  return unicode(open(value).read())
+
+def parseValue(value):
+  try:
+    return ast.literal_eval(value)
+  except (ValueError, SyntaxError):
+    return value
+
+def parseMap(pairs, function=lambda value: value):
+  result = {}
+  for pair in pairs:
+    key, value = pair.split('=', 1)
+    result[key] = function(value)
+  return result
+
+def main(args=None):
+  parser = optparse.OptionParser(usage='%prog [options] game-module number-of-games\n\n' +
+                                       'Example: %prog cardgames.hole 1000 -p Player1=strategy.py -p Player2=strategy.py')
+  parser.add_option('-p', '--player', action='append', default=[], metavar='NAME=STRATEGY',
+                    help='strategy file (source code) or class (module:Class)')
+  parser.add_option('-t', '--team', action='append', default=[], metavar='NAME=TEAM')
+  parser.add_option('-c', '--configuration', action='append', default=[], metavar='KEY=VALUE')
+  parser.add_option('--processes', type='int', default=None, help='default: number of CPUs')
+  parser.add_option('--seed', type='int', default=None)
+  options, arguments = parser.parse_args(args)
+  if len(arguments) != 2 or len(options.player) == 0:
+    parser.error('game module, number of games and players are required')
+  module = __import__(arguments[0], fromlist=['GameFactory'])
+  runner = BatchRunner(module.GameFactory(),
+                       parseMap(options.player, parseStrategy),
+                       parseMap(options.team),
+                       parseMap(options.configuration, parseValue),
+                       options.processes,
+                       options.seed)
+  print(runner.run(int(arguments[1])).summary())
+
+if __name__ == '__main__':
+  main()
@@ -4,11 +4,13 @@
 '''
 
 import time
+import logging
 import threading
+from array import array
 from string import Template
 from domain import dataobjects
 from gameengine import utils, errors, threading2
-from gameengine.logger import logger
+from gameengine.logger import logger, Lazy
 
 # Command
 class GameCommand(object):
@@ -22,8 +24,13 @@ class GameCommand(object):
     def execute(self, game):
       # some implementation here, example:
       game.removePlayer(self.player)
+      
+  changes: names of the context attributes that the command can change (None = all), 
+  contexts refresh only these attributes. Example: changes = ('deckHeight', 'discardedCards')
   '''
   
+  changes = None
+  
   def __init__(self):
     self.durationTime = 0
     
@@ -42,17 +49,22 @@ class GameCommand(object):
 
   def execute(self, game):
     raise NotImplementedError()
-  
+
+  def checkDeadline(self):
+    # Commands are not traced: long commands must check their deadline in its loops
+    threading2.checkDeadline()
+
   def process(self, game):
     startTime = time.clock()
     thread = None
     try:
       thread = threading2.KThread(target=self.execute, 
                                   args=[game],
-                                  name='Thread-Command-' + self.name())
+                                  name='Thread-Command-' + self.name(),
+                                  traced=False)
       thread.start()
       thread.joinWithTimeout(game.configurations.timeForCommand)
-      if thread.isExpired():
+      if thread.isExpired() or thread.isCancelled():
         endTime = time.clock()
         self.durationTime = endTime - startTime
         raise errors.TimeoutCommandError(self)
@@ -63,6 +75,26 @@ class GameCommand(object):
       endTime = time.clock()
       self.durationTime = endTime - startTime
       
+  def processInline(self, game):
+    '''
+    Execute the command in the caller thread, without creating a new thread.
+    Only trusted commands (engine commands) must be processed inline, because 
+    the timeForCommand can only be verified after the end of the execution.
+    The duration is the wall time (like the timeForCommand), not the processor time.
+    '''
+    startTime = time.time()
+    try:
+      self.execute(game)
+    except errors.CommandError: raise
+    except Exception, e:
+      raise errors.BuggedCommandError(self, str(e))
+    finally:
+      endTime = time.time()
+      self.durationTime = endTime - startTime
+    timeForCommand = game.configurations.timeForCommand
+    if timeForCommand >= 0 and self.durationTime > timeForCommand:
+      raise errors.TimeoutCommandError(self)
+      
 class PlayerCommand(GameCommand):
   '''
   Example of usage:
@@ -115,21 +147,182 @@ class PlayerCommand(GameCommand):
   def executeWithValidation(self, game):
     raise NotImplementedError()
   
+class CommandRecord(object):
+  '''
+  One row of the CommandsLog, created only when the log is read.
+  '''
+  
+  def __init__(self, name, player, params, durationTime, timestamp):
+    self.name = name
+    self.player = player # None for game commands
+    self.params = params
+    self.durationTime = durationTime
+    self.timestamp = timestamp
+    
+  def __str__(self):
+    return self.summary()
+  
+  def __eq__(self, other):
+    return isinstance(other, CommandRecord) and self.__dict__ == other.__dict__
+  
+  def __ne__(self, other):
+    return not self.__eq__(other)
+    
+  def summary(self):
+    '''
+    Same format of GameCommand.summary and PlayerCommand.summary
+    '''
+    if self.player is None:
+      return '%s - %ss' % (self.name, self.durationTime)
+    params = '---'
+    if self.params is not None: params = self.params
+    return '%s, %s, %s - %ss' % (self.name, self.player, params, self.durationTime)
+
+class CommandsLog(object):
+  '''
+  Columnar log of the executed commands: command type id, player id, params, duration and timestamp.
+  Commands and contexts are not referenced, only the names (ids of small tables) and the params.
+  
+  # capacity (default 0 = unbounded): only the last capacity commands are kept (ring buffer)
+  
+  Iterating over the log creates CommandRecord objects (see summaries()).
+  '''
+  
+  NO_PLAYER = -1
+  
+  def __init__(self, capacity=0):
+    self.capacity = capacity
+    self.commandNames = []
+    self.playerNames = []
+    self.__commandIds = {}
+    self.__playerIds = {}
+    self.types = array('H')
+    self.players = array('h')
+    self.durations = array('d')
+    self.timestamps = array('d')
+    self.params = []
+    self.first = 0 # index of the oldest row when the ring buffer is full
+    self.numberOfCommands = 0 # including the discarded ones
+    
+  def __len__(self):
+    return len(self.types)
+  
+  def __iter__(self):
+    for index in xrange(len(self)):
+      yield self[index]
+  
+  def __getitem__(self, index):
+    if index < 0: index += len(self)
+    if index < 0 or index >= len(self): raise IndexError('commands log index out of range')
+    row = self.row(index)
+    playerId = self.players[row]
+    player = None
+    if playerId != CommandsLog.NO_PLAYER: player = self.playerNames[playerId]
+    return CommandRecord(self.commandNames[self.types[row]], player, self.params[row], 
+                         self.durations[row], self.timestamps[row])
+    
+  def __eq__(self, other):
+    if isinstance(other, (CommandsLog, list, tuple)):
+      return list(self) == list(other)
+    return NotImplemented
+  
+  def __ne__(self, other):
+    equals = self.__eq__(other)
+    if equals is NotImplemented: return equals
+    return not equals
+  
+  def row(self, index):
+    if self.capacity > 0 and len(self) == self.capacity:
+      return (self.first + index) % self.capacity
+    return index
+    
+  def idOf(self, name, table, ids):
+    identifier = ids.get(name)
+    if identifier is None:
+      identifier = ids[name] = len(table)
+      table.append(name)
+    return identifier
+    
+  def add(self, command):
+    typeId = self.idOf(command.name(), self.commandNames, self.__commandIds)
+    playerId = CommandsLog.NO_PLAYER
+    params = None
+    player = getattr(command, 'player', None)
+    if player is not None:
+      playerId = self.idOf(str(player), self.playerNames, self.__playerIds)
+      params = command.params
+    self.numberOfCommands += 1
+    if self.capacity > 0 and len(self) == self.capacity:
+      row = self.first
+      self.first = (self.first + 1) % self.capacity
+      self.types[row] = typeId
+      self.players[row] = playerId
+      self.durations[row] = command.durationTime
+      self.timestamps[row] = time.time()
+      self.params[row] = params
+    else:
+      self.types.append(typeId)
+      self.players.append(playerId)
+      self.durations.append(command.durationTime)
+      self.timestamps.append(time.time())
+      self.params.append(params)
+      
+  def setCapacity(self, capacity):
+    '''
+    Rows are reordered from the oldest to the newest and only the last capacity rows are kept
+    '''
+    rows = [self.row(index) for index in xrange(len(self))]
+    if capacity > 0: rows = rows[-capacity:]
+    self.types = array('H', [self.types[row] for row in rows])
+    self.players = array('h', [self.players[row] for row in rows])
+    self.durations = array('d', [self.durations[row] for row in rows])
+    self.timestamps = array('d', [self.timestamps[row] for row in rows])
+    self.params = [self.params[row] for row in rows]
+    self.first = 0
+    self.capacity = capacity
+      
+  def numberOfDiscardedCommands(self):
+    return self.numberOfCommands - len(self)
+  
+  def summaries(self):
+    for record in self:
+      yield record.summary()
+
 # Invoker of Command pattern.
 # Client: Player-Strategy
 # Receiver: Game
 class CommandsManager(object):
   '''
   Invoke GameCommand commands.
+  
+  inlineTrustedCommands: if True, trusted commands (StartGame, EndGame, PlayerPlays, Step...) 
+  are executed in the caller thread instead of a new thread per command.
+  
+  executedCommands: CommandsLog of the last executed commands (the game bounds it by commandsLogCapacity),
+  the commands and their contexts are not referenced.
   '''
   
-  def __init__(self, game=None):
+  def __init__(self, game=None, inlineTrustedCommands=False):
     self.game = game
-    self.executedCommands = []
+    self.executedCommands = CommandsLog()
     self.validCommands = []
+    self.trustedCommands = []
+    self.inlineTrustedCommands = inlineTrustedCommands
     
   def registerCommand(self, commandClass):
-    self.validCommands.append(commandClass)
+    if commandClass not in self.validCommands:
+      self.validCommands.append(commandClass)
+    
+  def registerTrustedCommand(self, commandClass):
+    '''
+    Trusted commands are commands of the engine/game, they are never created by strategies.
+    '''
+    self.registerCommand(commandClass)
+    if commandClass not in self.trustedCommands:
+      self.trustedCommands.append(commandClass)
+    
+  def isInlineCommand(self, command):
+    return self.inlineTrustedCommands and command.__class__ in self.trustedCommands
     
   def validateRegisteredCommand(self, command):
     if command.__class__ not in self.validCommands: 
@@ -142,16 +335,26 @@ class CommandsManager(object):
     pass
     
   def executeCommand(self, command):
-    logger.debug('Executing command: ' + command.summary())
+    logger.debug('Executing command: %s', Lazy(command.summary))
     self.game.permission.acquire()
-    self.validateRegisteredCommand(command)
-    command.process(self.game)
-    self.game.notifyExecutedCommand(command)
-    self.game.permission.release()
-    self.executedCommands.append(command)
-    logger.info('> ' + command.summary())
-    if isinstance(command, PlayerCommand):
-      logger.info(command.player.context.summary())
+    try:
+      self.validateRegisteredCommand(command)
+      self.processCommand(command)
+      self.game.notifyExecutedCommand(command)
+    finally:
+      self.game.permission.release()
+    self.executedCommands.add(command)
+    commandsLogger = self.game.commandsLogger
+    if commandsLogger.isEnabledFor(logging.INFO):
+      commandsLogger.info('> %s', Lazy(command.summary))
+      if isinstance(command, PlayerCommand):
+        commandsLogger.info('%s', Lazy(command.player.context.fastSummary))
+      
+  def processCommand(self, command):
+    if self.isInlineCommand(command):
+      command.processInline(self.game)
+    else:
+      command.process(self.game)
         
 class SynchronousCommandsManager(CommandsManager):
   '''
@@ -161,6 +364,7 @@ class SynchronousCommandsManager(CommandsManager):
   '''
   
   def addCommand(self, command):
+    threading2.checkDeadline()
     self.executeCommand(command)
 
 class AsynchronousCommandsManager(utils.AsyncQueueManager, CommandsManager):
@@ -168,14 +372,20 @@ class AsynchronousCommandsManager(utils.AsyncQueueManager, CommandsManager):
   A thread runs asynchronously and enqueue commands and execute them synchronously.
   
   Command: (player, params)
+  
+  Backpressure: with capacity > 0, strategies that flood commands wait for space (or get a 
+  utils.QueueFullError, see utils.AsyncQueueManager).
   '''
 
-  def __init__(self, game=None):
-    utils.AsyncQueueManager.__init__(self, 'Thread-CommandsManager')
-    CommandsManager.__init__(self, game)
+  def __init__(self, game=None, inlineTrustedCommands=False, 
+               capacity=0, blockWhenFull=True, timeoutWhenFull=-1, batchSize=0):
+    utils.AsyncQueueManager.__init__(self, 'Thread-CommandsManager', 
+                                     capacity, blockWhenFull, timeoutWhenFull, batchSize)
+    CommandsManager.__init__(self, game, inlineTrustedCommands)
   
   # Productor
   def addCommand(self, command):
+    threading2.checkDeadline()
     self.pushEvent(command)
   
   def processEvent(self, event):
@@ -2,7 +2,7 @@
 @author: Paulo Cheque (paulocheque@gmail.com)
 '''
 
-from gameengine import game, players
+from gameengine import game, players, batch
 
 # Abstract Factory
 # TODO: follow conventions and create a generic factory: 
@@ -54,5 +54,10 @@ class FactoryManager(object):
     return self.registeredFactories[game].createGame(mapPlayersToStrategy, 
                                                        mapPlayersTeams, 
                                                        mapOfConfigurations)
+
+  def createBatchRunner(self, game, mapPlayersToStrategy, mapPlayersTeams={}, mapOfConfigurations=None,
+                        processes=None, seed=None):
+    return batch.BatchRunner(self.registeredFactories[game], mapPlayersToStrategy, mapPlayersTeams,
+                             mapOfConfigurations, processes, seed)
   
   
\ No newline at end of file
@@ -2,11 +2,13 @@
 @author: Paulo Cheque (paulocheque@gmail.com)
 '''
 
-import threading, time, copy, yaml
+import threading, time, copy, yaml, logging, random
 from string import Template
 from domain import dataobjects
-from gameengine import utils, commands, errors, threading2
+from gameengine import utils, commands, errors, threading2, reportsink
+from gameengine import logger as logs
 from gameengine.logger import logger
+from gameengine.commands import CommandRecord, CommandsLog
 
 ###############################################################################
 # Context
@@ -50,6 +52,12 @@ class Context(utils.Observer):
     '''
     return yaml.dump(self, default_flow_style=False, explicit_start=True)
   
+  def fastSummary(self):
+    '''
+    One line description of the context state, used in the log of each command
+    '''
+    return logs.fastSummary(self, exclude=['configurations'])
+  
   def notify(self, event):
     self.currentGamePlayers = event.game.players # FIXME name only?
     self.configurations = event.game.configurations
@@ -60,6 +68,13 @@ class Context(utils.Observer):
   
   def notifyGameCommand(self, event): pass
   def notifyPlayerCommand(self, event): pass
+  
+  def hasChanged(self, event, attribute):
+    '''
+    True if the command of the event can have changed the attribute (see GameCommand.changes)
+    '''
+    changes = event.command.changes
+    return changes is None or attribute in changes
 
 ###############################################################################
 
@@ -79,6 +94,8 @@ class GameReport(object):
     
   #import copy
   #Important: Clone objects to avoid that bad strategies change the model without commands
+  
+  commands: CommandsLog with the executed commands (without the contexts)
   '''
   
   def __init__(self):
@@ -90,8 +107,9 @@ class GameReport(object):
     self.losers = []
     self.playersDurationTime = {}
     self.durationTime = 0
-    self.commands = [] # [(command, [contexts after command])]
+    self.commands = CommandsLog()
     self.exception = None
+    self.seed = None
     
   def __str__(self):
     return self.summary()
@@ -115,7 +133,7 @@ class GameReport(object):
     players = ', '.join(player for player in self.players)
     winners = ', '.join(winner.name for winner in self.winners)
     losers = ', '.join(loser.name for loser in self.losers)
-    commands = '\n  '.join(command.summary() for command,contexts in self.commands)
+    commands = '\n  '.join(self.commands.summaries())
     playersDurationTime = ''
     for player,times in self.playersDurationTime.items():
       formattedTimes = ', '.join(('%.3f' % time) for time in times)
@@ -139,11 +157,13 @@ class GameReport(object):
 '''
 ${game} Game Report:
 ${simpleSummary}
+- seed = ${seed}
 - configurations = ${configurations}
 ''')
     return t.substitute(
                  game=self.game,
                  simpleSummary=self.simpleSummary(),
+                 seed=self.seed,
                  configurations=self.configurations)
   
   def addPlayers(self, listOfPlayers):
@@ -155,8 +175,17 @@ ${simpleSummary}
   def addLosers(self, *listOfLosers):
     for loser in listOfLosers: self.losers.append(loser)
   
-  def addCommand(self, command, contexts):
-    self.commands.append((command, contexts[:])) # FIXME copy?
+  def addCommand(self, command, contexts=None):
+    '''
+    contexts are not stored anymore: the log keeps only the data of the command
+    '''
+    self.commands.add(command)
+    
+  def limitCommands(self, capacity):
+    '''
+    Keep only the last capacity commands (0 = all)
+    '''
+    self.commands.setCapacity(capacity)
   
   def addPlaysDuration(self, player, durationTime):
     if player.name not in self.playersDurationTime:
@@ -171,6 +200,13 @@ class Configurations(object):
     # timeForCommand: default -1 = infinite
     # timeForPlay: default -1 = infinite  
     # timeForGame: default -1 = infinite
+    # commandsLogFile: default None = log of the commands in the console logger, 
+    #                  else a file (written in blocks of commandsLogCapacity commands)
+    # commandsLogCapacity: default 1000, also the number of last commands in commandsManager.executedCommands
+    # maxCommandsInReport: default 0 = report has all commands, else only the last ones
+    # reportFile: default None, else the events of the game are written in this file while the game runs
+    # reportFormat: default 'jsonl', or 'binary' (see reportsink)
+    # seed: default None = a new seed per game, else the seed of the random numbers of the game (shuffles)
     
     # super(Configurations, self).__init__([, timeForCommand=-1][, timeForPlay=-1][, timeForGame=-1])
     class Configurations(game.Configurations):
@@ -181,6 +217,12 @@ class Configurations(object):
     self.timeForCommand = timeForCommand
     self.timeForPlay = timeForPlay
     self.timeForGame = timeForGame
+    self.commandsLogFile = None
+    self.commandsLogCapacity = 1000
+    self.maxCommandsInReport = 0
+    self.reportFile = None
+    self.reportFormat = 'jsonl'
+    self.seed = None
     
   def __str__(self):
     return self.summary()
@@ -230,25 +272,36 @@ class AbstractGame(utils.Observable):
     self.configurations = configurations
     self.commandsManager = commandsManager
     self.commandsManager.game = self
+    self.commandsManager.executedCommands.setCapacity(getattr(self.configurations, 'commandsLogCapacity', 0))
     self.startCommand = startCommand
     self.endCommand = endCommand
     self.playerplaysCommand = playerplaysCommand
     
-    self.commandsManager.registerCommand(self.startCommand.__class__)
-    self.commandsManager.registerCommand(self.endCommand.__class__)
-    self.commandsManager.registerCommand(self.playerplaysCommand.__class__)
+    self.commandsManager.registerTrustedCommand(self.startCommand.__class__)
+    self.commandsManager.registerTrustedCommand(self.endCommand.__class__)
+    self.commandsManager.registerTrustedCommand(self.playerplaysCommand.__class__)
     
     self.reportCollector = reportCollector
     self.reportCollector.addPlayers(self.players)
     self.reportCollector.configurations = self.configurations
     self.reportCollector.initialNumberOfPlayers = self.numberOfPlayers()
     self.reportCollector.game = self.__class__.name()
+    self.reportCollector.limitCommands(getattr(self.configurations, 'maxCommandsInReport', 0))
+    
+    # Each game has its own random numbers generator: games are reproducible by its seed (see report)
+    self.seed = getattr(self.configurations, 'seed', None)
+    if self.seed is None: self.seed = utils.newSeed()
+    self.random = random.Random(self.seed)
+    self.reportCollector.seed = self.seed
     
     super(AbstractGame, self).__init__()
     for player in self.players:
       self.registerObserver(player.context)
     self.permission = threading.RLock()
     self.thread = None
+    self.playersWorkers = threading2.WorkerPool('Thread-Player')
+    self.commandsLogger = logger
+    self.reportSink = None
   
   def __str__(self):
     return self.name()
@@ -260,27 +313,59 @@ class AbstractGame(utils.Observable):
   def start(self):
     logger.debug('\nStart game')
     startTime = time.clock()
+    self.openCommandsLogger()
+    self.openReportSink()
     try:
-      self.thread = threading2.KThread(target=self.run, name='Thread-Game')
+      self.thread = threading2.KThread(target=self.run, name='Thread-Game', traced=False)
       self.thread.daemon = True
       self.thread.start()
       self.thread.joinWithTimeout(self.configurations.timeForGame)
       if self.thread.isExpired():
         raise errors.TimeoutGameError()
     except Exception, e:
-      logger.debug('Error in game: ' + e.message)
+      logger.debug('Error in game: %s', e.message)
       self.reportCollector.exception = e
       raise e
     finally:
+      self.releaseWorkers()
+      self.closeCommandsLogger()
       endTime = time.clock()
       self.reportCollector.durationTime = (endTime - startTime)
+      self.closeReportSink()
       logger.debug('End game')
-      logger.info('Winners: ' + ' '.join(winner.name for winner in self.winners()))
+      if logger.isEnabledFor(logging.INFO):
+        logger.info('Winners: ' + ' '.join(winner.name for winner in self.winners()))
       
   def stop(self):
     logger.debug('Game stopped')
     self.thread.kill()
     
+  def releaseWorkers(self):
+    self.playersWorkers.shutdown()
+    
+  def openCommandsLogger(self):
+    if getattr(self.configurations, 'commandsLogFile', None) is not None:
+      self.commandsLogger = logs.bufferedFileLogger('game.commands', 
+                                                    self.configurations.commandsLogFile,
+                                                    self.configurations.commandsLogCapacity)
+      
+  def closeCommandsLogger(self):
+    if self.commandsLogger is not logger:
+      logs.closeLogger(self.commandsLogger)
+      self.commandsLogger = logger
+      
+  def openReportSink(self):
+    if getattr(self.configurations, 'reportFile', None) is not None:
+      self.reportSink = reportsink.createSink(self.configurations.reportFile, 
+                                              getattr(self.configurations, 'reportFormat', 'jsonl'))
+      self.reportSink.writeGame(self)
+      
+  def closeReportSink(self):
+    if self.reportSink is not None:
+      self.reportSink.writeEnd(self.reportCollector)
+      self.reportSink.close()
+      self.reportSink = None
+    
   # Template Method
   def run(self):
     logger.debug('Running...')
@@ -293,23 +378,24 @@ class AbstractGame(utils.Observable):
     logger.debug('ok')
     
   def playerPlays(self, commandsManager, player):
-    logger.debug('Player playing: ' + player.name)
+    logger.debug('Player playing: %s', player.name)
+    threading2.checkDeadline()
     self.commandsManager.addCommand(self.playerplaysCommand)
     startTime = time.clock()
-    thread = threading2.KThread(target=player.play, 
-                                args=[commandsManager],
-                                name='Thread-Player-' + player.name)
+    task = None
     try:
-      thread.daemon = True
-      thread.start()
-      thread.joinWithTimeout(self.configurations.timeForPlay)
+      task = self.playersWorkers.execute(player.name, player.play, [commandsManager],
+                                         self.configurations.timeForPlay,
+                                         traced=not player.isTrusted())
     finally:
       endTime = time.clock()
       self.reportCollector.addPlaysDuration(player, float(endTime - startTime))
-      logger.debug('Total of %s-strategy iteration: %ss' % (player.name, str(endTime - startTime)))
-      if thread.isExpired():
+      logger.debug('Total of %s-strategy iteration: %ss', player.name, endTime - startTime)
+      if task is not None and task.isExpired():
+        # If the game itself was stopped, it is not a timeout of the strategy
+        threading2.checkDeadline()
         raise errors.TimeoutStrategyError(player.name + ' - ' + str(endTime - startTime) + 's')
-      logger.debug('Player stop playing: ' + player.name)
+      logger.debug('Player stop playing: %s', player.name)
         
   def removePlayer(self, player):
     self.players.remove(player)
@@ -346,6 +432,7 @@ class AbstractGame(utils.Observable):
   def notifyExecutedCommand(self, command):
     logger.debug('Notifing observers')
     self.reportCollector.addCommand(command, self.observers)
+    if self.reportSink is not None: self.reportSink.writeCommand(command)
     self.notifyObservers(CommandEvent(self, command))
 
 class Game(AbstractGame): pass
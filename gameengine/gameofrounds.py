@@ -124,6 +124,21 @@ class GameRound(game.AbstractGame):
     super(GameRound, self).__init__(players, configurations, commandsManager,
                                reportCollector, startCommand, endCommand, playerplaysCommand)
     self.game = game
+    if game is not None:
+      # Workers of the players and the log belong to the game and are reused by all rounds
+      self.playersWorkers = game.playersWorkers
+      self.commandsLogger = game.commandsLogger
+      self.reportSink = game.reportSink
+      # The sequence of rounds of a game is reproducible by the seed of the game
+      self.seed = game.seed
+      self.random = game.random
+      self.reportCollector.seed = game.seed
+    
+  def releaseWorkers(self): pass
+  def openCommandsLogger(self): pass
+  def closeCommandsLogger(self): pass
+  def openReportSink(self): pass
+  def closeReportSink(self): pass
     
   def play(self): pass
   def conditionToWin(self, player): raise NotImplementedError()
@@ -144,7 +159,9 @@ class GameOfRounds(game.Game):
     super(GameOfRounds, self).__init__(players, configurations, commandsManager,
                                reportCollector, startCommand, endCommand, playerplaysCommand)
     self.roundClass = roundClass
+    # Finished rounds kept by recycleRound (all rounds by default)
     self.rounds = []
+    self.numberOfFinishedRounds = 0
     self.currentRound = None
   
   def newRound(self):
@@ -154,13 +171,24 @@ class GameOfRounds(game.Game):
       self.currentRound = self.roundClass(self, self.players[:], self.configurations, self.commandsManager)
     
   def numberOfRounds(self):
-    return len(self.rounds)
+    return self.numberOfFinishedRounds
   
   def play(self):
     while len(self.players) > 0 and not self.isTheEnd():
       self.newRound()
       self.currentRound.start()
-      self.rounds.append(self.currentRound)
+      self.numberOfFinishedRounds += 1
       self.reportCollector.addRoundReport(self.currentRound.report())
+      if self.reportSink is not None:
+        self.reportSink.writeRound(self.numberOfRounds(), self.currentRound)
+      self.recycleRound(self.currentRound)
+      
+  def recycleRound(self, round):
+    '''
+    Hook called when a round is finished and reported, e.g. to reuse its resources in the next round.
+    By default the round is kept in rounds. A game that reuses the resources must not keep the round:
+    its state would describe the next round.
+    '''
+    self.rounds.append(round)
 
 
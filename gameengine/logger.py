@@ -4,12 +4,15 @@
 
 # http://docs.python.org/library/logging.html
 import logging
+import logging.handlers
 
 LOG_FILENAME = '/tmp/gat.log'
 logger = logging.getLogger("game")
 logger.setLevel(logging.DEBUG)
+#logger.setLevel(logging.INFO)
 #logger.setLevel(logging.WARN)
 
+# DEBUG records are dropped by the console handler: costly DEBUG messages use Lazy, so they are not formatted
 consoleHandler = logging.StreamHandler()
 #consoleHandler.setLevel(logging.DEBUG)
 consoleHandler.setLevel(logging.INFO)
@@ -21,3 +24,59 @@ logger.addHandler(consoleHandler)
 #fileHandler.setLevel(logging.INFO)
 #logger.addHandler(fileHandler)
 
+###############################################################################
+# Lazy formatting
+
+class Lazy(object):
+  '''
+  The function is called only if the message is formatted, i.e., if its level is enabled.
+  
+  Example of usage:
+  logger.debug('%s', Lazy(context.summary))
+  '''
+  
+  def __init__(self, function, *args):
+    self.function = function
+    self.args = args
+    
+  def __str__(self):
+    return str(self.function(*self.args))
+
+def renderValue(value):
+  if isinstance(value, (list, tuple)):
+    return '[' + ', '.join(renderValue(item) for item in value) + ']'
+  if isinstance(value, dict):
+    return '{' + ', '.join(str(key) + ': ' + renderValue(item) for key, item in sorted(value.items())) + '}'
+  return str(value)
+
+def fastSummary(anObject, exclude=()):
+  '''
+  One line with the attributes of the object, much faster than a yaml.dump.
+  Example: Context: deckHeight=10, player=Player1, playercards=1-1 2-1
+  '''
+  attributes = ', '.join(name + '=' + renderValue(value) 
+                         for name, value in sorted(anObject.__dict__.items()) if name not in exclude)
+  return anObject.__class__.__name__ + ': ' + attributes
+
+###############################################################################
+# File sinks
+
+def bufferedFileLogger(name, filename, capacity=1000, level=logging.INFO):
+  '''
+  Logger that writes in the file in blocks of capacity records (ERROR records are written immediately).
+  It is not registered in the logging module, so one logger per game does not leak memory.
+  closeLogger(logger) must be called in the end to flush the buffer.
+  '''
+  fileLogger = logging.Logger(name, level)
+  fileHandler = logging.FileHandler(filename)
+  fileHandler.setFormatter(logging.Formatter('%(message)s'))
+  fileLogger.addHandler(logging.handlers.MemoryHandler(capacity, logging.ERROR, fileHandler))
+  return fileLogger
+
+def closeLogger(aLogger):
+  for handler in aLogger.handlers[:]:
+    target = getattr(handler, 'target', None)
+    handler.flush()
+    handler.close()
+    if target is not None: target.close()
+    aLogger.removeHandler(handler)
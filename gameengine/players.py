@@ -5,7 +5,7 @@
 
 import re, time, copy
 from domain import dataobjects
-from gameengine import utils, game, errors
+from gameengine import utils, game, errors, threading2
 
 ###############################################################################
 # Player
@@ -35,6 +35,9 @@ class Player(dataobjects.ValueObject):
   def equalsVariables(self):
     return ['name']
 
+  def isTrusted(self):
+    return self.strategy.trusted
+
   # Template method for strategy pattern
   def play(self, commandsManager):
     self.strategy.play(commandsManager)
@@ -95,22 +98,39 @@ class Strategy(object):
       pass
       
   # now you can instantiate your player with it: game.Player('MyPlayer', MyStrategy())
+
+  Trusted strategies run without trace, so long strategies must call self.checkDeadline()
+  in their loops (commandsManager.addCommand checks it too).
+  Untrusted strategies (SafeStrategy) are stopped by the trace.
   '''
-  
+
+  trusted = True
+
   def __init__(self):
     self.player = None
     self.context = None
-    
+
   def play(self, commandsManager):
     raise NotImplementedError()
-  
+
+  def checkDeadline(self):
+    threading2.checkDeadline()
+
+  def remainingTime(self):
+    # Remaining time to play in seconds, -1 if it is infinite
+    deadline = threading2.currentDeadline()
+    if deadline is None: return -1
+    return deadline.remaining()
+
 ###############################################################################
 
 class SafeStrategy(Strategy):
   '''
   To create easy extension of algorithms
   '''
-  
+
+  trusted = False
+
   builtinFunctions = [
     'str', 'bool', 'int', 'float', 'complex', 'divmod',
     'dict', 'list', 'tuple', 'set', 'hex', 'oct', 
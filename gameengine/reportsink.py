@@ -0,0 +1,179 @@
+'''
+@author: Paulo Cheque (paulocheque@gmail.com)
+
+Report sinks write the events of a game (commands, rounds and the end of the game) in a file while the game
+is running, so long tournaments do not need to keep everything in memory and the file can be followed (tail).
+
+Configurations: reportFile (default None = no sink) and reportFormat ('jsonl' or 'binary')
+
+Events (dictionaries):
+- {'event': 'game', 'game': 'Hole', 'players': ['Player1', 'Player2'], 'timestamp': 1.0}
+- {'event': 'command', 'command': 'Discard', 'player': 'Player1', 'params': '1-1', 'durationTime': 0.1, 'timestamp': 1.0}
+- {'event': 'round', 'round': 1, 'winners': ['Player1'], 'durationTime': 0.5, 'timestamp': 1.0}
+- {'event': 'end', 'winners': ['Player1'], 'losers': [], 'durationTime': 2.0, 'error': None, 'timestamp': 1.0}
+
+Example of usage:
+
+from gameengine import reportsink
+for event in reportsink.readEvents('/tmp/tournament.bin', 'binary'):
+  print(event)
+'''
+
+import json
+import struct
+import time
+
+FORMATS = ['jsonl', 'binary']
+
+def encodeParams(params):
+  if params is None: return None
+  return str(params)
+
+###############################################################################
+
+class ReportSink(object):
+  '''
+  Receives the events of the game; the files are flushed in the end of each round.
+  '''
+
+  def __init__(self, filename):
+    self.filename = filename
+    self.file = open(filename, self.mode)
+
+  def writeGame(self, game):
+    self.writeEvent({'event': 'game', 'game': game.__class__.name(),
+                     'players': [player.name for player in game.players], 'timestamp': time.time()})
+
+  def writeCommand(self, command):
+    player = getattr(command, 'player', None)
+    if player is None:
+      self.writeCommandEvent(command.name(), None, None, command.durationTime, time.time())
+    else:
+      self.writeCommandEvent(command.name(), str(player), encodeParams(command.params),
+                             command.durationTime, time.time())
+
+  def writeCommandEvent(self, command, player, params, durationTime, timestamp):
+    self.writeEvent({'event': 'command', 'command': command, 'player': player, 'params': params,
+                     'durationTime': durationTime, 'timestamp': timestamp})
+
+  def writeRound(self, number, round):
+    self.writeEvent({'event': 'round', 'round': number,
+                     'winners': [winner.name for winner in round.winners()],
+                     'durationTime': round.report().durationTime, 'timestamp': time.time()})
+    self.flush()
+
+  def writeEnd(self, report):
+    error = None
+    if report.exception is not None: error = report.exception.__class__.__name__
+    self.writeEvent({'event': 'end',
+                     'winners': [winner.name for winner in report.winners],
+                     'losers': [loser.name for loser in report.losers],
+                     'durationTime': report.durationTime, 'error': error, 'timestamp': time.time()})
+
+  def writeEvent(self, event):
+    raise NotImplementedError()
+
+  def flush(self):
+    self.file.flush()
+
+  def close(self):
+    if not self.file.closed:
+      self.file.flush()
+      self.file.close()
+
+class JsonLinesSink(ReportSink):
+  '''
+  One JSON object per line.
+  '''
+
+  mode = 'a'
+
+  def writeEvent(self, event):
+    self.file.write(json.dumps(event, sort_keys=True))
+    self.file.write('\n')
+
+###############################################################################
+# Binary framing: each frame is a header (type: unsigned char, size of the payload: unsigned int) and a payload.
+# Names of commands and players are written once (NAME frames) and the commands reference their ids.
+
+FRAME_HEADER = struct.Struct('<BI')
+NAME_FRAME, COMMAND_FRAME, JSON_FRAME = 1, 2, 3
+# command id, player id (-1 = game command), durationTime, timestamp; followed by the params (utf-8)
+COMMAND_PAYLOAD = struct.Struct('<Hhdd')
+NO_PLAYER = -1
+
+class BinarySink(ReportSink):
+  '''
+  Compact framing for commands, the other events are JSON frames.
+  '''
+
+  mode = 'ab'
+
+  def __init__(self, filename):
+    super(BinarySink, self).__init__(filename)
+    self.ids = {}
+
+  def idOf(self, name):
+    identifier = self.ids.get(name)
+    if identifier is None:
+      identifier = self.ids[name] = len(self.ids)
+      self.writeFrame(NAME_FRAME, name.encode('utf-8'))
+    return identifier
+
+  def writeFrame(self, frameType, payload):
+    self.file.write(FRAME_HEADER.pack(frameType, len(payload)))
+    self.file.write(payload)
+
+  def writeCommandEvent(self, command, player, params, durationTime, timestamp):
+    playerId = NO_PLAYER
+    if player is not None: playerId = self.idOf(player)
+    payload = COMMAND_PAYLOAD.pack(self.idOf(command), playerId, durationTime, timestamp)
+    if params is not None: payload += params.encode('utf-8')
+    self.writeFrame(COMMAND_FRAME, payload)
+
+  def writeEvent(self, event):
+    self.writeFrame(JSON_FRAME, json.dumps(event, sort_keys=True).encode('utf-8'))
+
+###############################################################################
+
+def createSink(filename, format='jsonl'):
+  if format == 'jsonl': return JsonLinesSink(filename)
+  if format == 'binary': return BinarySink(filename)
+  raise ValueError('Invalid report format: %s (%s)' % (format, ', '.join(FORMATS)))
+
+def readEvents(filename, format='jsonl'):
+  '''
+  Generator of the events (dictionaries) of a report file.
+  '''
+  if format == 'jsonl':
+    for line in open(filename):
+      if line.strip(): yield json.loads(line)
+  elif format == 'binary':
+    for event in readBinaryEvents(open(filename, 'rb')):
+      yield event
+  else:
+    raise ValueError('Invalid report format: %s (%s)' % (format, ', '.join(FORMATS)))
+
+def readBinaryEvents(aFile):
+  names = []
+  while True:
+    header = aFile.read(FRAME_HEADER.size)
+    if len(header) < FRAME_HEADER.size: return # end of file or a frame still being written
+    frameType, size = FRAME_HEADER.unpack(header)
+    payload = aFile.read(size)
+    if len(payload) < size: return
+    if frameType == NAME_FRAME:
+      names.append(payload.decode('utf-8'))
+    elif frameType == COMMAND_FRAME:
+      commandId, playerId, durationTime, timestamp = COMMAND_PAYLOAD.unpack_from(payload)
+      params = None
+      if size > COMMAND_PAYLOAD.size: params = payload[COMMAND_PAYLOAD.size:].decode('utf-8')
+      player = None
+      if playerId != NO_PLAYER: player = names[playerId]
+      yield {'event': 'command', 'command': names[commandId], 'player': player, 'params': params,
+             'durationTime': durationTime, 'timestamp': timestamp}
+    elif frameType == JSON_FRAME:
+      event = json.loads(payload.decode('utf-8'))
+      # Each game appended to the file restarts the ids of the names
+      if event.get('event') == 'game': names = []
+      yield event
@@ -0,0 +1,152 @@
+'''
+
+@author: Paulo Cheque (paulocheque@gmail.com)
+'''
+
+import random
+import unittest
+from gameengine import players, factory, batch, testhelper
+
+class FinishStrategy(players.Strategy):
+  def play(self, commandsManager):
+    commandsManager.addCommand(testhelper.FinishCommand(self.player, None))
+
+class BuggedStrategy(players.Strategy):
+  def play(self, commandsManager):
+    commandsManager.addCommand(testhelper.BuggedCommand(self.player, None))
+
+class RandomStrategy(players.Strategy):
+  def play(self, commandsManager):
+    self.context.spy = random.random()
+    commandsManager.addCommand(testhelper.FinishCommand(self.player, None))
+
+class BatchReportTests(unittest.TestCase):
+
+  def setUp(self):
+    self.report = batch.BatchReport('My')
+
+  def result(self, winners=[], losers=[], error=None, durationTime=1.0):
+    return {'players': ['Player1', 'Player2'], 'winners': winners, 'losers': losers,
+            'durationTime': durationTime, 'playersDurationTime': {'Player1': (0.5, 2)},
+            'numberOfRounds': None, 'error': error}
+
+  def testEmptyReport(self):
+    self.assertEquals(0, self.report.numberOfGames)
+    self.assertEquals(0.0, self.report.winRate('Player1'))
+    self.assertEquals(0.0, self.report.gamesPerSecond())
+
+  def testWinRates(self):
+    self.report.addGameResult(self.result(winners=['Player1'], losers=['Player2']))
+    self.report.addGameResult(self.result(winners=['Player1'], losers=['Player2']))
+    self.report.addGameResult(self.result(winners=['Player2'], losers=['Player1']))
+    self.report.addGameResult(self.result(winners=['Player1'], losers=['Player2']))
+    self.assertEquals(4, self.report.numberOfGames)
+    self.assertEquals(0.75, self.report.winRate('Player1'))
+    self.assertEquals(0.25, self.report.winRate('Player2'))
+    self.assertEquals(1, self.report.losses['Player1'])
+
+  def testErrorsByExceptionClass(self):
+    self.report.addGameResult(self.result(error='TimeoutStrategyError'))
+    self.report.addGameResult(self.result(error='TimeoutStrategyError'))
+    self.report.addGameResult(self.result(error='BuggedCommandError'))
+    self.report.addGameResult(self.result())
+    self.assertEquals({'TimeoutStrategyError': 2, 'BuggedCommandError': 1}, self.report.errors)
+    self.assertEquals(3, self.report.numberOfErrors())
+
+  def testDurations(self):
+    self.report.addGameResult(self.result(durationTime=1.0))
+    self.report.addGameResult(self.result(durationTime=3.0))
+    self.report.durationTime = 2.0
+    self.assertEquals(2.0, self.report.averageGameDurationTime())
+    self.assertEquals(3.0, self.report.maxGameDurationTime)
+    self.assertEquals(1.0, self.report.gamesPerSecond())
+    self.assertEquals([1.0, 4], self.report.playersDurationTime['Player1'])
+
+  def testSummary(self):
+    self.report.addGameResult(self.result(winners=['Player1'], error='BuggedCommandError'))
+    summary = self.report.summary()
+    self.assertTrue('My Batch Report' in summary)
+    self.assertTrue('BuggedCommandError: 1' in summary)
+
+class BatchRunnerTests(testhelper.GameEngineTests):
+
+  def testRunInTheCurrentProcess(self):
+    runner = batch.BatchRunner(self.gamefactory, {'Player1': FinishStrategy(), 'Player2': FinishStrategy()},
+                               processes=1)
+    report = runner.run(5)
+    self.assertEquals(5, report.numberOfGames)
+    self.assertEquals(1.0, report.winRate('Player1'))
+    self.assertEquals(0, report.numberOfErrors())
+    self.assertEquals('My', report.game)
+
+  def testRunInAPoolOfProcesses(self):
+    runner = batch.BatchRunner(self.gamefactory, {'Player1': FinishStrategy(), 'Player2': FinishStrategy()},
+                               processes=2)
+    report = runner.run(10)
+    self.assertEquals(10, report.numberOfGames)
+    self.assertEquals(10, report.wins['Player2'])
+    self.assertTrue(report.gamesPerSecond() > 0)
+
+  def testErrorsMustBeCountedAndNotStopTheBatch(self):
+    runner = batch.BatchRunner(self.gamefactory, {'Player1': BuggedStrategy()}, processes=2)
+    report = runner.run(4)
+    self.assertEquals(4, report.numberOfGames)
+    self.assertEquals({'BuggedCommandError': 4}, report.errors)
+
+  def testTheSameSeedMustReproduceTheGames(self):
+    strategy = RandomStrategy()
+    runner = batch.BatchRunner(self.gamefactory, {'Player1': strategy}, processes=1, seed=42)
+    runner.run(1)
+    value = strategy.context.spy
+    runner.run(1)
+    self.assertEquals(value, strategy.context.spy)
+
+  def testTheBatchMustNotChangeTheRandomNumbersOfTheCaller(self):
+    runner = batch.BatchRunner(self.gamefactory, {'Player1': RandomStrategy()}, processes=1, seed=42)
+    random.seed(5)
+    expected = random.random()
+    random.seed(5)
+    runner.run(2)
+    self.assertEquals(expected, random.random())
+
+  def testSeedsOfTheGamesWithErrorsMustReplayThem(self):
+    runner = batch.BatchRunner(self.gamefactory, {'Player1': BuggedStrategy()}, processes=1, seed=42)
+    report = runner.run(2)
+    self.assertEquals(2, len(set(report.seeds)))
+    self.assertEquals({'BuggedCommandError': report.seeds}, report.errorsSeeds)
+    self.assertTrue(str(report.seeds[0]) in report.summary())
+    result = runner.replay(report.seeds[1])
+    self.assertEquals('BuggedCommandError', result['error'])
+    self.assertEquals(report.seeds[1], result['seed'])
+
+  def testGamesOfABatchRecycleTheirRounds(self):
+    games = []
+    class SpyFactory(testhelper.MyGameFactory):
+      def createGame(self, *args):
+        games.append(super(SpyFactory, self).createGame(*args))
+        return games[-1]
+    batch.BatchRunner(SpyFactory(), {'Player1': FinishStrategy()}, processes=1).run(1)
+    self.assertTrue(games[0].configurations.recycleRounds)
+    runner = batch.BatchRunner(SpyFactory(), {'Player1': FinishStrategy()}, {}, {'recycleRounds': False}, processes=1)
+    runner.run(1)
+    self.assertFalse(games[1].configurations.recycleRounds)
+
+  def testFactoryManagerMustCreateABatchRunnerByName(self):
+    manager = factory.FactoryManager()
+    manager.addFactory(self.gamefactory)
+    runner = manager.createBatchRunner('My', {'Player1': FinishStrategy()}, processes=1)
+    self.assertEquals(3, runner.run(3).numberOfGames)
+
+class CommandLineTests(unittest.TestCase):
+
+  def testParseMap(self):
+    self.assertEquals({'timeForPlay': 1, 'name': 'abc'},
+                      batch.parseMap(['timeForPlay=1', 'name=abc'], batch.parseValue))
+
+  def testParseStrategyClass(self):
+    strategy = batch.parseStrategy('gameengine.tests.batchTests:FinishStrategy')
+    self.assertTrue(isinstance(strategy, FinishStrategy))
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
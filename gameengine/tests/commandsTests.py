@@ -33,12 +33,76 @@ class CommandsManagerTest(testhelper.GameEngineTests):
     self.assertEquals(self.game, commands.CommandsManager(self.game).game)
     self.assertEquals([], commands.CommandsManager(self.game).executedCommands)
     
+  def testExecutedCommandsAreALogBoundedByTheCommandsLogCapacity(self):
+    self.configurations.commandsLogCapacity = 2
+    game = testhelper.MyGame(self.twoplayers, self.configurations)
+    for command in [self.neutralcommand, self.paramscommand, self.neutralcommand]:
+      game.commandsManager.executeCommand(command)
+    executedCommands = game.commandsManager.executedCommands
+    self.assertTrue(isinstance(executedCommands, commands.CommandsLog))
+    self.assertEquals(2, len(executedCommands))
+    self.assertEquals(3, executedCommands.numberOfCommands)
+    self.assertEquals(['Params', 'Neutral'], [record.name for record in executedCommands])
+    
   def testValidateMustRaiseAnUnknownCommandErrorIfCommandIsNotInTheList(self):
     try:
       self.game.commandsManager.validateRegisteredCommand(self.unknowncommand)
     except errors.UnknownCommandError: pass
     else: self.fail()
     
+  def testStartEndAndPlayerPlaysCommandsAreTrusted(self):
+    self.assertTrue(self.game.startCommand.__class__ in self.game.commandsManager.trustedCommands)
+    self.assertTrue(self.game.endCommand.__class__ in self.game.commandsManager.trustedCommands)
+    self.assertTrue(self.game.playerplaysCommand.__class__ in self.game.commandsManager.trustedCommands)
+    self.assertFalse(testhelper.NeutralCommand in self.game.commandsManager.trustedCommands)
+    
+  def testTrustedCommandsAreNotInlineByDefault(self):
+    self.assertFalse(self.game.commandsManager.isInlineCommand(self.game.startCommand))
+    
+  def testInlineModeExecuteTrustedCommandsInTheCallerThread(self):
+    spy = []
+    class SpyCommand(commands.GameCommand):
+      def execute(self, game): spy.append(threading.currentThread())
+    commandsManager = commands.SynchronousCommandsManager(self.game, inlineTrustedCommands=True)
+    commandsManager.registerTrustedCommand(SpyCommand)
+    self.assertTrue(commandsManager.isInlineCommand(SpyCommand()))
+    commandsManager.processCommand(SpyCommand())
+    self.assertEquals([threading.currentThread()], spy)
+    
+  def testInlineModeDontExecutePlayerCommandsInline(self):
+    commandsManager = commands.SynchronousCommandsManager(self.game, inlineTrustedCommands=True)
+    commandsManager.registerCommand(testhelper.NeutralCommand)
+    self.assertFalse(commandsManager.isInlineCommand(self.neutralcommand))
+    
+  def testInlineCommandsMustRecordDurationTime(self):
+    class SlowTrustedCommand(commands.GameCommand):
+      def execute(self, game): time.sleep(0.1)
+    command = SlowTrustedCommand()
+    self.assertEquals(0, command.durationTime)
+    command.processInline(self.game)
+    self.assertTrue(command.durationTime >= 0.1)
+    
+  def testInlineCommandsMustRaiseBuggedCommandError(self):
+    class BuggedTrustedCommand(commands.GameCommand):
+      def execute(self, game): raise Exception('ops')
+    try:
+      BuggedTrustedCommand().processInline(self.game)
+    except errors.BuggedCommandError: pass
+    else: self.fail()
+    
+  def testInlineTrustedCommandsMustBeFasterThanCommandsInThreads(self):
+    numberOfCommands = 500
+    durations = {}
+    for inline in [False, True]:
+      commandsManager = commands.SynchronousCommandsManager(self.game, inlineTrustedCommands=inline)
+      commandsManager.registerTrustedCommand(self.game.playerplaysCommand.__class__)
+      start = time.time()
+      for x in range(numberOfCommands):
+        commandsManager.processCommand(self.game.playerplaysCommand)
+      durations[inline] = time.time() - start
+    # One thread per command is much slower than a function call
+    self.assertTrue(durations[True] < durations[False], durations)
+    
 class SynchronousCommandsManagerTest(testhelper.GameEngineTests):
   
   def testHasGameAndExecutedCommands(self):
@@ -74,11 +138,12 @@ class AsynchronousCommandsManagerTest(testhelper.GameEngineTests):
     self.assertEquals(threads + 1, threading.activeCount())
     
   def testStartMustConsumeValidCommands(self):
-    self.game.commandsManager.start()
+    # Commands added before the start: the consumer can not take them before the height is checked
     self.game.commandsManager.addCommand(self.slowcommand)
     self.game.commandsManager.addCommand(self.paramscommand)
     self.game.commandsManager.addCommand(self.neutralcommand)
     self.assertEquals(3, self.game.commandsManager.queueHeight())
+    self.game.commandsManager.start()
     time.sleep(1)
     self.assertEquals(3, len(self.game.commandsManager.executedCommands))
   
@@ -5,6 +5,7 @@
 
 import threading
 import time
+import random
 import re
 
 import unittest
@@ -58,6 +59,33 @@ class GameReportTest(testhelper.GameEngineTests):
     self.addItem(self.gameofroundsreport.winners, self.gameofroundsreport.addWinners)
     self.addItem(self.gameofroundsreport.losers, self.gameofroundsreport.addLosers)
     
+  def testReportMustNotKeepCommandsAndContexts(self):
+    command = testhelper.ParamsCommand(self.player, [1, 2])
+    command.durationTime = 0.5
+    self.gamereport.addCommand(command, [self.player.context])
+    startCommand = game.StartGameCommand()
+    startCommand.durationTime = 0.25
+    self.gamereport.addCommand(startCommand, [])
+    self.assertEquals(2, len(self.gamereport.commands))
+    record = self.gamereport.commands[0]
+    self.assertEquals('Params', record.name)
+    self.assertEquals('Player1', record.player)
+    self.assertEquals([1, 2], record.params)
+    self.assertEquals(command.summary(), record.summary())
+    self.assertEquals(None, self.gamereport.commands[1].player)
+    self.assertEquals(startCommand.summary(), self.gamereport.commands[1].summary())
+    self.assertTrue(command.summary() in self.gamereport.simpleSummary())
+    
+  def testCommandsLogWithCapacityMustKeepTheLastCommands(self):
+    log = game.CommandsLog(capacity=2)
+    for name in ['Player1', 'Player2', 'Player3']:
+      log.add(testhelper.FinishCommand(name))
+    self.assertEquals(['Player2', 'Player3'], [record.player for record in log])
+    self.assertEquals(3, log.numberOfCommands)
+    self.assertEquals(1, log.numberOfDiscardedCommands())
+    log.setCapacity(1)
+    self.assertEquals(['Player3'], [record.player for record in log])
+    
 class GameOfRoundsReportTest(testhelper.GameEngineTests):
     
   def testBasicAttributesGameOfRounds(self):
@@ -83,6 +111,16 @@ class ConfigurationTest(testhelper.GameEngineTests):
     self.assertEquals(3, c.timeForPlay)
     self.assertEquals(5, c.timeForGame)
     
+  def testTheSeedMustBeRecordedInTheReport(self):
+    self.configurations.seed = 42
+    mygame = testhelper.MyGame(self.twoplayers, self.configurations)
+    self.assertEquals(42, mygame.seed)
+    self.assertEquals(42, mygame.report().seed)
+    self.assertEquals(random.Random(42).random(), mygame.random.random())
+    
+  def testGamesWithoutSeedMustHaveDifferentSeeds(self):
+    self.assertNotEqual(testhelper.MyGame(self.twoplayers).seed, testhelper.MyGame(self.twoplayers).seed)
+    
   def testConfigurationIsOptional(self):
     mygame = testhelper.MyGame(self.twoplayers)
     self.assertTrue(isinstance(mygame.configurations, game.Configurations))
@@ -150,6 +188,26 @@ class GameTest(testhelper.GameEngineTests):
                    testgame.report().exception.message))
     self.assertFalse(testgame.thread.isAlive())
     
+  def testTrustedStrategyThatNeverAddsACommandMustBeStopped(self):
+    class StrategyForTests(players.Strategy):
+      def play(self, commandsManager):
+        self.iterations = 0
+        while True: self.iterations += 1
+    configurations = game.Configurations(2, 0.1, 2)
+    strategy = StrategyForTests()
+    someplayers = players.Player('Player1', strategy)
+    self.assertTrue(someplayers.isTrusted())
+    testgame = testhelper.MyGame([someplayers], configurations)
+    try:
+      testgame.start()
+    except: pass
+    else: self.fail()
+    self.assertTrue(re.search(str(errors.TimeoutStrategyError()) + ': Player1', 
+                   testgame.report().exception.message))
+    iterations = strategy.iterations
+    time.sleep(0.1)
+    self.assertEquals(iterations, strategy.iterations)
+    
   def testStartMustStopIfTheTimeForCommandIsExpired(self):
     class StrategyForTests(players.Strategy):
       def play(self, commandsManager):
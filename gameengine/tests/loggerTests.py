@@ -0,0 +1,90 @@
+'''
+
+@author: Paulo Cheque (paulocheque@gmail.com)
+'''
+
+import logging
+import os
+import tempfile
+import unittest
+from gameengine import logger as logs
+
+class Spy(object):
+  def __init__(self):
+    self.calls = 0
+  def summary(self):
+    self.calls += 1
+    return 'summary'
+
+class Context(object):
+  def __init__(self):
+    self.deckHeight = 10
+    self.playercards = ['1-1', '2-1']
+    self.scores = {'B': 2, 'A': 1}
+    self.configurations = 'ignored'
+
+class LazyTests(unittest.TestCase):
+
+  def testFunctionMustNotBeCalledIfTheLevelIsDisabled(self):
+    spy = Spy()
+    aLogger = logging.Logger('test', logging.INFO)
+    aLogger.debug('%s', logs.Lazy(spy.summary))
+    self.assertEquals(0, spy.calls)
+
+  def testDebugMessagesOfTheGameLoggerAreNotFormattedByDefault(self):
+    self.assertEquals(logging.DEBUG, logs.logger.level)
+    self.assertEquals(logging.INFO, logs.consoleHandler.level)
+    spy = Spy()
+    logs.logger.debug('%s', logs.Lazy(spy.summary))
+    self.assertEquals(0, spy.calls)
+
+  def testFunctionMustBeCalledWhenFormatted(self):
+    spy = Spy()
+    self.assertEquals('summary', str(logs.Lazy(spy.summary)))
+    self.assertEquals(1, spy.calls)
+    self.assertEquals('3', str(logs.Lazy(lambda x, y: x + y, 1, 2)))
+
+class FastSummaryTests(unittest.TestCase):
+
+  def testFastSummary(self):
+    self.assertEquals('Context: configurations=ignored, deckHeight=10, playercards=[1-1, 2-1], scores={A: 1, B: 2}',
+                      logs.fastSummary(Context()))
+
+  def testExcludedAttributes(self):
+    self.assertEquals('Context: deckHeight=10, playercards=[1-1, 2-1], scores={A: 1, B: 2}',
+                      logs.fastSummary(Context(), exclude=['configurations']))
+
+class BufferedFileLoggerTests(unittest.TestCase):
+
+  def setUp(self):
+    descriptor, self.filename = tempfile.mkstemp()
+    os.close(descriptor)
+
+  def tearDown(self):
+    os.remove(self.filename)
+
+  def content(self):
+    return open(self.filename).read()
+
+  def testRecordsMustBeWrittenInBlocks(self):
+    aLogger = logs.bufferedFileLogger('test', self.filename, capacity=3)
+    aLogger.info('a')
+    aLogger.info('b')
+    self.assertEquals('', self.content())
+    aLogger.info('c')
+    self.assertEquals('a\nb\nc\n', self.content())
+    aLogger.info('d')
+    logs.closeLogger(aLogger)
+    self.assertEquals('a\nb\nc\nd\n', self.content())
+    self.assertEquals([], aLogger.handlers)
+
+  def testDisabledLevelsMustNotBeWritten(self):
+    aLogger = logs.bufferedFileLogger('test', self.filename)
+    aLogger.debug('a')
+    self.assertFalse(aLogger.isEnabledFor(logging.DEBUG))
+    logs.closeLogger(aLogger)
+    self.assertEquals('', self.content())
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
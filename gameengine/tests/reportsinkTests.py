@@ -0,0 +1,97 @@
+'''
+
+@author: Paulo Cheque (paulocheque@gmail.com)
+'''
+
+import os
+import tempfile
+import unittest
+from gameengine import reportsink
+
+class Player(object):
+  def __init__(self, name):
+    self.name = name
+  def __str__(self):
+    return self.name
+
+class Command(object):
+  def __init__(self, commandName, player=None, params=None):
+    self.commandName = commandName
+    if player is not None:
+      self.player = player
+      self.params = params
+    self.durationTime = 0.5
+  def name(self):
+    return self.commandName
+
+class Report(object):
+  def __init__(self):
+    self.winners = [Player('Player1')]
+    self.losers = []
+    self.durationTime = 2.0
+    self.exception = None
+
+class ReportSinkTests(unittest.TestCase):
+
+  def setUp(self):
+    descriptor, self.filename = tempfile.mkstemp()
+    os.close(descriptor)
+
+  def tearDown(self):
+    os.remove(self.filename)
+
+  def writeGame(self, sink):
+    sink.writeEvent({'event': 'game', 'game': 'My', 'players': ['Player1']})
+    sink.writeCommand(Command('StartGame'))
+    sink.writeCommand(Command('Discard', Player('Player1'), ['1-1']))
+    sink.writeCommand(Command('Discard', Player('Player1')))
+    sink.writeEnd(Report())
+    sink.close()
+
+  def checkEvents(self, format):
+    events = list(reportsink.readEvents(self.filename, format))
+    self.assertEquals(['game', 'command', 'command', 'command', 'end'], [event['event'] for event in events])
+    self.assertEquals(None, events[1]['player'])
+    self.assertEquals('Discard', events[2]['command'])
+    self.assertEquals('Player1', events[2]['player'])
+    self.assertEquals("['1-1']", events[2]['params'])
+    self.assertEquals(0.5, events[2]['durationTime'])
+    self.assertEquals(None, events[3]['params'])
+    self.assertEquals(['Player1'], events[4]['winners'])
+    return events
+
+  def testJsonLines(self):
+    self.writeGame(reportsink.createSink(self.filename, 'jsonl'))
+    self.checkEvents('jsonl')
+    self.assertEquals(5, len(open(self.filename).readlines()))
+
+  def testBinary(self):
+    self.writeGame(reportsink.createSink(self.filename, 'binary'))
+    self.checkEvents('binary')
+
+  def testGamesAppendedInTheSameBinaryFile(self):
+    self.writeGame(reportsink.createSink(self.filename, 'binary'))
+    sink = reportsink.createSink(self.filename, 'binary')
+    sink.writeEvent({'event': 'game', 'game': 'My', 'players': ['Player2']})
+    sink.writeCommand(Command('Hit', Player('Player2')))
+    sink.close()
+    events = list(reportsink.readEvents(self.filename, 'binary'))
+    self.assertEquals(7, len(events))
+    self.assertEquals('Hit', events[-1]['command'])
+    self.assertEquals('Player2', events[-1]['player'])
+
+  def testIncompleteFrameMustBeIgnored(self):
+    sink = reportsink.createSink(self.filename, 'binary')
+    sink.writeCommand(Command('StartGame'))
+    sink.close()
+    aFile = open(self.filename, 'ab')
+    aFile.write(reportsink.FRAME_HEADER.pack(reportsink.JSON_FRAME, 100))
+    aFile.close()
+    self.assertEquals(1, len(list(reportsink.readEvents(self.filename, 'binary'))))
+
+  def testInvalidFormat(self):
+    self.assertRaises(ValueError, reportsink.createSink, self.filename, 'xml')
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
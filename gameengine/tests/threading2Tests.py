@@ -3,6 +3,7 @@
 @author: Paulo Cheque (paulocheque@gmail.com)
 '''
 
+import sys
 import time
 import threading
 import unittest
@@ -147,6 +148,199 @@ class KThreadTests(unittest.TestCase):
     print(end - start)
     self.assertTrue(end - start < 1)
   
+class WorkerPoolTests(unittest.TestCase):
+  
+  def setUp(self):
+    self.pool = threading2.WorkerPool('Thread-Test')
+    
+  def tearDown(self):
+    self.pool.shutdown(wait=True)
+    
+  def testWorkersAreReusedByKey(self):
+    spy = []
+    def func(spy):
+      spy.append(threading.currentThread())
+    self.pool.execute('A', func, [spy])
+    self.pool.execute('A', func, [spy])
+    self.pool.execute('B', func, [spy])
+    self.assertEquals(3, len(spy))
+    self.assertTrue(spy[0] is spy[1])
+    self.assertFalse(spy[0] is spy[2])
+    self.assertEquals('Thread-Test-A', spy[0].getName())
+    
+  def testExecuteWithTimeoutWithoutExpiring(self):
+    spy = []
+    def func(spy):
+      time.sleep(0.1)
+      spy.append(1)
+    task = self.pool.execute('A', func, [spy], 1)
+    self.assertFalse(task.isExpired())
+    self.assertEquals([1], spy)
+    
+  def testExecuteWithTimeoutExpiring(self):
+    spy = []
+    def func(spy):
+      time.sleep(0.3)
+      spy.append(1)
+      time.sleep(0.3)
+      spy.append(2)
+    task = self.pool.execute('A', func, [spy], 0.1)
+    self.assertTrue(task.isExpired())
+    self.assertTrue(len(spy) < 2)
+    
+  def testExpiredWorkerMustBeReplaced(self):
+    spy = []
+    def slow(spy):
+      time.sleep(0.3)
+      spy.append(1)
+    def func(spy):
+      spy.append(threading.currentThread())
+    self.pool.execute('A', func, [spy])
+    self.pool.execute('A', slow, [spy], 0.1)
+    self.pool.execute('A', func, [spy])
+    self.assertFalse(spy[0] is spy[-1])
+    self.assertTrue(spy[-1].isAlive())
+    
+  def testExceptionMessageMustHaveTypeAndThreadName(self):
+    class MyException(Exception): pass
+    def func():
+      raise MyException('some msg')
+    try:
+      self.pool.execute('A', func)
+    except MyException, e:
+      self.assertEquals('MyException in Thread-Test-A: some msg', e.message)
+    else:
+      self.fail()
+      
+  def testWorkerMustBeReusedAfterAnException(self):
+    spy = []
+    def bugged(spy):
+      spy.append(threading.currentThread())
+      raise Exception('ops')
+    try:
+      self.pool.execute('A', bugged, [spy])
+    except Exception: pass
+    try:
+      self.pool.execute('A', bugged, [spy])
+    except Exception: pass
+    self.assertTrue(spy[0] is spy[1])
+    
+  def testShutdownMustStopWorkers(self):
+    numberOfThreads = threading.activeCount()
+    self.pool.execute('A', lambda: None)
+    self.assertEquals(numberOfThreads + 1, threading.activeCount())
+    self.pool.shutdown()
+    while threading.activeCount() > numberOfThreads:
+      time.sleep(0.1)
+    self.assertEquals({}, self.pool.workers)
+
+  def testUntracedTaskMustRunWithoutTrace(self):
+    spy = []
+    self.pool.execute('A', lambda: spy.append(sys.gettrace()), traced=False)
+    self.pool.execute('A', lambda: spy.append(sys.gettrace()))
+    self.assertTrue(spy[0] is None)
+    self.assertTrue(spy[1] is not None)
+    
+  def testTaskMustRunWithADeadline(self):
+    spy = []
+    self.pool.execute('A', lambda: spy.append(threading2.currentDeadline()), timeout=10)
+    self.assertTrue(spy[0].remaining() > 0)
+    
+  def testExpiredUntracedTaskMustStopInTheDeadlineCheck(self):
+    spy = []
+    def loop(spy):
+      while True:
+        threading2.checkDeadline()
+        spy.append(1)
+        time.sleep(0.05)
+    task = self.pool.execute('A', loop, [spy], timeout=0.2, traced=False)
+    self.assertTrue(task.isExpired())
+    time.sleep(0.2)
+    numberOfIterations = len(spy)
+    time.sleep(0.2)
+    self.assertEquals(numberOfIterations, len(spy))
+    
+  def testTaskCancelledByTheDeadlineMustBeExpired(self):
+    def loop():
+      while True: threading2.checkDeadline()
+    task = self.pool.execute('A', loop, timeout=0.1, traced=False)
+    self.assertTrue(task.isExpired())
+    self.assertTrue(task.deadline.isExpired())
+
+  def testExpiredUntracedTaskWithoutDeadlineChecksMustBeInterrupted(self):
+    spy = [0]
+    def loop(spy):
+      while True: spy[0] += 1
+    task = self.pool.execute('A', loop, [spy], timeout=0.1, traced=False)
+    self.assertTrue(task.isExpired())
+    task.finished.wait(1)
+    self.assertTrue(task.finished.isSet())
+    self.assertTrue(task.isCancelled())
+    numberOfIterations = spy[0]
+    time.sleep(0.1)
+    self.assertEquals(numberOfIterations, spy[0])
+
+class DeadlineTests(unittest.TestCase):
+  
+  def testInfiniteDeadlineNeverExpires(self):
+    deadline = threading2.Deadline()
+    self.assertFalse(deadline.isExpired())
+    self.assertEquals(-1, deadline.remaining())
+    deadline.check()
+    
+  def testDeadlineExpiresWithTime(self):
+    deadline = threading2.Deadline(0.1)
+    self.assertFalse(deadline.isExpired())
+    time.sleep(0.2)
+    self.assertTrue(deadline.isExpired())
+    self.assertEquals(0, deadline.remaining())
+    self.assertRaises(threading2.Cancelled, deadline.check)
+    
+  def testCancelledDeadlineMustBeExpired(self):
+    deadline = threading2.Deadline(10)
+    deadline.cancel()
+    self.assertTrue(deadline.isExpired())
+    
+  def testDeadlineMustExpireWithItsParent(self):
+    parent = threading2.Deadline()
+    deadline = threading2.Deadline(10, parent)
+    parent.cancel()
+    self.assertTrue(deadline.isExpired())
+    
+  def testRemainingTimeMustRespectTheParent(self):
+    deadline = threading2.Deadline(10, threading2.Deadline(1))
+    self.assertTrue(deadline.remaining() <= 1)
+    deadline = threading2.Deadline(-1, threading2.Deadline(1))
+    self.assertTrue(deadline.remaining() <= 1)
+    
+  def testKillOfUntracedThreadMustCancelItsDeadline(self):
+    spy = []
+    def loop(spy):
+      while True:
+        threading2.checkDeadline()
+        time.sleep(0.05)
+      spy.append(1)
+    thread = threading2.KThread(target=loop, args=[spy], traced=False)
+    thread.start()
+    thread.joinWithTimeout(0.2)
+    self.assertTrue(thread.isExpired())
+    self.assertTrue(thread.isCancelled())
+    self.assertFalse(thread.isAlive())
+    self.assertEquals([], spy)
+    
+  def testThreadMustInheritTheDeadlineOfItsParentThread(self):
+    spy = []
+    def child(spy):
+      spy.append(threading2.currentDeadline())
+    def parent(spy):
+      thread = threading2.KThread(target=child, args=[spy], traced=False)
+      thread.start()
+      thread.join()
+    thread = threading2.KThread(target=parent, args=[spy], traced=False)
+    thread.start()
+    thread.join()
+    self.assertTrue(spy[0].parent is thread.deadline)
+  
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
     unittest.main()
\ No newline at end of file
@@ -152,9 +152,66 @@ class CombinationGeneratorTests(unittest.TestCase):
     self.assertEquals(3628800, generator.factorial(10))
     print(generator.factorial(50))
     print(generator.factorial(100))
+    
+  def testTotal(self):
+    self.assertEquals(1, utils.CombinationGenerator(1, 1).total)
+    self.assertEquals(6, utils.CombinationGenerator(4, 2).total)
+    self.assertEquals(2598960, utils.CombinationGenerator(52, 5).total)
+    self.assertEquals(133784560, utils.CombinationGenerator(52, 7).total)
+    self.assertEquals(0, utils.binomial(3, 4))
+    
+  def testRankAndUnrankFollowTheOrderOfNext(self):
+    generator = utils.CombinationGenerator(7, 3)
+    for rank in range(generator.total):
+      combination = generator.next()
+      self.assertEquals(rank, generator.rank(combination))
+      self.assertEquals(combination, generator.unrank(rank))
+    self.assertRaises(ValueError, generator.unrank, generator.total)
+    generator = utils.CombinationGenerator(52, 7)
+    self.assertEquals([45, 46, 47, 48, 49, 50, 51], generator.unrank(generator.total - 1))
+    self.assertEquals(123456789, generator.rank(generator.unrank(123456789)))
+    
+  def testSeek(self):
+    generator = utils.CombinationGenerator(5, 3)
+    generator.seek(3)
+    self.assertEquals([0, 2, 3], generator.next())
+    self.assertEquals([0, 2, 4], generator.next())
+    generator.seek(9)
+    self.assertEquals([2, 3, 4], generator.next())
+    self.assertFalse(generator.hasNext())
+    generator.seek(0)
+    self.assertEquals([0, 1, 2], generator.next())
+    
+  def testChunksCoverAllCombinations(self):
+    generator = utils.CombinationGenerator(10, 4)
+    chunks = generator.chunks(4)
+    self.assertEquals([(0, 53), (53, 106), (106, 158), (158, 210)], chunks)
+    combinations = []
+    for start, end in chunks:
+      combinations.extend(generator.iterRange(start, end))
+    generator.reset()
+    self.assertEquals([generator.next()[:] for x in range(210)], combinations)
+    self.assertEquals([(0, 1)], utils.CombinationGenerator(3, 3).chunks(4))
   
 ###############################################################################
 
+class SeedTests(unittest.TestCase):
+  
+  def testDeriveSeedMustBeReproducible(self):
+    self.assertEquals(utils.deriveSeed(42, 7), utils.deriveSeed(42, 7))
+    self.assertEquals(5376515519875901119, utils.deriveSeed(42, 0))
+    
+  def testDerivedSeedsMustBeDifferent(self):
+    seeds = set(utils.deriveSeed(seed, index) for seed in range(10) for index in range(100))
+    self.assertEquals(1000, len(seeds))
+    # seed + index would repeat the games: (1, 0) and (0, 1)
+    self.assertNotEqual(utils.deriveSeed(1, 0), utils.deriveSeed(0, 1))
+    
+  def testNewSeed(self):
+    self.assertTrue(0 <= utils.newSeed() < 2 ** 64)
+    
+###############################################################################
+
 class AsyncQueueManagerTests(unittest.TestCase):
   
   def setUp(self):
@@ -227,6 +284,88 @@ class AsyncQueueManagerTests(unittest.TestCase):
     self.assertEquals(1, self.qm.queueHeight())
     time.sleep(0.5)
     self.assertEquals(0, self.qm.queueHeight())
+
+  def testEventsMustBeProcessedInOrder(self):
+    spy = []
+    self.qm.processEvent = spy.append
+    for event in range(100): self.qm.pushEvent(event)
+    self.qm.start()
+    self.qm.stop()
+    while threading.activeCount() != self.threads:
+      time.sleep(0.1)
+    self.assertEquals(range(100), spy)
+    
+  def testStopMustProcessPendingEvents(self):
+    spy = []
+    self.qm.processEvent = lambda event: (time.sleep(0.01), spy.append(event))
+    self.qm.start()
+    for event in range(10): self.qm.pushEvent(event)
+    self.qm.stop()
+    while threading.activeCount() != self.threads:
+      time.sleep(0.1)
+    self.assertEquals(10, len(spy))
+    
+  def testConsumerMustTakeAllPendingEventsInOneBatch(self):
+    self.qm.pushEvent('a')
+    self.qm.pushEvent('b')
+    self.qm.pushEvent('c')
+    self.qm.start()
+    time.sleep(0.1)
+    self.assertEquals(3, self.qm.numberOfEvents)
+    self.assertEquals(1, self.qm.numberOfBatches)
+    
+  def testBatchSize(self):
+    qm = utils.AsyncQueueManager('Thread-Y', batchSize=2)
+    spy = []
+    qm.processEvent = spy.append
+    for event in range(5): qm.pushEvent(event)
+    qm.start()
+    qm.stop()
+    while threading.activeCount() != self.threads:
+      time.sleep(0.1)
+    self.assertEquals(range(5), spy)
+    self.assertEquals(3, qm.numberOfBatches)
+    
+  def testFullQueueMustRejectEventsIfItDoesNotBlock(self):
+    qm = utils.AsyncQueueManager('Thread-Y', capacity=2, blockWhenFull=False)
+    qm.pushEvent('a')
+    qm.pushEvent('b')
+    self.assertRaises(utils.QueueFullError, qm.pushEvent, 'c')
+    self.assertEquals(2, qm.queueHeight())
+    self.assertEquals(1, qm.numberOfRejectedEvents)
+    
+  def testFullQueueMustBlockUntilTheTimeout(self):
+    qm = utils.AsyncQueueManager('Thread-Y', capacity=1, timeoutWhenFull=0.2)
+    qm.pushEvent('a')
+    self.assertRaises(utils.QueueFullError, qm.pushEvent, 'b')
+    self.assertTrue(qm.blockedTime >= 0.2)
+    
+  def testFullQueueMustBlockUntilTheConsumerTakesTheEvents(self):
+    self.qm = utils.AsyncQueueManager('Thread-Y', capacity=1)
+    spy = []
+    self.qm.processEvent = lambda event: (time.sleep(0.05), spy.append(event))
+    self.qm.start()
+    for event in range(5): self.qm.pushEvent(event)
+    self.assertTrue(self.qm.maxQueueHeight <= 1)
+    self.qm.stop()
+    while threading.activeCount() != self.threads:
+      time.sleep(0.1)
+    self.assertEquals(range(5), spy)
+    
+  def testWaitTimeMetrics(self):
+    self.assertEquals(0.0, self.qm.averageWaitTime())
+    self.qm.pushEvent('a')
+    self.qm.pushEvent('b')
+    time.sleep(0.1)
+    self.qm.popEvent()
+    self.qm.popEvent()
+    self.assertEquals(2, self.qm.numberOfEvents)
+    self.assertEquals(2, self.qm.maxQueueHeight)
+    self.assertTrue(self.qm.averageWaitTime() >= 0.1)
+    self.assertTrue(self.qm.maxWaitTime >= 0.1)
+    
+  def testPopOfEmptyQueue(self):
+    self.assertRaises(IndexError, self.qm.popEvent)
   
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
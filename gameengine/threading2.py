@@ -5,17 +5,81 @@ http://www.velocityreviews.com/forums/t330554-kill-a-thread-in-python.html
 http://docs.python.org/library/threading.html
 '''
 
+import ctypes
 import threading
+import Queue
 import sys
+import time
 import trace
-#
+from gameengine.logger import logger
+
+# Seconds that an expired untraced task has to stop by itself (deadline check) before it is interrupted
+GRACE_TIME = 0.05
+
+class Cancelled(SystemExit):
+  """Raised by a deadline check. Like the kill of the trace, it terminates the thread silently."""
+
+class Deadline(object):
+  """
+  Cancellation token with a time budget (timeout < 0 means infinite).
+  The code checks it in cheap points with check(), so it does not need a trace to be stopped.
+  It is expired if it was cancelled, if its time is over or if its parent is expired.
+  """
+
+  def __init__(self, timeout=-1, parent=None):
+    self.timeout = timeout
+    self.parent = parent
+    self.cancelled = False
+    self.end = None
+    if timeout >= 0: self.end = time.time() + timeout
+
+  def cancel(self):
+    self.cancelled = True
+
+  def isExpired(self):
+    if self.cancelled: return True
+    if self.end is not None and time.time() > self.end: return True
+    return self.parent is not None and self.parent.isExpired()
+
+  def remaining(self):
+    """Remaining time in seconds, -1 if it is infinite."""
+    if self.isExpired(): return 0
+    remaining = -1
+    if self.end is not None: remaining = self.end - time.time()
+    if self.parent is not None:
+      parentRemaining = self.parent.remaining()
+      if parentRemaining >= 0 and (remaining < 0 or parentRemaining < remaining):
+        remaining = parentRemaining
+    return max(remaining, -1)
+
+  def check(self):
+    if self.isExpired(): raise Cancelled()
+
+# The deadline of each thread: KThread and Task set it
+threadDeadlines = threading.local()
+
+def currentDeadline():
+  return getattr(threadDeadlines, 'deadline', None)
+
+def checkDeadline():
+  """Raise Cancelled if the deadline of the current thread is expired."""
+  deadline = getattr(threadDeadlines, 'deadline', None)
+  if deadline is not None: deadline.check()
+
 class KThread(threading.Thread):
-  """A subclass of threading.Thread, with a kill() method."""
-  
+  """
+  A subclass of threading.Thread, with a kill() method.
+  traced (default True): kill() stops the thread in any line, but the trace makes the code slower.
+  Untraced threads run at full speed, kill() only cancels its deadline (see checkDeadline).
+  """
+
   def __init__(self, *args, **keywords):
+    self.traced = keywords.pop('traced', True)
     threading.Thread.__init__(self, *args, **keywords)
     self.killed = False
     self.expired = False
+    self.cancelled = False
+    self.deadline = Deadline(parent=currentDeadline())
     self.__exception = None
 
   def start(self):
@@ -39,12 +103,18 @@ class KThread(threading.Thread):
   def isExpired(self):
     return self.expired
 
+  def isCancelled(self):
+    return self.cancelled
+
   def __run(self):
     """Hacked run function, which installs the trace."""
     try:
-      sys.settrace(self.globaltrace)
+      threadDeadlines.deadline = self.deadline
+      if self.traced: sys.settrace(self.globaltrace)
       self.__run_backup()
       self.run = self.__run_backup
+    except Cancelled:
+      self.cancelled = True
     except Exception, e:
       e.message = e.__class__.__name__ + ' in ' + self.getName() + ': ' + e.message
       self.__exception = e
@@ -63,6 +133,165 @@ class KThread(threading.Thread):
 
   def kill(self):
     self.killed = True
+    self.deadline.cancel()
+
+class Task(object):
+  """A function to be executed by a Worker."""
+
+  def __init__(self, target, args=[], name=None, deadline=None, traced=True):
+    self.target = target
+    self.args = args
+    self.name = name
+    self.deadline = deadline
+    if deadline is None: self.deadline = Deadline()
+    self.traced = traced
+    self.expired = False
+    self.cancelled = False
+    self.finished = threading.Event()
+    self.__exception = None
+
+  def run(self):
+    previousDeadline = currentDeadline()
+    threadDeadlines.deadline = self.deadline
+    try:
+      self.target(*self.args)
+    except Cancelled:
+      self.cancelled = True
+    except Exception, e:
+      e.message = e.__class__.__name__ + ' in ' + self.name + ': ' + e.message
+      self.__exception = e
+    finally:
+      threadDeadlines.deadline = previousDeadline
+      self.finished.set()
+
+  def isExpired(self):
+    return self.expired
+
+  def isCancelled(self):
+    return self.cancelled
+
+  def raiseException(self):
+    if self.__exception is not None:
+      raise self.__exception
+
+class Worker(KThread):
+  """
+  A long-lived KThread that executes one task at a time.
+  The trace is installed only while a traced task is running.
+  """
+
+  def __init__(self, name):
+    KThread.__init__(self, target=self.loop, name=name, traced=False)
+    self.daemon = True
+    self.tasks = Queue.Queue()
+
+  def loop(self):
+    while True:
+      task = self.tasks.get()
+      if task is None: break
+      if task.traced: sys.settrace(self.globaltrace)
+      try:
+        task.run()
+      finally:
+        if task.traced: sys.settrace(None)
+      
+  def execute(self, task):
+    self.tasks.put(task)
+    
+  def stop(self):
+    self.tasks.put(None)
+
+  def interrupt(self):
+    """
+    Raise Cancelled in the thread (asynchronous exception), for an untraced task that does not check its
+    deadline. The exception is raised in the next bytecode of the thread (not inside a blocking C call).
+    """
+    if not self.isAlive(): return False
+    result = ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_long(self.ident), ctypes.py_object(Cancelled))
+    if result > 1:
+      # More than one thread state was changed: revert
+      ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_long(self.ident), None)
+      return False
+    return result == 1
+
+class WorkerPool(object):
+  """
+  Reusable workers, one per key (e.g. one per player), to avoid the creation of one thread per task.
+  A worker that expires is killed and replaced by a new one in the next task of its key.
+  """
+  
+  def __init__(self, name='Thread-Worker'):
+    self.name = name
+    self.workers = {}
+    self.lock = threading.Lock()
+    
+  def worker(self, key):
+    self.lock.acquire()
+    try:
+      worker = self.workers.get(key)
+      if worker is None or not worker.isAlive():
+        worker = Worker(self.name + '-' + str(key))
+        worker.start()
+        self.workers[key] = worker
+      return worker
+    finally:
+      self.lock.release()
+      
+  def discard(self, key):
+    self.lock.acquire()
+    try:
+      return self.workers.pop(key, None)
+    finally:
+      self.lock.release()
+    
+  def execute(self, key, target, args=[], timeout=-1, traced=True):
+    """
+    Execute target(*args) in the worker of the key and wait it to finish, like KThread.joinWithTimeout.
+    Exceptions of the target are raised in the caller thread.
+    Return the task, task.isExpired() is True if the timeout was expired.
+
+    The task runs with a Deadline of timeout seconds (see checkDeadline).
+    traced (default True): an expired task is killed by the trace.
+    Untraced tasks (trusted code) are not joined: the expired worker is abandoned
+    and the task stops in its next deadline check. If it does not stop in GRACE_TIME seconds
+    (e.g. a loop without deadline checks), Cancelled is raised in its thread (Worker.interrupt).
+    """
+    worker = self.worker(key)
+    deadline = Deadline(timeout, currentDeadline())
+    task = Task(target, args, worker.getName(), deadline, traced)
+    worker.execute(task)
+    if timeout < 0: task.finished.wait()
+    else: task.finished.wait(timeout)
+    if not task.finished.isSet() or task.isCancelled():
+      task.expired = True
+      deadline.cancel()
+    if not task.finished.isSet():
+      self.discard(key)
+      if traced:
+        worker.kill()
+        # Join waits until the thread terminates.
+        worker.join()
+      else:
+        worker.stop()
+        task.finished.wait(GRACE_TIME)
+        if not task.finished.isSet():
+          logger.warning('%s did not check its deadline: interrupted', worker.getName())
+          worker.interrupt()
+    task.raiseException()
+    return task
+  
+  def shutdown(self, wait=False):
+    self.lock.acquire()
+    try:
+      workers = self.workers.values()
+      for worker in workers:
+        worker.stop()
+      self.workers = {}
+    finally:
+      self.lock.release()
+    if wait:
+      for worker in workers:
+        worker.join()
     
 #import threading
 #import inspect
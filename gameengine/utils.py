@@ -2,7 +2,12 @@
 @author: Paulo Cheque (paulocheque@gmail.com)
 '''
 
+import collections
+import hashlib
+import random
+import struct
 import threading
+import time
 from gameengine import threading2
 
 class Error(Exception):
@@ -35,20 +40,59 @@ class Observer(object):
   def notify(self, event):
     pass
   
+###############################################################################
+# Seeds
+
+def newSeed():
+  '''
+  Random seed (64 bits) of the operating system, for games created without a seed.
+  '''
+  return random.SystemRandom().getrandbits(64)
+
+def deriveSeed(seed, index):
+  '''
+  Seed of the game number index of a batch: independent of the other games, reproducible and
+  the same in any process.
+  '''
+  digest = hashlib.sha1('%d:%d' % (seed, index)).digest()
+  return struct.unpack('<Q', digest[:8])[0]
+
 ###############################################################################
 
 # http://docs.python.org/library/itertools.html
 # itertools.combinations(iterable, r)
 # itertools.permutations(iterable[, r])
 
+def binomial(n, r):
+  '''
+  Number of combinations of n elements r by r: n! / (r! * (n - r)!)
+  '''
+  if r < 0 or r > n: return 0
+  r = min(r, n - r)
+  result = 1
+  for i in range(1, r + 1):
+    result = result * (n - r + i) // i
+  return result
+
 class CombinationGenerator(object):
+  '''
+  Combinations of r indexes of 0..n-1 in lexicographic order. Each combination has a rank (0..total-1):
+  rank/unrank convert between them and seek jumps to a rank, so an enumeration can be split in chunks 
+  (e.g. one per process) and resumed from a checkpoint.
+  
+  Example:
+  generator = utils.CombinationGenerator(52, 5)
+  for start, end in generator.chunks(4):
+    for indexes in generator.iterRange(start, end): ...
+  '''
   
   def __init__(self, n, r):
     if r > n or n < 1: raise Exception('Invalid argument')
     self.n = n
     self.r = r
-    # total = n! / r! * (n - r)!
-    self.total = self.factorial(n) / self.factorial(r) * self.factorial(n-r)
+    # binomials[m][k] = m! / (k! * (m - k)!), for rank and unrank
+    self.binomials = [[binomial(m, k) for k in range(r + 1)] for m in range(n + 1)]
+    self.total = self.binomials[n][r]
     self.current = []
     
   def factorial(self, x):
@@ -60,31 +104,34 @@ class CombinationGenerator(object):
   def __lastCombination(self):
     return list(range(self.n - self.r, self.n))
   
-  def __getIndexOfLastValidElementToIncrement(self):
+  def __getIndexOfLastValidElementToIncrement(self, current):
     for index in reversed(range(self.r)):
-      possibleValue = self.current[index] + 1
+      possibleValue = current[index] + 1
       possibleValueIsValid = (possibleValue <= (self.n - (self.r - index)))
       if possibleValueIsValid:
         return index
     return None
+  
+  def __increment(self, current):
+    '''
+    Next combination (in the same list), False if current is the last combination
+    '''
+    theIndex = self.__getIndexOfLastValidElementToIncrement(current)
+    if theIndex == None: return False
+    current[theIndex] += 1
+    ref = current[theIndex]
+    for index in range(theIndex + 1, self.r):
+      ref += 1
+      current[index] = ref
+    return True
     
   # Algorithm from Rosen
   def next(self):
     '''
     Return a list of indexes
     '''
-    if len(self.current) == 0: 
+    if len(self.current) == 0 or not self.__increment(self.current): 
       self.current = self.__firstCombination()
-    else:
-      theIndex = self.__getIndexOfLastValidElementToIncrement()
-      if theIndex == None: 
-        self.current = self.__firstCombination()
-      else:
-        self.current[theIndex] += 1
-        ref = self.current[theIndex]
-        for index in range(theIndex + 1, self.r):
-          ref += 1
-          self.current[index] = ref
     return self.current
   
   def hasNext(self):
@@ -92,60 +139,203 @@ class CombinationGenerator(object):
   
   def reset(self):
     self.current = []
+    
+  def rank(self, combination):
+    '''
+    Position (0..total-1) of a combination (increasing indexes) in the lexicographic order
+    '''
+    binomials, n, r = self.binomials, self.n, self.r
+    rank = self.total - 1
+    for i, index in enumerate(combination):
+      rank -= binomials[n - 1 - index][r - i]
+    return rank
+  
+  def unrank(self, rank):
+    '''
+    Combination (list of indexes) of a position (0..total-1) of the lexicographic order.
+    O(r log n): one binary search over the table of binomials per element of the combination.
+    '''
+    if rank < 0 or rank >= self.total: raise ValueError('Invalid rank: %s (total %s)' % (rank, self.total))
+    binomials, n, r = self.binomials, self.n, self.r
+    # Greedy over the complement: largest x with binomial(x, k) <= remainder, x decreasing
+    remainder = self.total - 1 - rank
+    combination = []
+    x = n
+    for i in range(r):
+      k = r - i
+      low, high = k - 1, x - 1
+      while low < high:
+        middle = (low + high + 1) // 2
+        if binomials[middle][k] <= remainder: low = middle
+        else: high = middle - 1
+      x = low
+      remainder -= binomials[x][k]
+      combination.append(n - 1 - x)
+    return combination
+  
+  def seek(self, rank):
+    '''
+    The next call of next() returns the combination of this rank
+    '''
+    if rank == 0: self.current = []
+    else: self.current = self.unrank(rank - 1)
+    
+  def iterRange(self, start=0, end=None):
+    '''
+    Generator of the combinations (lists of indexes) with ranks start..end-1 (default end = total).
+    It does not change the state of next().
+    '''
+    if end is None or end > self.total: end = self.total
+    if start >= end: return
+    current = self.unrank(start)
+    yield current[:]
+    for x in xrange(start + 1, end):
+      self.__increment(current)
+      yield current[:]
+      
+  def chunks(self, numberOfChunks):
+    '''
+    Contiguous ranges of ranks (start, end) with (almost) the same size, e.g. one range per process
+    '''
+    size, extra = divmod(self.total, numberOfChunks)
+    chunks = []
+    start = 0
+    for i in range(numberOfChunks):
+      end = start + size + (1 if i < extra else 0)
+      if end > start: chunks.append((start, end))
+      start = end
+    return chunks
   
 ###############################################################################
 
+class QueueFullError(Error):
+  '''Queue is full: too many events (commands) waiting to be processed'''
+
 class AsyncQueueManager(object):
+  '''
+  Producers push events and one consumer thread processes them (processEvent), in order.
+  
+  # capacity (default 0 = unbounded): maximum number of pending events
+  # blockWhenFull (default True): producers wait for space, otherwise QueueFullError is raised
+  # timeoutWhenFull (default -1 = infinite): producers wait at most this time, then QueueFullError is raised
+  # batchSize (default 0 = all): number of pending events that the consumer takes in each lock acquisition
   
-  def __init__(self, name):
+  Metrics: queueHeight(), maxQueueHeight, numberOfEvents, numberOfBatches, averageWaitTime(), maxWaitTime (time in queue), 
+  blockedTime (of the producers) and numberOfRejectedEvents.
+  '''
+  
+  def __init__(self, name, capacity=0, blockWhenFull=True, timeoutWhenFull=-1, batchSize=0):
     self.name = name
-    self.__queue = []
+    self.capacity = capacity
+    self.blockWhenFull = blockWhenFull
+    self.timeoutWhenFull = timeoutWhenFull
+    self.batchSize = batchSize
+    self.__queue = collections.deque() # (event, time of the push)
     
-    self.__control = threading.Condition()
+    self.__lock = threading.Lock()
+    self.__notEmpty = threading.Condition(self.__lock)
+    self.__notFull = threading.Condition(self.__lock)
     self.__thread = None
-    self.__finishAfterNextEvent = False
+    self.__finishAfterPendingEvents = False
+    
+    self.maxQueueHeight = 0
+    self.numberOfEvents = 0
+    self.numberOfBatches = 0
+    self.totalWaitTime = 0
+    self.maxWaitTime = 0
+    self.blockedTime = 0
+    self.numberOfRejectedEvents = 0
   
   # Productor
   def pushEvent(self, event):
-    if len(self.__queue) == 0:
-      self.__control.acquire()
-      self.__pushEvent(event)
-      self.__control.notify()
-      self.__control.release()
-    else:
-      self.__pushEvent(event)
+    # The metrics and the notification of the consumer are under the lock (one acquire per event)
+    self.__lock.acquire()
+    try:
+      # The consumer never waits for itself
+      if self.capacity > 0 and len(self.__queue) >= self.capacity and threading.currentThread() is not self.__thread:
+        self.__waitForSpace()
+      self.__queue.append((event, time.time()))
+      self.maxQueueHeight = max(self.maxQueueHeight, len(self.__queue))
+      self.__notEmpty.notify()
+    finally:
+      self.__lock.release()
+      
+  def __waitForSpace(self):
+    if not self.blockWhenFull: self.__reject()
+    startTime = time.time()
+    try:
+      while len(self.__queue) >= self.capacity:
+        if self.timeoutWhenFull < 0:
+          self.__notFull.wait()
+        else:
+          remaining = self.timeoutWhenFull - (time.time() - startTime)
+          if remaining <= 0: self.__reject()
+          self.__notFull.wait(remaining)
+    finally:
+      self.blockedTime += time.time() - startTime
+      
+  def __reject(self):
+    self.numberOfRejectedEvents += 1
+    raise QueueFullError(self.name + ' - ' + str(self.capacity))
     
-  def __pushEvent(self, event):
-    self.__queue.append(event)
+  def __popEvents(self, amount):
+    now = time.time()
+    events = []
+    while self.__queue and (amount <= 0 or len(events) < amount):
+      event, pushTime = self.__queue.popleft()
+      waitTime = now - pushTime
+      self.totalWaitTime += waitTime
+      if waitTime > self.maxWaitTime: self.maxWaitTime = waitTime
+      events.append(event)
+    self.numberOfEvents += len(events)
+    self.__notFull.notifyAll()
+    return events
     
   def popEvent(self):
-    event = self.__queue.pop(0)
-    return event
+    self.__lock.acquire()
+    try:
+      if not self.__queue: raise IndexError('pop from an empty queue')
+      return self.__popEvents(1)[0]
+    finally:
+      self.__lock.release()
 
   def start(self):
     if self.__thread != None: raise Exception('This queue manager has already been started')
-    self.__thread = threading2.KThread(target=self.run, name=self.name)
+    self.__thread = threading2.KThread(target=self.run, name=self.name, traced=False)
     self.__thread.daemon = True
     self.__thread.start()
 
   def stop(self):
+    '''
+    The consumer processes the pending events and then it finishes.
+    '''
     if self.__thread is not None: 
-      self.__finishAfterNextEvent = True
-      self.__control.acquire()
-      self.__control.notify()
-      self.__control.release()
+      self.__lock.acquire()
+      self.__finishAfterPendingEvents = True
+      self.__notEmpty.notify()
+      self.__lock.release()
 
   # Consumer
   def run(self):
-    while not self.__finishAfterNextEvent:
-      self.__control.acquire()
-      while not self.__finishAfterNextEvent and len(self.__queue) == 0:
-        self.__control.wait()
-      self.__control.release()
-      self.processEvent(self.popEvent())
+    while True:
+      self.__lock.acquire()
+      try:
+        while not self.__finishAfterPendingEvents and not self.__queue:
+          self.__notEmpty.wait()
+        if not self.__queue: return
+        events = self.__popEvents(self.batchSize)
+        self.numberOfBatches += 1
+      finally:
+        self.__lock.release()
+      for event in events:
+        self.processEvent(event)
       
   def processEvent(self, event):
     pass
   
   def queueHeight(self):
     return len(self.__queue)
+  
+  def averageWaitTime(self):
+    if self.numberOfEvents == 0: return 0.0
+    return self.totalWaitTime / self.numberOfEvents
@@ -41,5 +41,6 @@ setup(name='python-cardgameengine',
       extras_require={'test': tests_require},
 
       packages=find_packages(),
+      package_data={'cardgames.simplepokertexasholdem': ['preflop.bin']},
 )
 